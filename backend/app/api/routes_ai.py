@@ -1,17 +1,86 @@
-from fastapi import APIRouter, HTTPException
-from app.schemas.request_schema import CodePrompt
-from app.services.ai_service import generate_code_suggestion
+import asyncio
+import json
+import time
+from contextlib import asynccontextmanager
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.schemas.request_schema import CodePrompt, CodePromptBatch
+from app.services.admission import client_key, generation_admission
+from app.services.ai_service import code_prompt_messages, generate_code_suggestion, generate_code_suggestions
 
 
 router = APIRouter()
 
+# running batch producers; the event loop only keeps weak references to tasks
+_BATCHES = set()
+
 
 @router.post("/suggest-code/")
-def suggest_code(data: CodePrompt):
-    try:
-        result = generate_code_suggestion(data.prompt, data.model)
-        if result.startswith("Error"):
-            raise HTTPException(status_code=500, detail=result)
+async def suggest_code(data: CodePrompt, request: Request):
+    async with generation_admission.slot(client_key(request)):
+        try:
+            result = await run_in_threadpool(generate_code_suggestion, code_prompt_messages(data.prompt), data.model)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
         return {"model": data.model, "suggestion": result}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/suggest-code/batch")
+async def suggest_code_batch(data: CodePromptBatch, request: Request):
+    """
+    Suggestions for several prompts, streamed as NDJSON in completion order:
+    one {"index", "model", "suggestion"} or {"index", "model", "error"} line
+    per prompt. Identical prompts are generated once. Every distinct prompt is
+    admitted like a single suggestion (slot and rate-limit token), up to
+    SUGGEST_BATCH_CONCURRENCY of them waiting or running at a time; a prompt
+    shed by admission control gets an error line.
+    """
+    key = client_key(request)
+    # acquire before responding, so a shed batch still gets a plain 429; the
+    # first prompt to run takes this slot over
+    await generation_admission.acquire(key)
+    reserved = [True]
+
+    @asynccontextmanager
+    async def admit():
+        if reserved:
+            reserved.clear()
+        else:
+            await generation_admission.acquire(key)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            generation_admission.release(time.perf_counter() - start)
+
+    queue = asyncio.Queue()
+
+    # the producer owns the reserved slot: it is released even when the
+    # response is dropped before its body is ever iterated
+    async def produce():
+        try:
+            async for indexes, suggestion, error in generate_code_suggestions(
+                data.prompts, data.model, settings.SUGGEST_BATCH_CONCURRENCY, admit
+            ):
+                result = {"suggestion": suggestion} if error is None else {"error": error}
+                for index in indexes:
+                    queue.put_nowait(json.dumps({"index": index, "model": data.model, **result}) + "\n")
+        finally:
+            if reserved:
+                generation_admission.release()
+            queue.put_nowait(None)
+
+    producer = asyncio.create_task(produce())
+    _BATCHES.add(producer)
+    producer.add_done_callback(_BATCHES.discard)
+
+    async def lines():
+        try:
+            while (line := await queue.get()) is not None:
+                yield line
+        finally:
+            producer.cancel()
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
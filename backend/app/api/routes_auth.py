@@ -9,8 +9,6 @@ from app.models.user_model import User
 
 router = APIRouter()
 
-print(">>> Checking SessionOut type:", UserResponse)
-
 @router.post("/signup", response_model=UserResponse)
 def signup(user_data: UserCreate, db: Session = Depends(get_db)):
     
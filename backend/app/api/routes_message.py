@@ -1,26 +1,58 @@
-from fastapi import APIRouter, HTTPException
-from app.database import get_db
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from app.core.pagination import HAS_MORE_HEADER, NEXT_CURSOR_HEADER
+from app.database import get_async_db
 from app.schemas.message_schema import MessageCreate, MessageOut
 from app.schemas.session_schema import MessageSessionOut
-from app.services.message_services import create_message, get_messages
+from app.services.admission import client_key, generation_admission
+from app.services.message_services import create_message, get_message_page, get_messages_etag
 from app.services.session_services import get_session
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import Depends
-from typing import List
+from typing import List, Optional
 
 
 router = APIRouter()
 
+def _etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
 @router.post("/messages", response_model=MessageSessionOut)
-def add_message(message: MessageCreate, db: Session = Depends(get_db)):
-    db_session = get_session(db, session_id=message.session_id)
+async def add_message(message: MessageCreate, request: Request, db: AsyncSession = Depends(get_async_db)):
+    db_session = await get_session(db, session_id=message.session_id)
     if not db_session:
         raise HTTPException(status_code=404, detail="Session not found")
-    return create_message(db, message=message)
+    # shed with 429 before anything is saved when the generation queue is full
+    async with generation_admission.slot(client_key(request)):
+        return await create_message(db, message=message)
 
 @router.get("/messages/{session_id}", response_model=List[MessageOut])
-def get_session_messages(session_id: int, db: Session = Depends(get_db)):
-    db_session = get_session(db, session_id=session_id)
+async def get_session_messages(
+    session_id: int,
+    request: Request,
+    response: Response,
+    limit: int = Query(100, ge=1, le=500),
+    before: Optional[str] = None,
+    after_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    db_session = await get_session(db, session_id=session_id)
     if not db_session:
         raise HTTPException(status_code=404, detail="Session not found")
-    return get_messages(db, session_id=session_id)
\ No newline at end of file
+
+    # conditional GET: answer polls with 304 before loading or serializing anything
+    etag = await get_messages_etag(db, session_id, limit, before, after_id)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    messages, next_cursor, has_more = await get_message_page(db, session_id=session_id, limit=limit, before=before, after_id=after_id)
+    response.headers.update(headers)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    if has_more:
+        response.headers[HAS_MORE_HEADER] = "true"
+    return messages
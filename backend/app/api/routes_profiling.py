@@ -0,0 +1,33 @@
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from typing import List
+from app.core.config import settings
+from app.core.profiling import PROFILE_ID_HEADER, SamplingProfiler, list_profiles, load_profile, require_profiling_token, save_profile
+
+
+router = APIRouter(dependencies=[Depends(require_profiling_token)])
+
+@router.post("", response_class=PlainTextResponse)
+async def profile_window(seconds: float = Query(10, gt=0)):
+    """Sample every thread for `seconds` and return the folded stacks (also stored)."""
+    seconds = min(seconds, settings.PROFILING_MAX_SECONDS)
+    profiler = SamplingProfiler().start()
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        profiler.stop()
+    folded = profiler.folded()
+    profile_id = save_profile(folded)
+    return PlainTextResponse(folded, headers={PROFILE_ID_HEADER: profile_id})
+
+@router.get("", response_model=List[str])
+def get_profiles():
+    return list_profiles()
+
+@router.get("/{profile_id}", response_class=PlainTextResponse)
+def get_profile(profile_id: str):
+    folded = load_profile(profile_id)
+    if folded is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return folded
@@ -3,17 +3,26 @@ from fastapi import APIRouter, Depends, UploadFile, Form, HTTPException
 from fastapi import BackgroundTasks
 import os
 import shutil
+from uuid import uuid4
 from fastapi.params import File
-from app.database import get_db
-from app.schemas.session_schema import ProjectClone
-from app.services.ingest import extract_zip_and_create_project, clone_git_and_create_project, index_project, project_by_user
+from app.database import get_async_db, get_db
+from app.schemas.session_schema import ProjectClone, ProjectSearch
+from app.services.ingest import extract_zip_and_create_project, clone_git_and_create_project, index_project_job, project_by_user, refresh_git_project, remove_repo_checkout
 from app.models.session_model import Chunk, FileStore, Project
 from app.core.dependencies import get_current_user
+from app.core.responses import ORJSONResponse
 from app.schemas.user_schema import UserResponse as User
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.services.supabase_client import supabase
+from starlette.concurrency import run_in_threadpool
+from app.embeddings.indexer import evict_index
+from app.services.blob_store import delete_orphan_blobs
+from app.services.search import retrieve_top_k_multi
+from app.services.storage_cleanup import delete_project_storage
 
-router = APIRouter()
+# every project route returns plain dicts/lists, none has a response_model
+router = APIRouter(default_response_class=ORJSONResponse)
 
 @router.post("/upload")
 async def upload_project_zip(
@@ -26,15 +35,17 @@ async def upload_project_zip(
     # Save uploaded file to temp, extract and create project
     tmpdir = os.path.join("tmp_uploads")
     os.makedirs(tmpdir, exist_ok=True)
-    file_path = os.path.join(tmpdir, f"{upload.filename}")
+    # unique name: concurrent uploads of e.g. "repo.zip" must not share a file
+    file_path = os.path.join(tmpdir, f"{uuid4().hex}.zip")
     with open(file_path, "wb") as f:
         f.write(await upload.read())
 
     try:
-        proj_id, proj_name = extract_zip_and_create_project(user.id, file_path, project_name, db=db)
+        # extraction + upload is blocking file IO, keep it off the event loop
+        proj_id, proj_name = await run_in_threadpool(extract_zip_and_create_project, user.id, file_path, project_name, db=db)
         # schedule cleanup of extract_dir (optional) or index in background
         
-        background_tasks.add_task(index_project, proj_id, db)
+        background_tasks.add_task(index_project_job, proj_id)
         return {"project": {"id": proj_id, "name": proj_name}}
     finally:
         os.remove(file_path)
@@ -45,63 +56,90 @@ def clone_repo(background_tasks: BackgroundTasks, project: ProjectClone, user:Us
     try:
         proj_id, proj_name = clone_git_and_create_project(user.id, project.repo_url, project.project_name, db)
         
-        background_tasks.add_task(index_project, proj_id, db)
+        background_tasks.add_task(index_project_job, proj_id)
         return {"project": {"id": proj_id, "name": proj_name}}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.post("/{project_id}/refresh")
+def refresh_repo(project_id: int, background_tasks: BackgroundTasks, user:User=Depends(get_current_user), db:Session =Depends(get_db)):
+    # fetch new commits; only the files changed since the last refresh are re-indexed
+    if not db.query(Project.id).filter(Project.id == project_id, Project.user_id == user.id).first():
+        raise HTTPException(status_code=404, detail="Project not found")
+    try:
+        result = refresh_git_project(project_id, db)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if result["file_ids"]:
+        background_tasks.add_task(index_project_job, project_id, result["file_ids"])
+    return result
+
 @router.post("/{project_id}/index")
-def index_manual(project_id: int, user:User = Depends(get_current_user), db:Session =Depends(get_db)):
+async def index_manual(project_id: int, user:User = Depends(get_current_user), db:AsyncSession =Depends(get_async_db)):
     # check permission
     
     try:
-        proj = db.query(Project).filter(Project.id == project_id, Project.user_id == user.id).first()
+        result = await db.execute(select(Project).filter(Project.id == project_id, Project.user_id == user.id))
+        proj = result.scalars().first()
         if not proj:
             raise HTTPException(status_code=404, detail="Project not found")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    result = index_project(project_id, db=db)
+    result = await run_in_threadpool(index_project_job, project_id)
     return result
 
 @router.get("/{project_id}/status")
-def status(project_id:int, user:User=Depends(get_current_user), db:Session =Depends(get_db)):
+async def status(project_id:int, user:User=Depends(get_current_user), db:AsyncSession =Depends(get_async_db)):
     # For simplicity return count of chunks
     
     try:
-        proj = db.query(Project).filter(Project.id == project_id, Project.user_id == user.id).first()
+        result = await db.execute(select(Project).filter(Project.id == project_id, Project.user_id == user.id))
+        proj = result.scalars().first()
         if not proj:
             raise HTTPException(status_code=404, detail="Project not found")
-        chunk_count = db.query(Chunk).join(FileStore).filter(FileStore.project_id==project_id).count()
+        chunk_count = await db.scalar(select(func.count(Chunk.id)).join(FileStore).filter(FileStore.project_id==project_id))
         return {"project_id": project_id, "chunk_count": chunk_count}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
         
-@router.get("/list")
-def list_projects(user:User = Depends(get_current_user), db:Session =Depends(get_db)):
-    return project_by_user(user_id=user.id, db=db)
-
-
-def delete_project_files(project_id: int):
-    folder = f"project_{project_id}/"
+@router.post("/search")
+async def search_projects(search: ProjectSearch, user:User = Depends(get_current_user), db:AsyncSession =Depends(get_async_db)):
+    # one query embedding, every selected project index searched in parallel
+    query = select(Project.id).filter(Project.user_id == user.id)
+    if search.project_ids is not None:
+        query = query.filter(Project.id.in_(search.project_ids))
+    project_ids = (await db.scalars(query)).all()
+    if search.project_ids is not None and len(project_ids) != len(set(search.project_ids)):
+        raise HTTPException(status_code=404, detail="Project not found")
+    if not project_ids:
+        return {"results": []}
+    results = await retrieve_top_k_multi(list(project_ids), search.query, db=db, top_k=search.top_k)
+    return {"results": results}
 
-    # delete from project files bucket
-    supabase.storage.from_("project-files").remove([folder])
-
-    # delete FAISS files too
-    supabase.storage.from_("faiss-indexes").remove([folder])
+@router.get("/list")
+async def list_projects(user:User = Depends(get_current_user), db:AsyncSession =Depends(get_async_db)):
+    return await project_by_user(user_id=user.id, db=db)
 
 
 @router.delete("/{project_id}")
-def delete_project(project_id:int, db:Session =Depends(get_db)):
+async def delete_project(project_id:int, background_tasks: BackgroundTasks, db:AsyncSession =Depends(get_async_db)):
     try:
-        proj = db.query(Project).filter(Project.id == project_id).first()
-        if not proj:
+        exists = await db.scalar(select(Project.id).filter(Project.id == project_id))
+        if not exists:
             raise HTTPException(status_code=404, detail="Project not found")
-        
-        delete_project_files(project_id)
-        
-        db.delete(proj)
-        db.commit()
+
+        blob_hashes = (await db.scalars(select(FileStore.content_hash).filter(FileStore.project_id == project_id).distinct())).all()
+        # one statement: files, chunks, embeddings, sessions and messages go via ON DELETE CASCADE
+        await db.execute(delete(Project).where(Project.id == project_id))
+        await delete_orphan_blobs(db, blob_hashes)
+        await db.commit()
+
+        # waits for an in-flight load of the index, so off the event loop
+        await run_in_threadpool(evict_index, project_id)
+        remove_repo_checkout(project_id)
+        background_tasks.add_task(delete_project_storage, project_id)
         return {"message": "Project deleted successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,53 +1,85 @@
-from fastapi import APIRouter, HTTPException
-from app.database import get_db
-from app.schemas.session_schema import SessionInstanceCreate, SessionInstanceOut, SessionInstanceUpdate
+from fastapi import APIRouter, HTTPException, Query, Response
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.database import get_async_db
+from app.models.session_model import Project
+from app.schemas.session_schema import SessionInstanceCreate, SessionInstanceOut, SessionInstanceUpdate, SessionSummaryOut
 from app.schemas.user_schema import UserResponse as User
-from app.services.session_services import create_session, delete_session_crud, get_sessions, get_session, list_sessions_by_project, rename_session_crud
-from sqlalchemy.orm import Session
+from app.services.prefetch import prefetch_project
+from app.services.session_services import create_session, delete_session_crud, get_sessions, get_session, get_session_detail, list_sessions_by_project, rename_session_crud
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import Depends
-from typing import Any, List
+from typing import Any, List, Optional
 from app.core.dependencies import get_current_user
 
 
 
 router = APIRouter()
 
-print(">>> Checking SessionOut type:", SessionInstanceOut)
+def _prefetch_session_project(session):
+    # a project session is about to be queried: start loading its index now,
+    # for existing projects of the session's own user only
+    if session.project is not None and session.project.user_id == session.user_id:
+        prefetch_project(session.project_id)
+
     
 @router.post("/sessions", response_model=SessionInstanceOut)
-def add_new_session(sessioninstance: SessionInstanceCreate, db: Session = Depends(get_db)):
-    return create_session(db,  sessioninstance=sessioninstance)
+async def add_new_session(sessioninstance: SessionInstanceCreate, db: AsyncSession = Depends(get_async_db)):
+    db_session = await create_session(db,  sessioninstance=sessioninstance)
+    _prefetch_session_project(db_session)
+    return db_session
 
-@router.get("/sessions", response_model=List[SessionInstanceOut])
-def list_sessions(db: Session = Depends(get_db), user: User = Depends(get_current_user)):
-    return get_sessions(db, user_id=user.id)
+@router.get("/sessions", response_model=List[SessionSummaryOut])
+async def list_sessions(
+    response: Response,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+    user: User = Depends(get_current_user),
+):
+    sessions, next_cursor = await get_sessions(db, user_id=user.id, limit=limit, cursor=cursor)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return sessions
 
 @router.get("/sessions/{session_id}", response_model=SessionInstanceOut)
-def get_session_by_id(session_id: int, db: Session = Depends(get_db)):
-    db_session = get_session(db, session_id=session_id)
+async def get_session_by_id(session_id: int, db: AsyncSession = Depends(get_async_db)):
+    db_session = await get_session_detail(db, session_id=session_id)
     if not db_session:
         raise HTTPException(status_code=404, detail="Session not found")
+    _prefetch_session_project(db_session)
     return db_session
 
 # ✅ Rename Session
-@router.put("/sessions/{session_id}")
-def rename_session(session_id: int, session_data: SessionInstanceUpdate, db: Session = Depends(get_db)):
-    session = get_session(db, session_id=session_id)
+@router.put("/sessions/{session_id}", response_model=SessionSummaryOut)
+async def rename_session(session_id: int, session_data: SessionInstanceUpdate, db: AsyncSession = Depends(get_async_db)):
+    session = await get_session(db, session_id=session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
     
-    return rename_session_crud(db, session_id, session_data)
+    return await rename_session_crud(db, session_id, session_data)
     
 
 # ✅ Delete Session
 @router.delete("/sessions/{session_id}")
-def delete_session(session_id: int, db: Session = Depends(get_db)):
-    session = get_session(db, session_id=session_id)
+async def delete_session(session_id: int, db: AsyncSession = Depends(get_async_db)):
+    session = await get_session(db, session_id=session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
-    return delete_session_crud(db, session_id)
+    return await delete_session_crud(db, session_id)
     
-@router.get("/sessions/projects/{project_id}", response_model=List[SessionInstanceOut])
-def list_sessions_project(project_id: int, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
-    sessions = list_sessions_by_project(db, user_id=user.id, project_id=project_id)
+@router.get("/sessions/projects/{project_id}", response_model=List[SessionSummaryOut])
+async def list_sessions_project(
+    project_id: int,
+    response: Response,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+    user: User = Depends(get_current_user),
+):
+    sessions, next_cursor = await list_sessions_by_project(db, user_id=user.id, project_id=project_id, limit=limit, cursor=cursor)
+    if await db.scalar(select(Project.id).filter(Project.id == project_id, Project.user_id == user.id)):
+        prefetch_project(project_id)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     return sessions
\ No newline at end of file
@@ -0,0 +1,11 @@
+import logging
+from app.core.config import settings
+
+LOG_FORMAT = "%(asctime)s %(levelname)s [%(name)s] %(message)s"
+
+def configure_logging():
+    """
+    Root logging setup for the API; the level comes from LOG_LEVEL (default INFO).
+    Per-item tracing in the hot paths is logged at DEBUG.
+    """
+    logging.basicConfig(level=settings.LOG_LEVEL.upper(), format=LOG_FORMAT)
@@ -0,0 +1,72 @@
+import time
+from contextlib import contextmanager
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+from sqlalchemy import event
+
+# buckets sized for the range between a cached FAISS lookup and a slow LLM answer
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+EMBEDDING_SECONDS = Histogram(
+    "embedding_seconds", "Time spent encoding texts with the embedding model", ["operation"], buckets=LATENCY_BUCKETS
+)
+INDEX_LOAD_SECONDS = Histogram(
+    "faiss_index_load_seconds", "Time to download and deserialize a project index", buckets=LATENCY_BUCKETS
+)
+FAISS_SEARCH_SECONDS = Histogram(
+    "faiss_search_seconds", "Time spent in FAISS index search", buckets=LATENCY_BUCKETS
+)
+DB_QUERY_SECONDS = Histogram(
+    "db_query_seconds", "Database statement execution time", ["engine", "statement"], buckets=LATENCY_BUCKETS
+)
+LLM_TIME_TO_FIRST_TOKEN_SECONDS = Histogram(
+    "llm_time_to_first_token_seconds", "Time until the provider returned the first token", ["provider"], buckets=LATENCY_BUCKETS
+)
+LLM_TOTAL_SECONDS = Histogram(
+    "llm_total_seconds", "Total generation time per request", ["provider"], buckets=LATENCY_BUCKETS
+)
+INDEX_COMPACTION_SECONDS = Histogram(
+    "faiss_index_compaction_seconds", "Time to merge delta segments into a project's base index", buckets=LATENCY_BUCKETS
+)
+INDEX_PREFETCHES = Counter("faiss_index_prefetch_total", "Background index prefetches by outcome", ["result"])
+INDEX_FIRST_QUERY = Counter(
+    "faiss_index_first_query_total", "First query of a project index in this worker, by index state (warm/loading/cold)", ["state"]
+)
+CACHED_INDEXES = Gauge("faiss_cached_indexes", "Project indexes held in this worker's cache (at most INDEX_CACHE_SIZE)")
+QUEUE_DEPTH = Gauge("queue_depth", "Jobs waiting or running per queue", ["queue"])
+GENERATIONS_ACTIVE = Gauge("generations_active", "LLM generations currently holding an admission slot")
+GENERATION_QUEUE_WAIT_SECONDS = Histogram(
+    "generation_queue_wait_seconds", "Time a generation request waited for an admission slot", buckets=LATENCY_BUCKETS
+)
+ADMISSION_REJECTED = Counter("admission_rejected_total", "Generation requests shed with 429", ["reason"])
+
+
+@contextmanager
+def observe(histogram, *labels):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        (histogram.labels(*labels) if labels else histogram).observe(time.perf_counter() - start)
+
+
+def instrument_engine(engine, name: str):
+    """Record every statement run through `engine` in DB_QUERY_SECONDS."""
+    # the start time lives on the statement's execution context, which is
+    # dropped with it, so a failed statement leaves nothing behind
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._query_start = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _stop(conn, cursor, statement, parameters, context, executemany):
+        start = getattr(context, "_query_start", None)
+        if start is None:
+            return
+        elapsed = time.perf_counter() - start
+        verb = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+        DB_QUERY_SECONDS.labels(name, verb).observe(elapsed)
+
+
+def render_metrics():
+    return generate_latest(), CONTENT_TYPE_LATEST
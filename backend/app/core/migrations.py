@@ -0,0 +1,26 @@
+import os
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect
+from app.database import engine
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+BASELINE_REVISION = "0001"
+
+def alembic_config() -> Config:
+    cfg = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    cfg.set_main_option("script_location", os.path.join(BACKEND_DIR, "migrations"))
+    # keep the app's own logging setup
+    cfg.attributes["configure_logger"] = False
+    return cfg
+
+def run_migrations():
+    """
+    Bring the database schema up to the latest revision.
+    Databases created by the old create_all() call are stamped at the baseline first.
+    """
+    cfg = alembic_config()
+    tables = set(inspect(engine).get_table_names())
+    if "users" in tables and "alembic_version" not in tables:
+        command.stamp(cfg, BASELINE_REVISION)
+    command.upgrade(cfg, "head")
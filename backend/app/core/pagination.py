@@ -0,0 +1,24 @@
+import base64
+from datetime import datetime
+from typing import Tuple
+from fastapi import HTTPException
+
+# Opaque keyset cursors over (created_at, id), used by the session and message lists.
+# The next page cursor travels in this response header so list endpoints keep
+# returning plain JSON arrays.
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+# set to "true" when a page was cut at its limit, including delta pages that
+# have no cursor (the client continues from the last row it got)
+HAS_MORE_HEADER = "X-Has-More"
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{row_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        created_at, row_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
@@ -0,0 +1,146 @@
+import hmac
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Optional, Tuple
+from uuid import uuid4
+from fastapi import HTTPException, Request
+from app.core.config import settings
+
+# Opt-in request profiling. Two pieces:
+#  - stage(): cheap wall-clock timers around the stages of a request, reported
+#    back in a Server-Timing header on every response that recorded any;
+#  - SamplingProfiler: samples the Python stacks of every thread at a fixed
+#    interval and renders them as folded stacks ("a;b;c <count>"), which
+#    flamegraph.pl, speedscope and inferno read directly. Only runs when the
+#    request carries the admin PROFILING_TOKEN.
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_QUERY_PARAM = "profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+PROFILES_PATH = "/api/admin/profiles"
+PROFILE_DIR = os.path.join(os.getcwd(), "data", "profiles")
+
+_timings: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("server_timings", default=None)
+
+
+@contextmanager
+def stage(name: str):
+    """Time a block into the current request's Server-Timing breakdown (no-op outside a request)."""
+    timings = _timings.get()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timings is not None:
+            timings.append((name, (time.perf_counter() - start) * 1000))
+
+
+def server_timing_header(timings: List[Tuple[str, float]]) -> str:
+    return ", ".join(f"{name};dur={duration:.1f}" for name, duration in timings)
+
+
+class SamplingProfiler:
+    """
+    Samples sys._current_frames() from a daemon thread. Every thread is
+    sampled, rooted at its thread name, so the event loop, threadpool
+    workers and background jobs stay separable in the flamegraph.
+    """
+
+    def __init__(self, interval: float = None):
+        self.interval = interval if interval is not None else settings.PROFILING_INTERVAL_MS / 1000
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.samples[";".join(reversed(stack))] += 1
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+def save_profile(folded: str) -> str:
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    profile_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid4().hex[:8]}"
+    with open(os.path.join(PROFILE_DIR, f"{profile_id}.folded"), "w", encoding="utf-8") as f:
+        f.write(folded)
+    return profile_id
+
+
+def load_profile(profile_id: str) -> Optional[str]:
+    path = os.path.join(PROFILE_DIR, f"{os.path.basename(profile_id)}.folded")
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+def list_profiles() -> List[str]:
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    return sorted((name[:-len(".folded")] for name in os.listdir(PROFILE_DIR) if name.endswith(".folded")), reverse=True)
+
+
+def _token_ok(token: Optional[str]) -> bool:
+    # profiling is off unless a token is configured
+    return bool(settings.PROFILING_TOKEN) and token is not None and hmac.compare_digest(token, settings.PROFILING_TOKEN)
+
+
+def profiling_requested(request: Request) -> bool:
+    return _token_ok(request.headers.get(PROFILE_HEADER) or request.query_params.get(PROFILE_QUERY_PARAM))
+
+
+def require_profiling_token(request: Request):
+    """Dependency for the admin profiling routes."""
+    if not profiling_requested(request):
+        raise HTTPException(status_code=403, detail="Profiling not allowed")
+
+
+async def profiling_middleware(request: Request, call_next):
+    timings = []
+    reset = _timings.set(timings)
+    # the admin routes run their own window profiles
+    wanted = profiling_requested(request) and not request.url.path.startswith(PROFILES_PATH)
+    profiler = SamplingProfiler().start() if wanted else None
+    start = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        _timings.reset(reset)
+        if profiler is not None:
+            profiler.stop()
+
+    if timings:
+        timings.append(("total", (time.perf_counter() - start) * 1000))
+        response.headers["Server-Timing"] = server_timing_header(timings)
+    if profiler is not None:
+        response.headers[PROFILE_ID_HEADER] = save_profile(profiler.folded())
+    return response
@@ -0,0 +1,13 @@
+from typing import Any
+import orjson
+from fastapi.responses import JSONResponse
+
+class ORJSONResponse(JSONResponse):
+    """
+    For routes that return plain dicts/lists without a response_model
+    (project lists, search results, status payloads). Routes with a
+    response_model keep the default class: FastAPI then serializes them with
+    Pydantic's dump_json in one step, which a custom class opts out of.
+    """
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
@@ -9,7 +9,6 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 
 def hash_password(password: str) -> str:
-    print("Password type:", type(password), "Value:", password)
     return pwd_context.hash(password)
 
 def verify_password(plain: str, hashed: str) -> bool:
@@ -1,12 +1,45 @@
-from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base 
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
+from app.core.metrics import instrument_engine
+
+
+def _engine_options(url: str) -> dict:
+    options = {"pool_pre_ping": settings.DB_POOL_PRE_PING}
+    # sqlite (local dev / benchmarks) has no server side pool to tune
+    if not url.startswith("sqlite"):
+        options.update(
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+        )
+    return options
+
 
 Base = declarative_base()
-engine = create_engine(settings.DATABASE_URL)
+engine = create_engine(settings.DATABASE_URL, **_engine_options(settings.DATABASE_URL))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# async engine used by the request handlers; the sync engine above stays for
+# background jobs (indexing) and the auth dependency
+async_engine = create_async_engine(settings.ASYNC_DATABASE_URL, **_engine_options(settings.ASYNC_DATABASE_URL))
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+instrument_engine(engine, "sync")
+instrument_engine(async_engine.sync_engine, "async")
+
+if engine.dialect.name == "sqlite":
+    # sqlite only enforces ON DELETE CASCADE with foreign keys switched on per connection
+    @event.listens_for(engine, "connect")
+    @event.listens_for(async_engine.sync_engine, "connect")
+    def _enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
 def get_db():
     db = SessionLocal()
     try:
@@ -14,4 +47,8 @@ def get_db():
     finally:
         db.close()
 
-        
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
@@ -1,126 +1,572 @@
 # app/embeddings/indexer.py
+import io
+import json
+import logging
 import os
-import faiss
-import numpy as np
-from sentence_transformers import SentenceTransformer
 import threading
+import time
+import shutil
 import pickle
-import tempfile
-from app.services.supabase_client import supabase
+from collections import OrderedDict
+from uuid import uuid4
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
+from app.core.config import settings
+from app.core.metrics import (
+    CACHED_INDEXES, EMBEDDING_SECONDS, FAISS_SEARCH_SECONDS, INDEX_COMPACTION_SECONDS, INDEX_LOAD_SECONDS, observe,
+)
+from app.services.supabase_client import get_supabase
 
-BASE_DIR = os.path.join(os.getcwd(), "data")  # each project will have its own folder
-os.makedirs(BASE_DIR, exist_ok=True)
+# faiss, numpy and sentence-transformers (torch) are imported where they are
+# used: importing them costs seconds and hundreds of MB per worker at boot.
+
+logger = logging.getLogger(__name__)
 
 MODEL_NAME = "all-MiniLM-L6-v2"
 EMBED_DIM = 384
 
-# Use RLock so nested calls (add_vectors -> save) are safe
-_LOCK = threading.RLock()
+# loaded indexes kept per worker, keyed by project id, least recently used
+# first. _CACHE_LOCK only guards the dicts; downloads hold the project's own
+# load lock, so loading one project never holds up another.
+_INDEX_CACHE = OrderedDict()
+_LOAD_LOCKS = {}
+_CACHE_LOCK = threading.Lock()
+# projects deleted while this worker ran; never loaded or cached again
+_DELETED = set()
+
+# merges delta segments into base indexes, one project at a time
+_COMPACTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="index-compact")
+
+BUCKET = "faiss-indexes"
+# base segment of indexes written before compaction named its bases uniquely
+BASE_NAME = "faiss_index.bin"
+# latest manifest as last written; manifest_<version>.json are the real versions
+MANIFEST_NAME = "manifest.json"
+# publish / load attempts before a write or load gives up
+MAX_MANIFEST_ATTEMPTS = 8
+
+# one embedding model per worker, shared by every project index
+_MODEL = None
+_MODEL_LOCK = threading.Lock()
+
+
+def load_embedding_model():
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(MODEL_NAME)
+
+
+def get_embedding_model():
+    global _MODEL
+    if _MODEL is None:
+        with _MODEL_LOCK:
+            if _MODEL is None:
+                with observe(EMBEDDING_SECONDS, "load"):
+                    _MODEL = load_embedding_model()
+                logger.info("Loaded embedding model %s", MODEL_NAME)
+    return _MODEL
+
+
+def embed_query(text: str):
+    """
+    Query embedding as a (1, dim) float32 array; computed once and reused when
+    the same question is searched against several project indexes.
+    """
+    import numpy as np
+    with observe(EMBEDDING_SECONDS, "query"):
+        emb = get_embedding_model().encode([text], convert_to_numpy=True)
+    return np.asarray(emb, dtype="float32").reshape(1, -1)
+
+
+def warm_up():
+    """
+    Load FAISS and the embedding model ahead of the first query (startup hook).
+    """
+    import faiss  # noqa: F401
+    get_embedding_model()
+
+
+def get_index(project_id: int) -> "FaissIndex":
+    """
+    Cached FaissIndex for a project; the first call downloads it from storage.
+    A cached index picks up writes of other workers every INDEX_REFRESH_SECONDS.
+    """
+    # a hit never waits for a download: _CACHE_LOCK is not held during one
+    with _CACHE_LOCK:
+        index = _INDEX_CACHE.get(project_id)
+        if index is not None:
+            _INDEX_CACHE.move_to_end(project_id)
+    if index is not None:
+        index.refresh()
+        return index
+    with _CACHE_LOCK:
+        if project_id in _DELETED:
+            raise RuntimeError(f"Project {project_id} was deleted")
+        load_lock = _LOAD_LOCKS.setdefault(project_id, threading.Lock())
+    with load_lock:
+        index = _INDEX_CACHE.get(project_id)
+        if index is None:
+            index = FaissIndex(project_id)
+            with _CACHE_LOCK:
+                # deleted while it was loading: evict_index waits for this load
+                if project_id in _DELETED:
+                    raise RuntimeError(f"Project {project_id} was deleted")
+                _INDEX_CACHE[project_id] = index
+                while len(_INDEX_CACHE) > settings.INDEX_CACHE_SIZE:
+                    evicted, _ = _INDEX_CACHE.popitem(last=False)
+                    if evicted in _LOAD_LOCKS and not _LOAD_LOCKS[evicted].locked():
+                        del _LOAD_LOCKS[evicted]
+                CACHED_INDEXES.set(len(_INDEX_CACHE))
+        return index
+
+
+def index_state(project_id: int) -> str:
+    """State of a project's index in this worker: cached (warm), being loaded (loading) or neither (cold)."""
+    if project_id in _INDEX_CACHE:
+        return "warm"
+    load_lock = _LOAD_LOCKS.get(project_id)
+    return "loading" if load_lock is not None and load_lock.locked() else "cold"
+
+
+def evict_index(project_id: int):
+    """
+    Forget a deleted project's index. Blocks until a load of it that is in
+    flight has finished, so that load can't put it back in the cache.
+    """
+    with _CACHE_LOCK:
+        _DELETED.add(project_id)
+        load_lock = _LOAD_LOCKS.get(project_id)
+    if load_lock is not None:
+        with load_lock:
+            pass
+    with _CACHE_LOCK:
+        _INDEX_CACHE.pop(project_id, None)
+        _LOAD_LOCKS.pop(project_id, None)
+        CACHED_INDEXES.set(len(_INDEX_CACHE))
+    shutil.rmtree(f"project_{project_id}/", ignore_errors=True)
+
+
+class Segment(NamedTuple):
+    """
+    One immutable piece of a project index. `removed` holds the ids this
+    segment deleted or replaced in the segments before it; `masked` is the
+    union of the `removed` sets of every later segment, i.e. the ids whose
+    vectors in this segment are no longer live.
+    """
+    name: str
+    index: object  # faiss.IndexIDMap2
+    ids: object  # int64 array of the ids stored in `index`
+    removed: frozenset
+    masked: frozenset
+
+
+class IndexSnapshot(NamedTuple):
+    """A published version of a project index; never modified once published."""
+    version: int
+    segments: tuple
+
+
+def _new_index(dim: int, vectors=None, ids=None):
+    import faiss
+    import numpy as np
+    index = faiss.IndexIDMap2(faiss.IndexFlatL2(dim))
+    if ids is not None and len(ids):
+        index.add_with_ids(np.asarray(vectors, dtype="float32"), np.asarray(ids, dtype="int64"))
+    return index
+
+
+def _index_ids(index):
+    import faiss
+    return faiss.vector_to_array(index.id_map).astype("int64")
+
+
+def _manifest_name(version: int) -> str:
+    return f"manifest_{version:08d}.json"
+
+
+def _is_delta(name: str) -> bool:
+    return name.startswith("delta_")
+
+
+def _segment_names(manifest: dict) -> list:
+    return ([manifest["base"]] if manifest["base"] else []) + manifest["deltas"]
+
+
+def _with_masks(segments) -> tuple:
+    # mask every segment with the removals of the segments after it
+    masked = frozenset()
+    out = []
+    for segment in reversed(segments):
+        out.append(segment._replace(masked=masked))
+        masked |= segment.removed
+    return tuple(reversed(out))
 
 
 class FaissIndex:
     """
     Handles vector storage and retrieval for one project.
-    Each project has its own index files inside data/project_<id>/.
+    Vectors are stored under their chunk id (IndexIDMap2 over a flat L2
+    index), so search hits are chunk ids and chunks can be removed by id.
+
+    In storage a project index is a base segment plus append-only delta
+    segments (delta_<uuid>.npz), listed in order by a manifest. Each write
+    uploads one delta holding its new vectors and the ids it removes, so write
+    cost follows the size of the change. Searches fan out over all segments;
+    once there are too many deltas, or they grow large next to the base, a
+    background job merges them into a new base (base_<uuid>.bin).
+
+    Manifests are versioned and never overwritten: a write publishes
+    manifest_<version + 1>.json with an upload that fails if the object exists,
+    and on losing that race to another worker it syncs to the winner's
+    manifest and tries again. manifest.json mirrors the latest version so
+    loads usually start close to it.
+
+    Readers take no lock: a search works on the snapshot that was current
+    when it started. Writers of one project are serialized by its write lock,
+    build the next segment list and publish it as a new snapshot in a single
+    assignment, so other projects, and queries, are never blocked by them.
     """
     def __init__(self, project_id: int):
         self.project_id = project_id
-        self.model = SentenceTransformer(MODEL_NAME)
         self.dim = EMBED_DIM
 
         self.project_dir = f"project_{self.project_id}/"
         os.makedirs(self.project_dir, exist_ok=True)
 
-        self.index_file = os.path.join(self.project_dir, "faiss_index.bin")
-        self.meta_file = os.path.join(self.project_dir, "faiss_meta.pkl")
-
-        self.index = None
-        self.id_map = {}
-        self._load_or_init()
-
-    def _load_or_init(self):
-        bucket = "faiss-indexes"
-        base = self.project_dir
-
-        idx_bytes = supabase.storage.from_(bucket).download(f"{base}faiss_index.bin")
-        meta_bytes = supabase.storage.from_(bucket).download(f"{base}faiss_meta.pkl")
-
-        if idx_bytes and meta_bytes:
-            tmp = tempfile.TemporaryDirectory()
-            idx_path = os.path.join(tmp.name, "faiss_index.bin")
-            meta_path = os.path.join(tmp.name, "faiss_meta.pkl")
-
-            open(idx_path, "wb").write(idx_bytes)
-            open(meta_path, "wb").write(meta_bytes)
-
-            self.index = faiss.read_index(idx_path)
-            self.id_map = pickle.load(open(meta_path, "rb"))
-            self._next_id = max(self.id_map.keys()) + 1 if self.id_map else 0
-        else:
-            self.index = faiss.IndexFlatL2(self.dim)
-            self.id_map = {}
-            self._next_id = 0
-
-
-    def save(self):
-        with _LOCK:
-            with tempfile.TemporaryDirectory() as tmp:
-                idx_file = os.path.join(tmp, "faiss_index.bin")
-                meta_file = os.path.join(tmp, "faiss_meta.pkl")
-
-                faiss.write_index(self.index, idx_file)
-                with open(meta_file, "wb") as f:
-                    pickle.dump(self.id_map, f)
-
-                # upload to supabase storage
-                bucket = "faiss-indexes"
-                supabase.storage.from_(bucket).upload(
-                    f"{self.project_dir}faiss_index.bin",
-                    open(idx_file, "rb"),
-                    file_options={"upsert": True},
-                )
-                supabase.storage.from_(bucket).upload(
-                    f"{self.project_dir}faiss_meta.pkl",
-                    open(meta_file, "rb"),
-                    file_options={"upsert": True},
-                )
+        self.snapshot = IndexSnapshot(0, ())
+        # the stored manifest the snapshot reflects; None until loaded
+        self.manifest = None
+        self._write_lock = threading.Lock()
+        self._compaction_scheduled = False
+        self._checked_at = time.monotonic()
+        with observe(INDEX_LOAD_SECONDS):
+            self._sync()
+        if self.segments:
+            logger.info("Loaded index for project %s (%d vectors, %d segments)", self.project_id, self.ntotal, len(self.segments))
+
+    @property
+    def model(self):
+        return get_embedding_model()
+
+    @property
+    def segments(self) -> tuple:
+        return self.snapshot.segments
+
+    def _publish(self, segments: tuple):
+        self.snapshot = IndexSnapshot(self.snapshot.version + 1, segments)
+
+    @property
+    def storage(self):
+        return get_supabase().storage.from_(BUCKET)
+
+    @property
+    def ntotal(self) -> int:
+        """Stored vectors, including ones masked by later segments until compaction."""
+        return sum(segment.index.ntotal for segment in self.segments)
+
+    def _download(self, name: str):
+        try:
+            return self.storage.download(f"{self.project_dir}{name}")
+        except Exception:
+            # storage raises for missing objects: project not indexed yet
+            return None
+
+    def _read_manifest(self, name: str):
+        data = self._download(name)
+        return json.loads(data) if data else None
+
+    def _latest_manifest(self, start: dict = None) -> dict:
+        """
+        Newest stored manifest: from `start` (else manifest.json) follow
+        manifest_<version + 1> until there is none. Versions are never
+        removed, so this ends at the last one published.
+        """
+        manifest = start or self._read_manifest(MANIFEST_NAME) or {"base": BASE_NAME, "deltas": []}
+        # manifests written before versioning count as version 0
+        manifest.setdefault("version", 0)
+        while True:
+            newer = self._read_manifest(_manifest_name(manifest["version"] + 1))
+            if newer is None:
+                return manifest
+            manifest = newer
+
+    def _load_segment(self, name: str):
+        import faiss
+        import numpy as np
+        data = self._download(name)
+        if data is None:
+            return None
+        if not _is_delta(name):
+            index = faiss.deserialize_index(np.frombuffer(data, dtype="uint8"))
+            if not isinstance(index, faiss.IndexIDMap2):
+                index = self._convert_legacy(index)
+            return Segment(name, index, _index_ids(index), frozenset(), frozenset())
+        with np.load(io.BytesIO(data), allow_pickle=False) as arrays:
+            index = faiss.deserialize_index(arrays["index"])
+            return Segment(name, index, _index_ids(index), frozenset(arrays["removed"].tolist()), frozenset())
+
+    def _segments_for(self, manifest: dict, *new_segments):
+        """
+        Segments listed by `manifest`, reusing loaded ones. None if one of them
+        is gone from storage: a compaction replaced it after the manifest was read.
+        """
+        known = {segment.name: segment for segment in self.segments + new_segments}
+        segments = []
+        for name in _segment_names(manifest):
+            segment = known.get(name) or self._load_segment(name)
+            if segment is None:
+                if name == manifest["base"] and manifest["version"] == 0:
+                    continue  # no manifest yet and no base: project not indexed yet
+                return None
+            segments.append(segment)
+        return _with_masks(segments)
+
+    def _install(self, manifest: dict, segments: tuple):
+        if manifest["base"] and not (segments and segments[0].name == manifest["base"]):
+            manifest = {**manifest, "base": None}
+        self.manifest = manifest
+        self._publish(segments)
+
+    def _sync(self) -> bool:
+        """
+        Bring the snapshot up to the newest stored manifest, downloading only
+        segments it doesn't have. Returns whether it changed. Caller holds the
+        write lock (or is __init__).
+        """
+        latest = self._latest_manifest(self.manifest)
+        for _ in range(MAX_MANIFEST_ATTEMPTS):
+            if self.manifest is not None and latest["version"] == self.manifest["version"]:
+                return False
+            segments = self._segments_for(latest)
+            if segments is not None:
+                self._install(latest, segments)
+                return True
+            # compacted meanwhile; the newer manifest is already published
+            latest = self._latest_manifest(latest)
+        raise RuntimeError(f"Index of project {self.project_id} changed during {MAX_MANIFEST_ATTEMPTS} load attempts")
+
+    def refresh(self):
+        """
+        Sync with the stored manifest if it was last checked over
+        INDEX_REFRESH_SECONDS ago. Skipped while this worker is writing the
+        index, as the write syncs anyway; on storage errors the loaded
+        snapshot keeps being served.
+        """
+        if time.monotonic() - self._checked_at < settings.INDEX_REFRESH_SECONDS:
+            return
+        if not self._write_lock.acquire(blocking=False):
+            return
+        try:
+            self._checked_at = time.monotonic()
+            self._sync()
+        except Exception:
+            logger.warning("Refreshing the index of project %s failed", self.project_id, exc_info=True)
+        finally:
+            self._write_lock.release()
+
+    def _put_manifest(self, manifest: dict) -> bool:
+        """
+        Publish `manifest` as its version. False if that version exists:
+        storage refuses to overwrite an object uploaded without upsert, which
+        makes this a compare-and-swap on the version.
+        """
+        data = json.dumps(manifest).encode("utf-8")
+        try:
+            self.storage.upload(f"{self.project_dir}{_manifest_name(manifest['version'])}", data, file_options={"upsert": False})
+        except Exception:
+            return False
+        try:
+            self.storage.upload(f"{self.project_dir}{MANIFEST_NAME}", data, file_options={"upsert": True})
+        except Exception:
+            # only a starting point for loads; they follow newer versions anyway
+            logger.warning("Could not update %s of project %s", MANIFEST_NAME, self.project_id, exc_info=True)
+        return True
+
+    def _commit(self, change, *new_segments):
+        """
+        Publish change(latest manifest) as the next manifest version, syncing
+        and retrying while other workers publish first; `new_segments` are the
+        segments it adds. Returns the published manifest, or None when
+        `change` returns None. Caller holds the write lock.
+        """
+        for _ in range(MAX_MANIFEST_ATTEMPTS):
+            self._sync()
+            manifest = change(self.manifest)
+            if manifest is None:
+                return None
+            manifest = {**manifest, "version": self.manifest["version"] + 1}
+            if self._put_manifest(manifest):
+                self._install(manifest, self._segments_for(manifest, *new_segments))
+                return manifest
+        raise RuntimeError(f"Could not publish index of project {self.project_id} in {MAX_MANIFEST_ATTEMPTS} attempts")
+
+    def _convert_legacy(self, flat):
+        """
+        Indexes written before chunk ids were stored natively: positional
+        vectors plus a pickled {position: chunk id} dict. Rebuilt once, keyed
+        by chunk id, and saved back without the pickle.
+        """
+        import numpy as np
+        meta_path = f"{self.project_dir}faiss_meta.pkl"
+        try:
+            id_map = pickle.loads(self.storage.download(meta_path))
+        except Exception:
+            id_map = {}
+
+        positions = np.array(sorted(pos for pos in id_map if pos < flat.ntotal), dtype="int64")
+        vectors = flat.reconstruct_n(0, flat.ntotal)[positions] if len(positions) else None
+        index = _new_index(self.dim, vectors, [id_map[int(pos)] for pos in positions])
+        self._upload_base(index, BASE_NAME)
+        self.storage.remove([meta_path])
+        logger.info("Converted legacy index of project %s (%d vectors)", self.project_id, index.ntotal)
+        return index
+
+    def _upload_base(self, index, name: str):
+        import faiss
+        self.storage.upload(
+            f"{self.project_dir}{name}", faiss.serialize_index(index).tobytes(), file_options={"upsert": True},
+        )
+
+    def _append_delta(self, vectors, ids, removed):
+        """
+        Persist one write as a delta segment and publish it; caller holds the
+        write lock. The delta object goes up before the manifest that lists
+        it, so a reader never sees a manifest pointing at a missing segment.
+        """
+        import faiss
+        import numpy as np
+        removed = frozenset(int(i) for i in removed)
+        index = _new_index(self.dim, vectors, ids)
+        name = f"delta_{uuid4().hex}.npz"
+        buf = io.BytesIO()
+        np.savez(buf, index=faiss.serialize_index(index), removed=np.array(sorted(removed), dtype="int64"))
+        self.storage.upload(f"{self.project_dir}{name}", buf.getvalue(), file_options={"upsert": True})
+
+        segment = Segment(name, index, _index_ids(index), removed, frozenset())
+        self._commit(lambda manifest: {**manifest, "deltas": manifest["deltas"] + [name]}, segment)
+        self._maybe_schedule_compaction()
+
+    def _live_ids(self, chunk_ids) -> set:
+        import numpy as np
+        wanted = np.unique(np.asarray(chunk_ids, dtype="int64"))
+        live = set()
+        for segment in self.segments:
+            for chunk_id in wanted[np.isin(wanted, segment.ids)].tolist():
+                if chunk_id not in segment.masked:
+                    live.add(chunk_id)
+        return live
 
     def add_vectors(self, texts, chunk_ids):
         """
         texts: list[str], chunk_ids: list[int]
-        returns list of vector ids assigned
+        Vectors are stored under their chunk ids, which are returned as the vector ids.
+        Ids that already have a vector are replaced.
         """
-        with _LOCK:
-            print(f"[Project {self.project_id}] Adding {len(texts)} vectors...")
+        import numpy as np
+        logger.debug("[Project %s] Adding %d vectors", self.project_id, len(texts))
+        # encoding needs no lock; only publishing the segment is serialized
+        with observe(EMBEDDING_SECONDS, "add"):
             embs = self.model.encode(texts, show_progress_bar=False, convert_to_numpy=True)
-            if embs.ndim == 1:
-                embs = embs.reshape(1, -1)
+        if embs.ndim == 1:
+            embs = embs.reshape(1, -1)
+
+        ids = np.asarray(chunk_ids, dtype="int64")
+        with self._write_lock:
+            self._sync()
+            # only ids that already have a vector need masking in older segments
+            self._append_delta(embs, ids, removed=self._live_ids(ids))
+        return ids.tolist()
 
-            n = embs.shape[0]
-            self.index.add(np.asarray(embs).astype("float32"))
+    def remove_ids(self, chunk_ids) -> int:
+        """Drop the vectors of deleted / re-chunked chunks; returns how many were removed."""
+        if not len(chunk_ids):
+            return 0
+        with self._write_lock:
+            self._sync()
+            live = self._live_ids(chunk_ids)
+            if live:
+                self._append_delta(None, None, removed=live)
+            return len(live)
 
-            base = self.index.ntotal - n
-            vector_ids = []
-            for i, cid in enumerate(chunk_ids):
-                vec_id = base + i
-                self.id_map[vec_id] = cid
-                vector_ids.append(vec_id)
-                print(f"[Project {self.project_id}] Mapped chunk {cid} -> vector {vec_id}")
+    def _maybe_schedule_compaction(self):
+        # caller holds the write lock
+        deltas = [segment for segment in self.segments if _is_delta(segment.name)]
+        if not deltas or self._compaction_scheduled:
+            return
+        base_size = self.segments[0].index.ntotal if not _is_delta(self.segments[0].name) else 0
+        delta_size = sum(segment.index.ntotal + len(segment.removed) for segment in deltas)
+        if len(deltas) >= settings.INDEX_MAX_DELTA_SEGMENTS or delta_size > settings.INDEX_COMPACT_RATIO * base_size:
+            self._compaction_scheduled = True
+            _COMPACTOR.submit(self.compact)
+
+    def compact(self):
+        """
+        Merge the current segments into a new base and drop their objects.
+        Runs off the write path: writes made while merging, here or on other
+        workers, stay deltas on top of the new base. If another worker
+        compacted these segments first, its base wins and ours is dropped.
+        """
+        import numpy as np
+        if _INDEX_CACHE.get(self.project_id) is not self:
+            # evicted (dropped from the cache or project deleted) since it was
+            # scheduled; stays marked so it isn't rescheduled
+            return
+        try:
+            segments = self.snapshot.segments
+            merged_names = [segment.name for segment in segments]
+            with observe(INDEX_COMPACTION_SECONDS):
+                vectors, ids = [], []
+                for segment in segments:
+                    if not segment.index.ntotal:
+                        continue
+                    keep = ~np.isin(segment.ids, np.fromiter(segment.masked, dtype="int64", count=len(segment.masked)))
+                    vectors.append(segment.index.index.reconstruct_n(0, segment.index.ntotal)[keep])
+                    ids.append(segment.ids[keep])
+                base = _new_index(self.dim, np.concatenate(vectors) if vectors else None, np.concatenate(ids) if ids else None)
+                base_name = f"base_{uuid4().hex}.bin"
+                self._upload_base(base, base_name)
 
-            self.save()
-            return vector_ids
+            def replace_merged(manifest):
+                names = _segment_names(manifest)
+                if names[:len(merged_names)] != merged_names:
+                    return None
+                return {**manifest, "base": base_name, "deltas": names[len(merged_names):]}
+
+            with self._write_lock:
+                published = self._commit(replace_merged, Segment(base_name, base, _index_ids(base), frozenset(), frozenset()))
+            # loads that read an older manifest meanwhile retry from the newest one
+            self.storage.remove([f"{self.project_dir}{name}" for name in (merged_names if published else [base_name])])
+            if published:
+                logger.info(
+                    "Compacted index of project %s: %d segments into %d vectors", self.project_id, len(segments), base.ntotal,
+                )
+        except Exception:
+            logger.exception("Compaction of project %s index failed", self.project_id)
+        finally:
+            with self._write_lock:
+                self._compaction_scheduled = False
+                # writes made while merging may have crossed the thresholds again
+                self._maybe_schedule_compaction()
 
     def query(self, text, top_k=5):
-        print(f"[Project {self.project_id}] Querying top {top_k} results...")
-        emb = self.model.encode([text], convert_to_numpy=True)
-        D, I = self.index.search(np.asarray(emb).astype("float32"), top_k)
-
-        results = []
-        for dist, idx in zip(D[0], I[0]):
-            if idx == -1:
-                continue
-            chunk_id = self.id_map.get(int(idx))
-            if chunk_id is not None:
-                results.append({"chunk_id": chunk_id, "distance": float(dist)})
-        print(f"[Project {self.project_id}] Query results: {results}")
+        return self.search(embed_query(text), top_k=top_k)
+
+    def search(self, emb, top_k=5):
+        """Nearest chunks for an already embedded query (see embed_query)."""
+        hits = []
+        snapshot = self.snapshot
+        with observe(FAISS_SEARCH_SECONDS):
+            for segment in snapshot.segments:
+                if not segment.index.ntotal:
+                    continue
+                # over-fetch by the masked ids so top_k live hits remain
+                k = min(segment.index.ntotal, top_k + len(segment.masked))
+                D, I = segment.index.search(emb, k)
+                hits.extend(
+                    (float(dist), int(chunk_id))
+                    for dist, chunk_id in zip(D[0], I[0]) if chunk_id != -1 and int(chunk_id) not in segment.masked
+                )
+        hits.sort()
+
+        results = [{"chunk_id": chunk_id, "distance": dist} for dist, chunk_id in hits[:top_k]]
+        logger.debug("[Project %s] Query on version %d returned %d results", self.project_id, snapshot.version, len(results))
         return results
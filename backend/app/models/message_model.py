@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Text, Enum
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, String, Text, Enum
 from sqlalchemy.orm import relationship
 import enum
 from app.database import Base
@@ -11,10 +11,15 @@ class SenderType(str, enum.Enum):
 class Message(Base):
     __tablename__ = "messages"
     id = Column(Integer, primary_key=True, index=True)
-    session_id = Column(Integer, ForeignKey("sessions.id"), nullable=False)
+    session_id = Column(Integer, ForeignKey("sessions.id", ondelete="CASCADE"), nullable=False)
     sender_type = Column(Enum(SenderType), nullable=False, default=SenderType.user)
     content = Column(Text, nullable=False)
     model_used = Column(String(50), nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
-    session = relationship("SessionInstance", back_populates="messages")
\ No newline at end of file
+    session = relationship("SessionInstance", back_populates="messages")
+
+    __table_args__ = (
+        # history: WHERE session_id = ? ORDER BY created_at, id (keyset pages)
+        Index("ix_messages_session_id_created_at_id", "session_id", "created_at", "id"),
+    )
\ No newline at end of file
@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Text
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, LargeBinary, String, Text
 from sqlalchemy.orm import relationship
 from app.database import Base
 
@@ -7,58 +7,81 @@ from app.database import Base
 class Project(Base):
     __tablename__ = "projects"
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     name = Column(String(255), nullable=False)
     source_type = Column(String(50), nullable=False)  # 'zip' or 'git'
     repo_url = Column(String(1024), nullable=True)
     source_url  = Column(String(1024), nullable=True)
+    source_commit = Column(String(40), nullable=True)  # git projects: commit last cloned / refreshed
     created_at = Column(DateTime, default=datetime.utcnow)
 
-    files = relationship("FileStore", back_populates="project", cascade="all, delete")
-    sessions = relationship("SessionInstance", back_populates="project", cascade="all, delete")
+    files = relationship("FileStore", back_populates="project", cascade="all, delete", passive_deletes=True)
+    sessions = relationship("SessionInstance", back_populates="project", cascade="all, delete", passive_deletes=True)
 
 class SessionInstance(Base):
     __tablename__ = "sessions"
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    project_id = Column(Integer, ForeignKey("projects.id"), nullable=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=True)
     title = Column(String(255), nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
-    messages = relationship("Message", back_populates="session", cascade="all, delete")
+    messages = relationship("Message", back_populates="session", cascade="all, delete", passive_deletes=True)
     user = relationship("User", back_populates="sessions")
     project = relationship("Project", back_populates="sessions")
 
+    __table_args__ = (
+        # sidebar: WHERE user_id = ? ORDER BY created_at DESC, id DESC
+        Index("ix_sessions_user_id_created_at_id", "user_id", "created_at", "id"),
+        # project home: WHERE user_id = ? AND project_id = ? ORDER BY created_at DESC, id DESC
+        Index("ix_sessions_project_id_user_id_created_at_id", "project_id", "user_id", "created_at", "id"),
+    )
+
 
 class FileStore(Base):
     __tablename__ = "files"
     id = Column(Integer, primary_key=True, index=True)
-    project_id = Column(Integer, ForeignKey("projects.id"), nullable=False)
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False, index=True)
     path = Column(String(1024), nullable=False)
-    content = Column(Text, nullable=True)
-    content_hash = Column(String(64), nullable=True)
+    content = Column(Text, nullable=True)  # legacy rows only; new files live in blobs
+    content_hash = Column(String(64), nullable=True, index=True)  # sha256, key into blobs
     size = Column(Integer, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
     project = relationship("Project", back_populates="files")
-    chunks = relationship("Chunk", back_populates="file", cascade="all, delete")
+    chunks = relationship("Chunk", back_populates="file", cascade="all, delete", passive_deletes=True)
+
+class Blob(Base):
+    """
+    Content-addressed, zstd compressed file contents shared by every project
+    that contains an identical file.
+    """
+    __tablename__ = "blobs"
+    hash = Column(String(64), primary_key=True)  # sha256 of the uncompressed bytes
+    size = Column(Integer, nullable=False)
+    compressed_size = Column(Integer, nullable=False)
+    data = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
 
 class Chunk(Base):
     __tablename__ = "chunks"
     id = Column(Integer, primary_key=True, index=True)
-    file_id = Column(Integer, ForeignKey("files.id"), nullable=False)
+    file_id = Column(Integer, ForeignKey("files.id", ondelete="CASCADE"), nullable=False, index=True)
     start_line = Column(Integer, nullable=True)
     end_line = Column(Integer, nullable=True)
-    text = Column(Text, nullable=False)
+    # byte range into the file's blob; text is only set on legacy rows
+    start_byte = Column(Integer, nullable=True)
+    end_byte = Column(Integer, nullable=True)
+    text = Column(Text, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
     file = relationship("FileStore", back_populates="chunks")
-    embedding = relationship("Embedding", back_populates="chunk", uselist=False, cascade="all, delete")
+    embedding = relationship("Embedding", back_populates="chunk", uselist=False, cascade="all, delete", passive_deletes=True)
 
 class Embedding(Base):
     __tablename__ = "embeddings"
     id = Column(Integer, primary_key=True, index=True)
-    chunk_id = Column(Integer, ForeignKey("chunks.id"), nullable=False, unique=True)
+    chunk_id = Column(Integer, ForeignKey("chunks.id", ondelete="CASCADE"), nullable=False, unique=True)
     vector_id = Column(Integer, nullable=False)  # id in FAISS index
     created_at = Column(DateTime, default=datetime.utcnow)
 
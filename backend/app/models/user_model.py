@@ -12,7 +12,7 @@ class User(Base):
     email = Column(String(120), unique=True, index=True, nullable=False)
     hashed_password = Column(String(255), nullable=False)
 
-    sessions = relationship("SessionInstance", back_populates="user", cascade="all, delete")
+    sessions = relationship("SessionInstance", back_populates="user", cascade="all, delete", passive_deletes=True)
 
 
 
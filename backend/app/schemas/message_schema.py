@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 from pydantic import BaseModel
 from enum import Enum
 
@@ -19,6 +19,8 @@ class MessageBase(BaseModel):
 class MessageCreate(MessageBase):
     sender_type: SenderType
     session_id: int
+    # extra projects to pull context from, on top of the session's own project
+    project_ids: Optional[List[int]] = None
 
 class MessageOut(MessageBase):
     id: int
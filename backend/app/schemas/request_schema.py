@@ -1,5 +1,12 @@
+from typing import Annotated, List
 from pydantic import BaseModel, Field
 
+PromptText = Annotated[str, Field(min_length=3, max_length=2000)]
+
 class CodePrompt(BaseModel):
-    prompt: str = Field(..., min_length=3, max_length=2000, description="Prompt or code snippet for AI processing")
+    prompt: PromptText = Field(..., description="Prompt or code snippet for AI processing")
+    model: str | None = Field(default="ollama", description="Optional model name (ollama, openai, etc.)")
+
+class CodePromptBatch(BaseModel):
+    prompts: List[PromptText] = Field(..., min_length=1, max_length=64, description="Prompts or code snippets, answered independently")
     model: str | None = Field(default="ollama", description="Optional model name (ollama, openai, etc.)")
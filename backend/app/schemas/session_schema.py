@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List
 from datetime import datetime
 from app.schemas.message_schema import MessageOut
@@ -41,10 +41,29 @@ class SessionInstanceOut(SessionInstanceBase):
     class Config:
         from_attributes = True
 
+class SessionSummaryOut(BaseModel):
+    # list projection: no message bodies, counts computed in SQL
+    id: int
+    user_id: int
+    title: Optional[str] = None
+    project_id: Optional[int] = None
+    project_name: Optional[str] = None
+    created_at: datetime
+    last_activity: datetime
+    message_count: int = 0
+
+    class Config:
+        from_attributes = True
+
 class MessageSessionOut(BaseModel):
     ai_message: MessageOut
-    session: SessionInstanceOut
+    session: SessionSummaryOut
 
 class ProjectClone(BaseModel):
     repo_url: str
-    project_name: str
\ No newline at end of file
+    project_name: str
+
+class ProjectSearch(BaseModel):
+    query: str
+    project_ids: Optional[List[int]] = None  # default: every project of the user
+    top_k: int = Field(5, ge=1, le=50)
@@ -0,0 +1,183 @@
+# app/services/admission.py
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from fastapi import HTTPException, Request
+from app.core.config import settings
+from app.core.metrics import ADMISSION_REJECTED, GENERATION_QUEUE_WAIT_SECONDS, GENERATIONS_ACTIVE, QUEUE_DEPTH
+from app.core.security import verify_token
+
+# Admission control for the generation endpoints. At most `concurrency`
+# generations run at once; the rest wait in per-user FIFO queues that are
+# served round-robin, so one user looping requests only ever competes for
+# their own turn. Each user also has a token bucket. Requests that cannot be
+# served soon are shed immediately with 429 + Retry-After rather than waiting
+# on the LLM's 300 s timeout. State is per worker process.
+
+QUEUE_NAME = "generation"
+
+
+class TokenBucket:
+    def __init__(self, rate_per_second: float, burst: int):
+        self.rate = rate_per_second
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self) -> float:
+        """Take a token; returns 0 on success, else the seconds until one is available."""
+        now = time.monotonic()
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate if self.rate > 0 else math.inf
+
+    def full(self) -> bool:
+        self._refill(time.monotonic())
+        return self.tokens >= self.burst
+
+
+class AdmissionController:
+    MAX_BUCKETS = 4096
+
+    def __init__(self, concurrency: int, queue_limit: int, user_queue_limit: int, queue_timeout: float,
+                 rate_per_minute: float, burst: int):
+        self.concurrency = concurrency
+        self.queue_limit = queue_limit
+        self.user_queue_limit = user_queue_limit
+        self.queue_timeout = queue_timeout
+        self.rate = rate_per_minute / 60
+        self.burst = burst
+
+        self.active = 0
+        self.queued = 0
+        # user key -> waiting futures; dict order is the round-robin order
+        self.waiting = OrderedDict()
+        self.buckets = {}
+        # moving average of slot hold time, for Retry-After estimates
+        self.avg_service = 5.0
+
+    def _reject(self, reason: str, retry_after: float):
+        ADMISSION_REJECTED.labels(reason).inc()
+        retry_after = max(1, math.ceil(min(retry_after, 3600)))
+        raise HTTPException(
+            status_code=429,
+            detail=f"Too many generation requests ({reason}), retry later",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+    def _queue_retry_after(self) -> float:
+        return self.avg_service * (self.queued + 1) / self.concurrency
+
+    def _bucket(self, key: str) -> TokenBucket:
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            if len(self.buckets) >= self.MAX_BUCKETS:
+                # full buckets carry no state worth keeping
+                self.buckets = {k: b for k, b in self.buckets.items() if not b.full()}
+            bucket = self.buckets[key] = TokenBucket(self.rate, self.burst)
+        return bucket
+
+    def _update_gauges(self):
+        QUEUE_DEPTH.labels(QUEUE_NAME).set(self.queued)
+        GENERATIONS_ACTIVE.set(self.active)
+
+    def _dispatch(self):
+        while self.active < self.concurrency and self.waiting:
+            key, queue = self.waiting.popitem(last=False)
+            waiter = queue.popleft()
+            self.queued -= 1
+            if queue:
+                # served users go to the back of the rotation
+                self.waiting[key] = queue
+            if waiter.done():
+                # gave up (timeout / client went away) before its turn
+                continue
+            self.active += 1
+            waiter.set_result(None)
+        self._update_gauges()
+
+    def _forget(self, key: str, waiter):
+        queue = self.waiting.get(key)
+        if queue is not None and waiter in queue:
+            queue.remove(waiter)
+            self.queued -= 1
+            if not queue:
+                del self.waiting[key]
+        self._update_gauges()
+
+    async def acquire(self, key: str):
+        if self.queued >= self.queue_limit:
+            self._reject("queue_full", self._queue_retry_after())
+        if len(self.waiting.get(key, ())) >= self.user_queue_limit:
+            self._reject("user_queue_full", self._queue_retry_after())
+        wait = self._bucket(key).take()
+        if wait:
+            self._reject("rate_limited", wait)
+
+        if self.active < self.concurrency and not self.queued:
+            self.active += 1
+            self._update_gauges()
+            GENERATION_QUEUE_WAIT_SECONDS.observe(0)
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiting.setdefault(key, deque()).append(waiter)
+        self.queued += 1
+        self._update_gauges()
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # the slot was handed over just as we gave up
+                self.release()
+            else:
+                self._forget(key, waiter)
+            if isinstance(e, asyncio.TimeoutError):
+                self._reject("timeout", self._queue_retry_after())
+            raise
+        GENERATION_QUEUE_WAIT_SECONDS.observe(time.perf_counter() - start)
+
+    def release(self, held_for: float = None):
+        self.active -= 1
+        if held_for is not None:
+            self.avg_service = 0.8 * self.avg_service + 0.2 * held_for
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, key: str):
+        """Hold a generation slot for `key`; raises HTTPException(429) when shed."""
+        await self.acquire(key)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(time.perf_counter() - start)
+
+
+def client_key(request: Request) -> str:
+    """Fairness key: the authenticated user when a bearer token is sent, else the client address."""
+    auth = request.headers.get("authorization", "")
+    if auth.lower().startswith("bearer "):
+        username = verify_token(auth[7:])
+        if username:
+            return f"user:{username}"
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+generation_admission = AdmissionController(
+    concurrency=settings.GENERATION_CONCURRENCY,
+    queue_limit=settings.GENERATION_QUEUE_LIMIT,
+    user_queue_limit=settings.GENERATION_USER_QUEUE_LIMIT,
+    queue_timeout=settings.GENERATION_QUEUE_TIMEOUT_SECONDS,
+    rate_per_minute=settings.GENERATION_RATE_PER_MINUTE,
+    burst=settings.GENERATION_BURST,
+)
@@ -1,9 +1,58 @@
-from typing import List
-from app.services.llm_factory import LLMFactory
+import asyncio
+from contextlib import nullcontext
+from typing import AsyncContextManager, AsyncIterator, Callable, List, Optional, Tuple
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+from app.services.llm_factory import LLMError, LLMFactory
+
+def code_prompt_messages(prompt: str) -> List[dict]:
+    """Chat message list for a single code prompt, as every provider expects."""
+    return [{"role": "user", "content": prompt}]
 
 def generate_code_suggestion(messages: List[dict], model: str = "ollama") -> str:
     """
     Delegates to the appropriate LLM backend based on the selected model.
+    Raises LLMError when the provider fails or the model is unknown.
+    """
+    return LLMFactory.generate(messages, model)
+
+async def generate_code_suggestions(
+    prompts: List[str],
+    model: str,
+    concurrency: int,
+    admit: Callable[[], AsyncContextManager] = nullcontext,
+) -> AsyncIterator[Tuple[List[int], Optional[str], Optional[str]]]:
     """
-    result = LLMFactory.generate_response(messages, model)
-    return result
+    Answers every distinct prompt once, at most `concurrency` at a time, and
+    yields (positions of that prompt in `prompts`, suggestion, error) as each
+    finishes; exactly one of suggestion and error is set. Each generation runs
+    inside `admit()`, e.g. an admission slot, which may shed it with an
+    HTTPException.
+    """
+    positions = {}
+    for i, prompt in enumerate(prompts):
+        positions.setdefault(prompt, []).append(i)
+    limit = asyncio.Semaphore(concurrency)
+
+    async def run(prompt: str):
+        async with limit:
+            try:
+                async with admit():
+                    suggestion = await run_in_threadpool(generate_code_suggestion, code_prompt_messages(prompt), model)
+                return prompt, suggestion, None
+            except HTTPException as e:
+                return prompt, None, e.detail
+            except LLMError as e:
+                return prompt, None, str(e)
+            except Exception as e:
+                return prompt, None, f"Error generating response: {e}"
+
+    tasks = [asyncio.ensure_future(run(prompt)) for prompt in positions]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            prompt, suggestion, error = await next_done
+            yield positions[prompt], suggestion, error
+    finally:
+        # client went away: don't start the prompts still waiting for a turn
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,273 @@
+# app/services/blob_store.py
+import mmap
+import os
+import tempfile
+import threading
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from hashlib import sha256
+from typing import Iterable
+import zstandard
+from sqlalchemy import delete, exists, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.models.session_model import Blob, Chunk, FileStore
+
+# decompressed copies of the blobs this worker has read, mmapped for slicing
+BLOB_DIR = os.path.join(os.getcwd(), "data", "blobs")
+ZSTD_LEVEL = 3
+MAX_OPEN_BLOBS = 256
+
+
+def blob_hash(data: bytes) -> str:
+    return sha256(data).hexdigest()
+
+
+class LocalBlobCache:
+    """
+    Worker-local cache of decompressed blobs.
+    Each blob is one file under BLOB_DIR; reads go through a bounded set of
+    open mmaps so chunk slices never load the whole file. Files beyond
+    max_bytes are removed least recently used first (the total is tracked per
+    process, starting from what is on disk at the first access), except the
+    ones a caller has pinned while it reads them.
+    """
+    def __init__(self, root: str = BLOB_DIR, max_open: int = MAX_OPEN_BLOBS, max_bytes: int = settings.BLOB_CACHE_MAX_BYTES):
+        self.root = root
+        self.max_open = max_open
+        self.max_bytes = max_bytes
+        self._maps = OrderedDict()
+        self._lock = threading.Lock()
+        # digest -> file size, least recently used first; None until the first access scans root
+        self._files = None
+        self._bytes = 0
+        # digest -> number of callers between ensure_local and their last view
+        self._pins = Counter()
+
+    def path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest)
+
+    def _scan(self):
+        # called with _lock held
+        if self._files is not None:
+            return
+        found = []
+        if os.path.isdir(self.root):
+            for entry in os.scandir(self.root):
+                if entry.is_dir():
+                    for blob in os.scandir(entry.path):
+                        if blob.is_file() and not blob.name.startswith("tmp"):
+                            stat = blob.stat()
+                            found.append((stat.st_mtime, blob.name, stat.st_size))
+        self._files = OrderedDict((digest, size) for _, digest, size in sorted(found))
+        self._bytes = sum(self._files.values())
+
+    def _touch(self, digest: str):
+        with self._lock:
+            self._scan()
+            if digest in self._files:
+                self._files.move_to_end(digest)
+
+    def _added(self, digest: str, size: int):
+        with self._lock:
+            self._scan()
+            if digest in self._files:
+                self._files.move_to_end(digest)
+                return
+            self._files[digest] = size
+            self._bytes += size
+            victims = self._shrink(keep=digest)
+        for victim in victims:
+            self._remove(victim)
+
+    def _shrink(self, keep: str = None) -> list:
+        # called with _lock held; pinned blobs stay, even if that means going over max_bytes for a while
+        victims = []
+        for victim in list(self._files):
+            if self._bytes <= self.max_bytes:
+                break
+            if victim == keep or victim in self._pins:
+                continue
+            self._bytes -= self._files.pop(victim)
+            self._maps.pop(victim, None)
+            victims.append(victim)
+        return victims
+
+    @contextmanager
+    def pinned(self, digests: Iterable[str]):
+        """
+        Keep these blobs from being evicted until the block ends, so a caller
+        can fetch a set with ensure_local and then read all of them.
+        """
+        digests = [d for d in set(digests) if d]
+        with self._lock:
+            self._pins.update(digests)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._pins.subtract(digests)
+                self._pins += Counter()  # drop the zero counts
+                victims = self._shrink() if self._files is not None else []
+            for victim in victims:
+                self._remove(victim)
+
+    def _remove(self, digest: str):
+        # open maps of the file stay readable after the unlink
+        try:
+            os.remove(self.path(digest))
+        except FileNotFoundError:
+            pass
+
+    def has(self, digest: str) -> bool:
+        if os.path.exists(self.path(digest)):
+            self._touch(digest)
+            return True
+        return False
+
+    def store(self, digest: str, data: bytes):
+        path = self.path(digest)
+        if os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # write + rename so concurrent readers never see a partial file
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        self._added(digest, len(data))
+
+    def store_compressed(self, digest: str, compressed: bytes):
+        if not self.has(digest):
+            self.store(digest, zstandard.ZstdDecompressor().decompress(compressed))
+
+    def view(self, digest: str) -> memoryview:
+        with self._lock:
+            self._scan()
+            if digest in self._files:
+                self._files.move_to_end(digest)
+            mapped = self._maps.get(digest)
+            if mapped is not None:
+                self._maps.move_to_end(digest)
+                return memoryview(mapped)
+            with open(self.path(digest), "rb") as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    return memoryview(b"")
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._maps[digest] = mapped
+            if len(self._maps) > self.max_open:
+                # closing is left to GC: slices handed out earlier may still reference the map
+                self._maps.popitem(last=False)
+            return memoryview(mapped)
+
+    def read_text(self, digest: str, start: int = 0, end: int = None) -> str:
+        return str(self.view(digest)[start:end], "utf-8", errors="ignore")
+
+    def evict(self, digest: str):
+        with self._lock:
+            self._maps.pop(digest, None)
+            if self._files is not None and digest in self._files:
+                self._bytes -= self._files.pop(digest)
+        self._remove(digest)
+
+
+blob_cache = LocalBlobCache()
+
+
+def _lock_blob(db: Session, digest: str) -> bool:
+    """
+    Lock an existing blob row until the caller commits, so delete_orphan_blobs
+    can't drop it before the file row that references it is visible.
+    Returns whether the row exists.
+    """
+    if db.get_bind().dialect.name == "sqlite":
+        # no row locks: a no-op write takes the database write lock instead
+        return db.execute(update(Blob).where(Blob.hash == digest).values(size=Blob.size)).rowcount == 1
+    return db.execute(select(Blob.hash).where(Blob.hash == digest).with_for_update(read=True)).first() is not None
+
+
+def put_blob(db: Session, data: bytes) -> str:
+    """
+    Store `data` once, keyed by its sha256; identical files across projects share the row.
+    Returns the hash. The caller commits.
+    """
+    digest = blob_hash(data)
+    if not _lock_blob(db, digest):
+        compressed = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+        try:
+            with db.begin_nested():
+                db.add(Blob(hash=digest, size=len(data), compressed_size=len(compressed), data=compressed))
+        except IntegrityError:
+            pass  # stored concurrently by another ingest
+    blob_cache.store(digest, data)
+    return digest
+
+
+def ensure_local(db: Session, digests: Iterable[str]):
+    missing = [d for d in set(digests) if d and not blob_cache.has(d)]
+    if missing:
+        for digest, data in db.execute(select(Blob.hash, Blob.data).filter(Blob.hash.in_(missing))):
+            blob_cache.store_compressed(digest, data)
+
+
+async def ensure_local_async(db: AsyncSession, digests: Iterable[str]):
+    missing = [d for d in set(digests) if d and not blob_cache.has(d)]
+    if missing:
+        rows = (await db.execute(select(Blob.hash, Blob.data).filter(Blob.hash.in_(missing)))).all()
+        for digest, data in rows:
+            await run_in_threadpool(blob_cache.store_compressed, digest, data)
+
+
+# The candidates are locked first and the references checked by a second
+# statement: a put_blob that locked a row before us has committed its file row
+# by the time the lock is granted, and a statement that started earlier would
+# not see it.
+def _lock_orphans(digests: list):
+    return select(Blob.hash).where(Blob.hash.in_(digests)).with_for_update()
+
+
+def _delete_orphans(digests: list):
+    return (
+        delete(Blob)
+        .where(Blob.hash.in_(digests), ~exists().where(FileStore.content_hash == Blob.hash))
+        .returning(Blob.hash)
+    )
+
+
+def delete_orphan_blobs_sync(db: Session, digests: Iterable[str]) -> list:
+    digests = [d for d in set(digests) if d]
+    if not digests:
+        return []
+    db.execute(_lock_orphans(digests))
+    deleted = db.scalars(_delete_orphans(digests)).all()
+    for digest in deleted:
+        blob_cache.evict(digest)
+    return deleted
+
+
+async def delete_orphan_blobs(db: AsyncSession, digests: Iterable[str]) -> list:
+    """
+    Drop the given blobs unless another file still references them, and their
+    local copies. Returns the dropped hashes. The caller commits.
+    """
+    digests = [d for d in set(digests) if d]
+    if not digests:
+        return []
+    await db.execute(_lock_orphans(digests))
+    deleted = (await db.scalars(_delete_orphans(digests))).all()
+    for digest in deleted:
+        await run_in_threadpool(blob_cache.evict, digest)
+    return deleted
+
+
+def chunk_text(chunk: Chunk) -> str:
+    """
+    Chunk text sliced from its file's blob; the blob must be local and pinned
+    (see ensure_local* and LocalBlobCache.pinned).
+    """
+    if chunk.text is not None:
+        return chunk.text
+    return blob_cache.read_text(chunk.file.content_hash, chunk.start_byte, chunk.end_byte)
@@ -1,28 +1,45 @@
 # app/services/ingest.py
+import logging
 import os
 from uuid import uuid4
 import zipfile
 import shutil
 import tempfile
 from fastapi import HTTPException
-from git import Repo
 from pathlib import Path
 from app.models.session_model import Project, FileStore, Chunk, Embedding
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from hashlib import sha256
-from app.services.supabase_client import supabase
+from app.core.metrics import QUEUE_DEPTH
+from app.database import SessionLocal
+from app.embeddings.indexer import get_index
+from app.services.blob_store import blob_cache, blob_hash, delete_orphan_blobs_sync, ensure_local, put_blob
+from app.services.supabase_client import get_supabase
+
+logger = logging.getLogger(__name__)
 
 # file extensions to include
 INCLUDE_EXT = {".py", ".js", ".ts", ".jsx", ".tsx", ".java", ".kt", ".go", ".rs",
                ".html", ".css", ".json", ".md", ".yml", ".yaml", ".sh", ".sql"}
 IGNORE_DIRS = {"node_modules", ".git", "__pycache__", "venv", "env", ".venv"}
 
-from app.embeddings.indexer import FaissIndex
+# git projects keep a sparse checkout here so a refresh only fetches what changed
+REPO_DIR = os.path.join(os.getcwd(), "data", "repos")
+# non-cone sparse-checkout patterns: indexable extensions at any depth, minus ignored dirs
+SPARSE_PATTERNS = [f"*{ext}" for ext in sorted(INCLUDE_EXT)] + [f"!**/{d}/**" for d in sorted(IGNORE_DIRS)]
 
 def is_text_file(path: Path):
     # simple extension check; could also check mime
     return path.suffix.lower() in INCLUDE_EXT
 
+def is_indexable(rel_path: str):
+    path = Path(rel_path)
+    return is_text_file(path) and not any(part in IGNORE_DIRS for part in path.parts)
+
+def read_source(path) -> str:
+    return Path(path).read_text(encoding='utf-8', errors='ignore')
+
 def walk_and_collect(root_dir):
     files = []
     for p in Path(root_dir).rglob("*"):
@@ -35,26 +52,23 @@ def walk_and_collect(root_dir):
             files.append(p)
     return files
 
-def create_project_from_dir(user_id: int, name: str, src_dir: str, db: Session, source_type: str="zip", repo_url=None):
+def create_project_from_dir(user_id: int, name: str, src_dir: str, db: Session, source_type: str="zip", repo_url=None, source_commit=None):
     
     try:
         # create project metadata
-        print("Creating project record...")
-        proj = Project(user_id=user_id, name=name, source_type=source_type, repo_url=repo_url, source_url=src_dir)
+        proj = Project(user_id=user_id, name=name, source_type=source_type, repo_url=repo_url, source_url=src_dir, source_commit=source_commit)
         db.add(proj)
         db.commit()
         db.refresh(proj)
-        print(f"Created project {proj.id} - {proj.name}")
-        # gather files
+        logger.info("Created project %s - %s", proj.id, proj.name)
+        # gather files; text goes to the deduplicated blob store, the row keeps its hash
         files_on_disk = walk_and_collect(src_dir)
         for p in files_on_disk:
             rel = os.path.relpath(str(p), src_dir)
-            content = p.read_text(encoding='utf-8', errors='ignore')
-            content_hash = sha256(content.encode('utf-8')).hexdigest()
-            f = FileStore(project_id=proj.id, path=rel, content=content, content_hash=content_hash, size=len(content))
-            db.add(f)
-            db.commit()
-            db.refresh(f)
+            content = read_source(p)
+            content_hash = put_blob(db, content.encode('utf-8'))
+            db.add(FileStore(project_id=proj.id, path=rel, content_hash=content_hash, size=len(content)))
+        db.commit()
         return proj.id, proj.name
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -76,36 +90,178 @@ def extract_zip_and_create_project(user_id:int, zip_file_path:str, project_name:
         raise
 
 def upload_folder_to_supabase(local_path, project_id):
-    bucket = "project-files"
-    base_path = f"project_{project_id}/"
-
     for root, dirs, files in os.walk(local_path):
+        # a clone's git metadata is not project content
+        dirs[:] = [d for d in dirs if d != ".git"]
         for file in files:
-            local_file = os.path.join(root, file)
-            rel = os.path.relpath(local_file, local_path)
-            supa_path = base_path + rel.replace("\\", "/")
+            upload_file_to_supabase(local_path, os.path.relpath(os.path.join(root, file), local_path), project_id)
+
+def upload_file_to_supabase(local_path, rel, project_id):
+    bucket = "project-files"
+    supa_path = f"project_{project_id}/" + rel.replace("\\", "/")
+    with open(os.path.join(local_path, rel), "rb") as f:
+        get_supabase().storage.from_(bucket).upload(
+            supa_path, f, file_options={"upsert": True}
+        )
+
+def repo_checkout_dir(project_id: int) -> str:
+    return os.path.join(REPO_DIR, f"project_{project_id}")
 
-            with open(local_file, "rb") as f:
-                supabase.storage.from_(bucket).upload(
-                    supa_path, f, file_options={"upsert": True}
-                )
+def remove_repo_checkout(project_id: int):
+    shutil.rmtree(repo_checkout_dir(project_id), ignore_errors=True)
+
+def sparse_clone(repo_url: str, dest: str):
+    """
+    Shallow, blobless clone that only checks out indexable files: history
+    and trees come from the server, file contents only for the sparse paths.
+    """
+    from git import Repo
+    repo = Repo.clone_from(repo_url, dest, depth=1, filter="blob:none", no_checkout=True)
+    repo.git.sparse_checkout("set", "--no-cone", *SPARSE_PATTERNS)
+    repo.git.checkout(repo.active_branch.name)
+    return repo
 
 def clone_git_and_create_project(user_id:int, repo_url:str, project_name:str, db:Session):
     tmpdir = f"/tmp/proj_{uuid4().hex}"
     os.makedirs(tmpdir, exist_ok=True)
     try:
-        Repo.clone_from(repo_url, tmpdir, depth=1)
-        print("Cloned repo to", tmpdir)
-        proj_id, proj_name = create_project_from_dir(user_id, project_name, tmpdir, db=db, source_type="git", repo_url=repo_url)
+        repo = sparse_clone(repo_url, tmpdir)
+        logger.info("Cloned %s to %s", repo_url, tmpdir)
+        proj_id, proj_name = create_project_from_dir(
+            user_id, project_name, tmpdir, db=db, source_type="git", repo_url=repo_url, source_commit=repo.head.commit.hexsha,
+        )
 
         upload_folder_to_supabase(tmpdir, proj_id)
 
-        shutil.rmtree(tmpdir)
+        # keep the checkout for incremental refreshes
+        os.makedirs(REPO_DIR, exist_ok=True)
+        remove_repo_checkout(proj_id)
+        shutil.move(tmpdir, repo_checkout_dir(proj_id))
         return proj_id, proj_name
     except Exception:
-        shutil.rmtree(tmpdir)
+        shutil.rmtree(tmpdir, ignore_errors=True)
         raise
 
+def _has_commit(repo, sha: str) -> bool:
+    from git.exc import GitCommandError
+    try:
+        repo.git.cat_file("-e", f"{sha}^{{commit}}")
+        return True
+    except GitCommandError:
+        return False
+
+def _diff_changes(repo, old: str, new: str):
+    """{path: 'A' | 'M' | 'D'} of indexable files between two commits."""
+    changes = {}
+    # renames show up as delete + add; rename detection would need the blobs
+    for line in repo.git.diff("--name-status", "--no-renames", old, new).splitlines():
+        status, _, path = line.partition("\t")
+        if is_indexable(path):
+            changes[path] = "D" if status == "D" else ("A" if status == "A" else "M")
+    return changes
+
+def _content_changes(db: Session, project_id: int, root: str):
+    """Fallback when the last indexed commit is unavailable: compare file hashes."""
+    known = {f.path: f.content_hash for f in db.query(FileStore.path, FileStore.content_hash).filter(FileStore.project_id == project_id)}
+    changes = {}
+    for p in walk_and_collect(root):
+        rel = os.path.relpath(str(p), root)
+        if rel not in known:
+            changes[rel] = "A"
+        elif known[rel] != blob_hash(read_source(p).encode('utf-8')):
+            changes[rel] = "M"
+    for rel in known:
+        if not os.path.exists(os.path.join(root, rel)):
+            changes[rel] = "D"
+    return changes
+
+def refresh_git_project(project_id: int, db: Session):
+    """
+    Fetch new commits of a git project and update only the files that changed.
+    Returns the ids of added / modified files for index_project.
+    """
+    from git import Repo
+    from git.exc import GitCommandError
+
+    proj = db.query(Project).filter(Project.id == project_id).first()
+    if not proj:
+        raise HTTPException(status_code=404, detail="Project not found")
+    if proj.source_type != "git" or not proj.repo_url:
+        raise HTTPException(status_code=400, detail="Only git projects can be refreshed")
+
+    checkout = repo_checkout_dir(project_id)
+    old = proj.source_commit
+    if os.path.isdir(os.path.join(checkout, ".git")):
+        repo = Repo(checkout)
+        repo.git.fetch("--depth=1", "--filter=blob:none", "origin")
+        new = repo.git.rev_parse("FETCH_HEAD")
+    else:
+        # checkout lives on another worker / was lost: clone the head again
+        os.makedirs(REPO_DIR, exist_ok=True)
+        remove_repo_checkout(project_id)
+        repo = sparse_clone(proj.repo_url, checkout)
+        new = repo.head.commit.hexsha
+
+    if old and not _has_commit(repo, old):
+        try:
+            repo.git.fetch("--depth=1", "--filter=blob:none", "origin", old)
+        except GitCommandError:
+            old = None  # server does not serve commits by id
+
+    summary = {"project_id": project_id, "commit": new, "added": 0, "modified": 0, "deleted": 0, "file_ids": []}
+    if old == new:
+        return summary
+
+    changes = _diff_changes(repo, old, new) if old else None
+    repo.git.reset("--hard", new)
+    if changes is None:
+        changes = _content_changes(db, project_id, checkout)
+
+    rows = {f.path: f for f in db.query(FileStore).filter(FileStore.project_id == project_id, FileStore.path.in_(list(changes)))}
+    deleted_file_ids = [row.id for path, row in rows.items() if changes[path] == "D"]
+    deleted_chunk_ids = db.scalars(select(Chunk.id).where(Chunk.file_id.in_(deleted_file_ids))).all() if deleted_file_ids else []
+    dropped_hashes = []
+    changed_rows = []
+    removed_paths = []
+    for path, status in changes.items():
+        row = rows.get(path)
+        full_path = os.path.join(checkout, path)
+        if status == "D" or not os.path.isfile(full_path):
+            if row is not None:
+                dropped_hashes.append(row.content_hash)
+                db.delete(row)
+                removed_paths.append(f"project_{project_id}/{path}")
+                summary["deleted"] += 1
+            continue
+        content = read_source(full_path)
+        content_hash = put_blob(db, content.encode('utf-8'))
+        if row is None:
+            row = FileStore(project_id=project_id, path=path)
+            db.add(row)
+            summary["added"] += 1
+        else:
+            dropped_hashes.append(row.content_hash)
+            summary["modified"] += 1
+        row.content, row.content_hash, row.size = None, content_hash, len(content)
+        changed_rows.append(row)
+    # files (and via ON DELETE CASCADE their chunks) go before their blobs are checked
+    db.flush()
+    delete_orphan_blobs_sync(db, dropped_hashes)
+    proj.source_commit = new
+    db.commit()
+
+    for row in changed_rows:
+        upload_file_to_supabase(checkout, row.path, project_id)
+    if removed_paths:
+        get_supabase().storage.from_("project-files").remove(removed_paths)
+    if deleted_chunk_ids:
+        get_index(project_id).remove_ids(deleted_chunk_ids)
+
+    summary["file_ids"] = [row.id for row in changed_rows]
+    logger.info("Refreshed project %s to %s: %d added, %d modified, %d deleted",
+                project_id, new[:12], summary["added"], summary["modified"], summary["deleted"])
+    return summary
+
 # chunker: simple line-based chunking with approx token limits
 def chunk_file_content(content:str, max_lines=80, overlap=10):
     lines = content.splitlines()
@@ -124,8 +280,42 @@ def chunk_file_content(content:str, max_lines=80, overlap=10):
             i = end
     return chunks
 
-def index_project(project_id:int, db:Session):
-    print("Indexing project", project_id)
+def _utf8_len(text:str) -> int:
+    return len(text.encode('utf-8', errors='surrogateescape'))
+
+def chunk_file_spans(data:bytes, max_lines=80, overlap=10):
+    """
+    Same windows as chunk_file_content, as byte ranges into the file's blob:
+    (start_line, end_line, start_byte, end_byte), surrounding whitespace trimmed.
+    Lines are split on the decoded text, so \\v, \\f, \\x85, \\u2028 etc. break
+    lines here exactly as they do for str.splitlines.
+    """
+    lines = data.decode('utf-8', errors='surrogateescape').splitlines(keepends=True)
+    offsets = [0]
+    for line in lines:
+        offsets.append(offsets[-1] + _utf8_len(line))
+    spans = []
+    i = 0
+    n = len(lines)
+    while i < n:
+        start = i
+        end = min(i + max_lines, n)
+        segment = "".join(lines[start:end])
+        if segment.strip():
+            start_byte = offsets[start] + _utf8_len(segment[:len(segment) - len(segment.lstrip())])
+            end_byte = offsets[end] - _utf8_len(segment[len(segment.rstrip()):])
+            spans.append((start+1, end, start_byte, end_byte))
+        i = end - overlap
+        if i <= start:
+            i = end
+    return spans
+
+def index_project(project_id:int, db:Session, file_ids=None):
+    """
+    Chunk and embed the project's files, or only `file_ids` (after a refresh).
+    Files that were indexed before get their chunks replaced.
+    """
+    logger.info("Indexing project %s", project_id)
     try:
         proj = db.query(Project).filter(Project.id == project_id).first()
         if not proj:
@@ -134,35 +324,69 @@ def index_project(project_id:int, db:Session):
         chunk_texts = []
         chunk_db_ids = []
 
-        files = db.query(FileStore).filter(FileStore.project_id == project_id).all()
-        for f in files:
-            chunks = chunk_file_content(f.content)
-            for start, end, text in chunks:
-                db_chunk = Chunk(file_id=f.id, start_line=start, end_line=end, text=text)
-                db.add(db_chunk)
-                db.commit()
-                db.refresh(db_chunk)
-                chunk_texts.append(text)
-                chunk_db_ids.append(db_chunk.id)
-            print(f"Processed file {f.path}, created {len(chunks)} chunks.")
+        query = db.query(FileStore).filter(FileStore.project_id == project_id)
+        if file_ids is not None:
+            query = query.filter(FileStore.id.in_(file_ids))
+        files = query.all()
+        stale_chunk_ids = []
+        if files:
+            file_filter = Chunk.file_id.in_([f.id for f in files])
+            stale_chunk_ids = db.scalars(select(Chunk.id).where(file_filter)).all()
+            # embeddings go with their chunks via ON DELETE CASCADE
+            db.execute(delete(Chunk).where(file_filter))
+        digests = [f.content_hash for f in files if f.content is None]
+        # pinned: storing the later blobs must not evict the earlier ones before they are read
+        with blob_cache.pinned(digests):
+            ensure_local(db, digests)
+            for f in files:
+                if f.content is not None:
+                    # legacy row: move its text into the blob store on re-index
+                    data = f.content.encode('utf-8')
+                    f.content_hash = put_blob(db, data)
+                    f.content = None
+                else:
+                    data = bytes(blob_cache.view(f.content_hash))
+                # chunks only reference a byte range of the blob, no text copy
+                db_chunks = [
+                    Chunk(file_id=f.id, start_line=start, end_line=end, start_byte=start_byte, end_byte=end_byte)
+                    for start, end, start_byte, end_byte in chunk_file_spans(data)
+                ]
+                db.add_all(db_chunks)
+                db.flush()
+                for db_chunk in db_chunks:
+                    chunk_texts.append(data[db_chunk.start_byte:db_chunk.end_byte].decode('utf-8', errors='ignore'))
+                    chunk_db_ids.append(db_chunk.id)
+                logger.debug("Processed file %s, created %d chunks", f.path, len(db_chunks))
+        db.commit()
         # create embeddings + put vectors into faiss
-        index = FaissIndex(project_id)
+        index = get_index(project_id)
+        index.remove_ids(stale_chunk_ids)
         if chunk_texts:
-            print(f"Creating embeddings and indexing in FAISS...{len(chunk_db_ids)} chunks to index.")
             vector_ids = index.add_vectors(chunk_texts, chunk_db_ids)
-            # persist vector metadata in DB
+            # persist vector metadata in DB (the vector id is the chunk id)
             for vec_id, chunk_db_id in zip(vector_ids, chunk_db_ids):
                 emb = Embedding(chunk_id=chunk_db_id, vector_id=int(vec_id))
                 db.add(emb)
             db.commit()
-            print(f"Indexed {len(chunk_texts)} chunks for project {project_id}.")
+            logger.info("Indexed %d chunks for project %s", len(chunk_texts), project_id)
         return {"indexed_chunks": len(chunk_texts)}
     except Exception as e:
         raise(HTTPException(status_code=500, detail=str(e)))
 
-def project_by_user(user_id:int, db:Session):
+def index_project_job(project_id:int, file_ids=None):
+    # background tasks outlive the request scoped session, so use a fresh one
+    QUEUE_DEPTH.labels("indexing").inc()
+    db = SessionLocal()
+    try:
+        return index_project(project_id, db=db, file_ids=file_ids)
+    finally:
+        db.close()
+        QUEUE_DEPTH.labels("indexing").dec()
+
+async def project_by_user(user_id:int, db:AsyncSession):
     try:
-        projects = db.query(Project).filter(Project.user_id == user_id).all()
+        result = await db.execute(select(Project).filter(Project.user_id == user_id))
+        projects = result.scalars().all()
         project_list = [{"id": p.id, "name": p.name} for p in projects]
         return {"projects": project_list}
     except Exception as e:
@@ -1,17 +1,48 @@
+import json
+import logging
+import time
 from typing import List
 import requests
 from app.core.config import settings
-from google import genai
-from google.genai.types import Content, Part
-from openai import OpenAI
-import anthropic
+from app.core.metrics import LLM_TIME_TO_FIRST_TOKEN_SECONDS, LLM_TOTAL_SECONDS
 from dotenv import load_dotenv
-from ollama import Client
-import os
+
+# Provider SDKs are imported inside the provider methods, so a worker only
+# loads the ones it actually talks to.
 
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# pooled HTTP connections to the Ollama server
+_ollama_http = requests.Session()
+
+
+def _ollama_payload(messages: List[dict], stream: bool = True) -> dict:
+    """
+    /api/chat request for the configured profile. keep_alive keeps the model
+    resident between requests; options must match the warm-up call, since a
+    different num_ctx makes Ollama reload the model.
+    """
+    options = {
+        "num_ctx": settings.OLLAMA_NUM_CTX,
+        "num_predict": settings.OLLAMA_NUM_PREDICT,
+        "num_thread": settings.OLLAMA_NUM_THREAD,
+    }
+    return {
+        "model": settings.OLLAMA_MODEL,
+        "messages": messages,
+        "stream": stream,
+        "keep_alive": settings.OLLAMA_KEEP_ALIVE,
+        "options": {name: value for name, value in options.items() if value},
+    }
+
+
+class LLMError(Exception):
+    """A provider call failed or the model is unknown; the message can be shown to users."""
+
+
 class LLMFactory:
     """
     A factory class to abstract interaction with different LLMs (Ollama, OpenAI, etc.)
@@ -19,19 +50,42 @@ class LLMFactory:
     
     @staticmethod
     def generate_response(messages: List[dict], model: str = "ollama") -> str:
+        """Like generate, but failures come back as the error text instead of raising."""
         try:
-            if model.lower() == "ollama":
+            return LLMFactory.generate(messages, model)
+        except LLMError as e:
+            return str(e)
+
+    @staticmethod
+    def generate(messages: List[dict], model: str = "ollama") -> str:
+        """
+        Answer from the selected provider (DEFAULT_MODEL when `model` is None,
+        which the request schemas allow); raises LLMError when it fails.
+        """
+        provider = (model or settings.DEFAULT_MODEL).lower()
+        start = time.perf_counter()
+        try:
+            if provider == "ollama":
                 return LLMFactory._generate_with_ollama(messages)
-            elif model.lower() == "openai":
+            elif provider == "openai":
                 return LLMFactory._generate_with_openai(messages)
-            elif model.lower() == "gemini":
+            elif provider == "gemini":
                 return LLMFactory._generate_with_genai(messages)
-            elif model.lower() == "claude":
+            elif provider == "claude":
                 return LLMFactory._generate_with_claudeai(messages)
             else:
-                return f"Error: Unsupported model '{model}'. Try 'ollama' or 'openai' or genai."
+                raise LLMError(f"Error: Unsupported model '{model}'. Try 'ollama' or 'openai' or genai.")
+        except LLMError:
+            raise
         except Exception as e:
-            return f"Error generating response: {str(e)}"
+            raise LLMError(f"Error generating response: {str(e)}") from e
+        finally:
+            if provider in ("ollama", "openai", "gemini", "claude"):
+                elapsed = time.perf_counter() - start
+                LLM_TOTAL_SECONDS.labels(provider).observe(elapsed)
+                # only Ollama streams; for the others the whole answer is the first token
+                if provider != "ollama":
+                    LLM_TIME_TO_FIRST_TOKEN_SECONDS.labels(provider).observe(elapsed)
 
     @staticmethod
     def _generate_with_ollama(messages: List[dict]) -> str:
@@ -39,16 +93,17 @@ class LLMFactory:
         Use local Ollama server to generate response
         """
         try:
-            client = Client()
-            response = requests.post(
-                "http://localhost:11434/api/chat",
-                json={"model": "llama3", "messages": messages, "stream": True},
-                timeout=300,
+            start = time.perf_counter()
+            response = _ollama_http.post(
+                f"{settings.OLLAMA_URL}/api/chat",
+                json=_ollama_payload(messages),
+                timeout=settings.OLLAMA_TIMEOUT_SECONDS,
                 stream=True
             )
             response.raise_for_status()
 
             full_response = ""
+            first_token = True
 
             for line in response.iter_lines():
                 if not line:
@@ -56,16 +111,36 @@ class LLMFactory:
                 try:
                     data = line.decode("utf-8").strip()
                     if data.startswith("{"):
-                        import json
                         json_data = json.loads(data)
                         if "message" in json_data and "content" in json_data["message"]:
+                            if first_token:
+                                LLM_TIME_TO_FIRST_TOKEN_SECONDS.labels("ollama").observe(time.perf_counter() - start)
+                                first_token = False
                             full_response += json_data["message"]["content"]
                 except Exception:
                     continue
 
             return full_response.strip() or "No response from Ollama."
         except requests.exceptions.RequestException as e:
-            return f"Ollama Error: {str(e)}"
+            raise LLMError(f"Ollama Error: {str(e)}") from e
+
+    @staticmethod
+    def warm_up_ollama():
+        """
+        Load the configured model into Ollama ahead of the first chat; a chat
+        request without messages only loads the model.
+        """
+        try:
+            start = time.perf_counter()
+            response = _ollama_http.post(
+                f"{settings.OLLAMA_URL}/api/chat",
+                json=_ollama_payload([], stream=False),
+                timeout=settings.OLLAMA_TIMEOUT_SECONDS,
+            )
+            response.raise_for_status()
+            logger.info("Ollama model %s loaded in %.1fs", settings.OLLAMA_MODEL, time.perf_counter() - start)
+        except requests.exceptions.RequestException as e:
+            logger.warning("Ollama warm-up failed: %s", e)
 
     @staticmethod
     def _generate_with_openai(messages: List[dict]) -> str:
@@ -73,7 +148,7 @@ class LLMFactory:
         Placeholder for OpenAI integration (future use)
         """
         try:
-            print("API KEY:", os.getenv("OPENAI_API_KEY"))
+            from openai import OpenAI
             client = OpenAI()
             response = client.chat.completions.create(
                 model="gpt-4o-mini",
@@ -81,7 +156,7 @@ class LLMFactory:
             )
             return response.choices[0].message.content.strip()
         except Exception as e:
-            return f"OpenAI Error: {e}"
+            raise LLMError(f"OpenAI Error: {e}") from e
         
     
     @staticmethod
@@ -90,6 +165,8 @@ class LLMFactory:
         Placeholder for GoogleAI integration (future use)
         """
         try:
+            from google import genai
+            from google.genai.types import Content, Part
             # The client gets the API key from the environment variable `GEMINI_API_KEY`.
             client = genai.Client()
           
@@ -109,11 +186,12 @@ class LLMFactory:
             )
             return response.text.strip() if response.text else "No response from Gemini AI."
         except Exception as e:
-            return f"Gemini Error: {str(e)}"
+            raise LLMError(f"Gemini Error: {str(e)}") from e
         
     @staticmethod
     def _generate_with_claudeai(messages: List[dict]) -> str:
         try:
+            import anthropic
             client = anthropic.Anthropic()
 
             response = client.messages.create(
@@ -123,5 +201,5 @@ class LLMFactory:
             )
             return response.content.strip() if response.content else "No response from Claude AI."
         except Exception as e:
-            return f"Claude Error: {str(e)}"
+            raise LLMError(f"Claude Error: {str(e)}") from e
         
\ No newline at end of file
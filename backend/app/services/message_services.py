@@ -1,78 +1,96 @@
 # app/crud.py
+from hashlib import sha1
+from typing import Optional
 from fastapi import HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from app.core.pagination import decode_cursor, encode_cursor
+from app.core.profiling import stage
 from app.models.message_model import Message, SenderType
-from app.models.session_model import SessionInstance
+from app.models.session_model import Project
 from app.schemas.message_schema import MessageCreate
 from app.schemas.session_schema import  MessageSessionOut
 from app.services import ai_service
-from app.services.search import retrieve_top_k
-from app.services.session_services import generate_session_title
+from app.services.llm_factory import LLMError
+from app.services.search import retrieve_top_k_multi
+from app.services.session_services import generate_session_title, get_session, get_session_summary
 
+PROJECT_SYSTEM_PROMPT = "You are a developer assistant. Only use the provided context files; mention file path and lines you used."
 
-def create_message(db: Session, message: MessageCreate):
-    # 1️⃣ Save user message
+
+async def create_message(db: AsyncSession, message: MessageCreate):
+    # 1️⃣ Fetch session & project
+    with stage("session"):
+        session_instance = await get_session(db, session_id=message.session_id)
+    if not session_instance:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    # projects to search: the session's own plus any extra ones of the same user;
+    # checked before the prompt is saved, so a rejected request leaves no trace
+    project_names = await _context_projects(db, session_instance, message.project_ids)
+
+    # 2️⃣ Save user message
     db_msg = Message(
         session_id=message.session_id,
         sender_type=message.sender_type,
         content=message.content,
         model_used=message.model_used
     )
-    db.add(db_msg)
-    db.commit()
-    db.refresh(db_msg)
+    with stage("save_prompt"):
+        db.add(db_msg)
+        await db.commit()
 
-    # 2️⃣ Fetch session & project
-    session_instance = db.query(SessionInstance).filter(SessionInstance.id == message.session_id).first()
-    if not session_instance:
-        raise HTTPException(status_code=404, detail="Session not found")
-    
-    #project id
-    project_id = session_instance.project_id
+    if project_names:
 
-    if project_id:
+        # 3️⃣ Retrieve top-k code chunks for context (in parallel across projects)
+        # the session's own project grounds every answer, so it is never dropped for time
+        top_chunks = await retrieve_top_k_multi(
+            list(project_names), message.content, db=db, top_k=6,
+            required=[session_instance.project_id] if session_instance.project_id else [],
+        )
 
-        # 3️⃣ Retrieve top-k code chunks for context
-        top_chunks = retrieve_top_k(project_id, message.content, db=db, top_k=6)
-        
         # 4️⃣ Construct LLM messages
-        system_prompt = "You are a developer assistant. Only use the provided context files; mention file path and lines you used."
         context_text = ""
         for chunk in top_chunks:
-            context_text += f"File: {chunk['file_path']} lines {chunk['start_line']}-{chunk['end_line']}\n{chunk['text']}\n\n"
+            source = f"{project_names[chunk['project_id']]}/{chunk['file_path']}" if len(project_names) > 1 else chunk["file_path"]
+            context_text += f"File: {source} lines {chunk['start_line']}-{chunk['end_line']}\n{chunk['text']}\n\n"
 
+        # the byte-identical system prompt leads every request so the server's prompt
+        # cache can reuse it; the per-question context goes into the last message
         messages_for_llm = [
-            {"role": "system", "content": system_prompt},
-            {"role": "system", "content": context_text},
-            {"role": "user", "content": message.content},
+            {"role": "system", "content": PROJECT_SYSTEM_PROMPT},
+            {"role": "user", "content": f"Context files:\n\n{context_text}Question: {message.content}"},
         ]
-    
+
     else:
          # 2️⃣ Get session history (for context)
-        history = (
-            db.query(Message)
-            .filter(Message.session_id == message.session_id)
-            .order_by(Message.created_at)
-            .all()
-        )
+        with stage("history"):
+            history = await get_messages(db, session_id=message.session_id)
         messages_for_llm = [
             {"role": "user" if m.sender_type == "user" else "assistant", "content": m.content}
             for m in history
         ]
-        
 
-    # 5️⃣ Generate AI response
+
+    # 5️⃣ Generate AI response (blocking SDK calls run in the threadpool)
     try:
-        ai_response = ai_service.generate_code_suggestion(
-            messages=messages_for_llm,
-            model=message.model_used
-        )
+        with stage("llm"):
+            ai_response = await run_in_threadpool(
+                ai_service.generate_code_suggestion,
+                messages=messages_for_llm,
+                model=message.model_used
+            )
+    except LLMError as e:
+        # a provider failure is still answered in the chat, as its error text
+        ai_response = str(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
     # 6️⃣ Generate session title if missing
     if not session_instance.title:
-        session_instance = generate_session_title(db, session_instance, model=message.model_used)
+        with stage("title"):
+            session_instance = await generate_session_title(db, session_instance, model=message.model_used)
 
     # 7️⃣ Save AI message
     ai_message = Message(
@@ -81,12 +99,77 @@ def create_message(db: Session, message: MessageCreate):
         content=ai_response,
         model_used=message.model_used,
     )
-    db.add(ai_message)
-    db.commit()
-    db.refresh(ai_message)
+    with stage("save_reply"):
+        db.add(ai_message)
+        await db.commit()
+        await db.refresh(ai_message)
+
+    with stage("summary"):
+        session_summary = await get_session_summary(db, session_id=message.session_id)
+    return MessageSessionOut(ai_message=ai_message, session=session_summary)
+
+
+async def _context_projects(db: AsyncSession, session_instance, extra_project_ids=None):
+    """{project id: name} of the projects whose code grounds the answer."""
+    wanted = set(extra_project_ids or [])
+    if session_instance.project_id:
+        wanted.add(session_instance.project_id)
+    if not wanted:
+        return {}
+    rows = await db.execute(
+        select(Project.id, Project.name).filter(Project.id.in_(wanted), Project.user_id == session_instance.user_id)
+    )
+    found = dict(rows.all())
+    if len(found) != len(wanted):
+        raise HTTPException(status_code=404, detail="Project not found")
+    return found
+
+
+async def get_messages(db: AsyncSession, session_id: int):
+    result = await db.execute(select(Message).filter(Message.session_id == session_id).order_by(Message.created_at.asc()))
+    return result.scalars().all()
+
+
+async def get_message_page(db: AsyncSession, session_id: int, limit: int = 100, before: Optional[str] = None, after_id: Optional[int] = None):
+    """
+    Keyset page over (created_at, id), returned oldest first, with the cursor
+    for the next page and whether more messages remain.
+    Default / `before`: the newest `limit` messages older than the cursor; the cursor pages further back.
+    `after_id`: delta mode, the oldest `limit` messages newer than that message; no cursor,
+    the next delta starts after the last message returned.
+    """
+    query = select(Message).filter(Message.session_id == session_id)
+
+    if after_id is not None:
+        anchor = (await db.execute(
+            select(Message.created_at, Message.id).filter(Message.session_id == session_id, Message.id == after_id)
+        )).first()
+        if anchor is None:
+            raise HTTPException(status_code=404, detail="Message not found")
+        query = query.filter(tuple_(Message.created_at, Message.id) > tuple_(anchor.created_at, anchor.id))
+        result = await db.execute(query.order_by(Message.created_at.asc(), Message.id.asc()).limit(limit + 1))
+        messages = list(result.scalars().all())
+        return messages[:limit], None, len(messages) > limit
+
+    if before:
+        created_at, message_id = decode_cursor(before)
+        query = query.filter(tuple_(Message.created_at, Message.id) < tuple_(created_at, message_id))
+    result = await db.execute(query.order_by(Message.created_at.desc(), Message.id.desc()).limit(limit + 1))
+    messages = list(result.scalars().all())
 
-    return MessageSessionOut(ai_message=ai_message, session=session_instance)
+    next_cursor = None
+    if len(messages) > limit:
+        messages = messages[:limit]
+        next_cursor = encode_cursor(messages[-1].created_at, messages[-1].id)
+    messages.reverse()
+    return messages, next_cursor, next_cursor is not None
 
 
-def get_messages(db: Session, session_id: int):
-    return db.query(Message).filter(Message.session_id == session_id).order_by(Message.created_at.asc()).all()
+async def get_messages_etag(db: AsyncSession, session_id: int, *page_args) -> str:
+    # messages are append-only, so (count, max id) changes whenever the history does;
+    # both come straight from the session index without touching message bodies
+    count, last_id = (await db.execute(
+        select(func.count(Message.id), func.max(Message.id)).filter(Message.session_id == session_id)
+    )).one()
+    key = "|".join(str(part) for part in (session_id, count, last_id, *page_args))
+    return f'W/"{sha1(key.encode("utf-8")).hexdigest()}"'
@@ -0,0 +1,102 @@
+# app/services/prefetch.py
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from sqlalchemy import select
+from app.core.config import settings
+from app.core.metrics import INDEX_PREFETCHES
+from app.database import SessionLocal
+from app.embeddings.indexer import get_embedding_model, get_index, index_state
+from app.models.session_model import FileStore
+from app.services.blob_store import ensure_local
+
+logger = logging.getLogger(__name__)
+
+# Opening a project session is a strong hint that the project is about to be
+# queried, so its index (and the embedding model) is loaded into this
+# worker's cache in the background instead of inside the first message.
+# Searches hand their cold projects to a pool of their own, so they never
+# wait behind prefetches of other sessions nor occupy search threads. Each
+# pool runs at most PREFETCH_WORKERS loads at once, one per project.
+# Prefetched projects then fetch their file blobs as a separate task.
+
+_PREFETCH_POOL = ThreadPoolExecutor(max_workers=settings.PREFETCH_WORKERS, thread_name_prefix="prefetch")
+_LOAD_POOL = ThreadPoolExecutor(max_workers=settings.PREFETCH_WORKERS, thread_name_prefix="index-load")
+# project id -> (future resolved once the index is loaded, pool task running the load)
+_PENDING = {}
+_PENDING_LOCK = threading.Lock()
+
+
+def _load(project_id: int, loaded: Future, prefetched: bool):
+    try:
+        get_embedding_model()
+        get_index(project_id)
+    except Exception:
+        if prefetched:
+            INDEX_PREFETCHES.labels("failed").inc()
+        logger.exception("Loading the index of project %s failed", project_id)
+    else:
+        if prefetched:
+            INDEX_PREFETCHES.labels("loaded").inc()
+            _PREFETCH_POOL.submit(_fetch_blobs, project_id)
+        logger.debug("Loaded index of project %s", project_id)
+    finally:
+        with _PENDING_LOCK:
+            _PENDING.pop(project_id, None)
+        loaded.set_result(None)
+
+
+def _fetch_blobs(project_id: int):
+    db = SessionLocal()
+    try:
+        # chunk text is read from the file blobs; small projects get them all
+        digests = db.scalars(
+            select(FileStore.content_hash).filter(FileStore.project_id == project_id).distinct().limit(settings.PREFETCH_MAX_BLOBS + 1)
+        ).all()
+        if len(digests) <= settings.PREFETCH_MAX_BLOBS:
+            ensure_local(db, digests)
+    except Exception:
+        logger.exception("Fetching the blobs of project %s failed", project_id)
+    finally:
+        db.close()
+
+
+def _submit(project_id: int, prefetched: bool, loaded: Future = None) -> Future:
+    """Queue a load; the caller holds _PENDING_LOCK."""
+    loaded = loaded or Future()
+    pool = _PREFETCH_POOL if prefetched else _LOAD_POOL
+    _PENDING[project_id] = (loaded, pool.submit(_load, project_id, loaded, prefetched))
+    return loaded
+
+
+def load_index(project_id: int) -> Future:
+    """
+    Load a project's index in the background for a search, joining the load
+    already running for it if there is one. The future resolves (to None,
+    even if the load failed; check index_state) as soon as the index is
+    cached. A prefetch still waiting for a prefetch worker moves over to the
+    search load pool.
+    """
+    with _PENDING_LOCK:
+        pending = _PENDING.get(project_id)
+        if pending is None:
+            return _submit(project_id, prefetched=False)
+        loaded, task = pending
+        if task.cancel():
+            _submit(project_id, prefetched=False, loaded=loaded)
+        return loaded
+
+
+def prefetch_project(project_id: int):
+    """Start loading a project's index in the background; never blocks the caller."""
+    if not settings.PREFETCH_INDEXES or project_id is None:
+        return
+    state = index_state(project_id)
+    if state != "cold":
+        INDEX_PREFETCHES.labels("cached" if state == "warm" else "loading").inc()
+        return
+    with _PENDING_LOCK:
+        if project_id in _PENDING:
+            INDEX_PREFETCHES.labels("pending").inc()
+            return
+        _submit(project_id, prefetched=True)
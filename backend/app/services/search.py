@@ -1,24 +1,127 @@
 # app/services/search.py
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import List
 from fastapi import HTTPException
-from app.embeddings.indexer import FaissIndex
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from starlette.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.core.metrics import INDEX_FIRST_QUERY
+from app.core.profiling import stage
+from app.embeddings.indexer import embed_query, get_index, index_state
+from app.services.blob_store import blob_cache, chunk_text, ensure_local_async
+from app.services.prefetch import load_index
 from app.models.session_model import Chunk, FileStore
-from sqlalchemy.orm import Session
 
-def retrieve_top_k(project_id:int, query:str, db: Session, top_k=5):
-    index = FaissIndex(project_id)
-    # query faiss, map to chunk ids
-    results = index.query(query, top_k=top_k)
-    
-    try:
+logger = logging.getLogger(__name__)
+
+# searches of cached project indexes run here in parallel; loads never do
+_SEARCH_POOL = ThreadPoolExecutor(max_workers=settings.SEARCH_WORKERS, thread_name_prefix="search")
+
+# projects this worker has searched; their first search records whether the
+# index was already warm (e.g. prefetched when the session was opened)
+_QUERIED = set()
+
+def _note_first_query(project_id: int):
+    if project_id not in _QUERIED:
+        _QUERIED.add(project_id)
+        INDEX_FIRST_QUERY.labels(index_state(project_id)).inc()
+
+def _search_index(project_id: int, emb, top_k: int):
+    results = get_index(project_id).search(emb, top_k=top_k)
+    for r in results:
+        r["project_id"] = project_id
+    return results
+
+def _query_indexes(project_ids: List[int], query: str, top_k: int, timeout: float, required=()):
+    """
+    Embeds the query once and searches the project indexes in parallel.
+    Only cached indexes are searched on the search pool: the others are
+    loaded by prefetch.load_index and searched once they are ready.
+    `timeout` starts after the query is embedded. Any other project that has
+    not answered by then (typically a first-time download) is left out of
+    this answer; its load keeps running so the next query finds it cached.
+    Projects in `required` are always waited for; if one of them cannot be
+    loaded or searched, the request fails with a 503.
+    """
+    for project_id in project_ids:
+        _note_first_query(project_id)
+    loads = {load_index(project_id): project_id for project_id in project_ids if index_state(project_id) != "warm"}
+    with stage("embed"):
+        emb = embed_query(query)
+    # loading the embedding model on a cold worker doesn't count against the search
+    deadline = time.perf_counter() + timeout
+    futures = {
+        _SEARCH_POOL.submit(_search_index, project_id, emb, top_k): project_id
+        for project_id in project_ids if project_id not in loads.values()
+    }
+    if loads:
+        with stage("index"):
+            wait([future for future, project_id in loads.items() if project_id in required])
+            wait(loads, timeout=max(0.0, deadline - time.perf_counter()))
+        for future, project_id in loads.items():
+            if future.done() and index_state(project_id) == "warm":
+                futures[_SEARCH_POOL.submit(_search_index, project_id, emb, top_k)] = project_id
+            elif project_id in required:
+                raise HTTPException(status_code=503, detail=f"Index of project {project_id} is not available")
+    with stage("search"):
+        wait([future for future, project_id in futures.items() if project_id in required])
+        done, pending = wait(futures, timeout=max(0.0, deadline - time.perf_counter()))
+    for future in pending:
+        # a search that hasn't started would only hold up the ones queued after it
+        future.cancel()
+
+    results = []
+    for future in done:
+        try:
+            results.extend(future.result())
+        except Exception:
+            logger.exception("Search of project %s failed", futures[future])
+            if futures[future] in required:
+                raise HTTPException(status_code=503, detail=f"Search of project {futures[future]} failed")
+    skipped = sorted({futures[f] for f in pending} | {project_id for project_id in loads.values() if project_id not in futures.values()})
+    if skipped:
+        logger.warning("Search skipped projects %s after %.1fs", skipped, timeout)
+    # one embedding model for every index, so L2 distances are directly comparable
+    results.sort(key=lambda r: r["distance"])
+    return results[:top_k]
+
+async def _load_chunks(db: AsyncSession, results, project_ids: List[int]):
+    chunk_ids = [r["chunk_id"] for r in results]
+    with stage("chunks"):
+        rows = await db.execute(
+            select(Chunk).options(selectinload(Chunk.file)).join(FileStore).filter(Chunk.id.in_(chunk_ids), FileStore.project_id.in_(project_ids))
+        )
+        by_id = {chunk.id: chunk for chunk in rows.scalars().all()}
+        digests = [chunk.file.content_hash for chunk in by_id.values() if chunk.text is None]
+
         chunks = []
-        for r in results:
-            print("Search result:", r)
-            chunk = db.query(Chunk).filter(Chunk.id == r["chunk_id"]).first()
-            print("Mapped chunk:", chunk.file.id,project_id)
-            if chunk and chunk.file.project_id == project_id:
-                chunks.append({"text": chunk.text, "file_path": chunk.file.path, "start_line": chunk.start_line, "end_line": chunk.end_line, "score": r["distance"]})
-        print("Retrieved chunks from search:", chunks)    
-        return chunks
+        with blob_cache.pinned(digests):
+            await ensure_local_async(db, digests)
+            for r in results:
+                chunk = by_id.get(r["chunk_id"])
+                if chunk:
+                    chunks.append({"text": chunk_text(chunk), "project_id": chunk.file.project_id, "file_path": chunk.file.path, "start_line": chunk.start_line, "end_line": chunk.end_line, "score": r["distance"]})
+    return chunks
+
+async def retrieve_top_k(project_id:int, query:str, db: AsyncSession, top_k=5, timeout: float = None):
+    return await retrieve_top_k_multi([project_id], query, db=db, top_k=top_k, timeout=timeout)
+
+async def retrieve_top_k_multi(project_ids: List[int], query: str, db: AsyncSession, top_k=5, timeout: float = None, required=()):
+    """
+    Top `top_k` chunks across several projects, merged by distance.
+    Search time after embedding is bounded by `timeout` (SEARCH_TIMEOUT_SECONDS),
+    except for the projects in `required`, which are always searched.
+    """
+    timeout = settings.SEARCH_TIMEOUT_SECONDS if timeout is None else timeout
+    # embedding + faiss search are CPU bound, keep them off the event loop
+    results = await run_in_threadpool(_query_indexes, project_ids, query, top_k, timeout, set(required))
+
+    try:
+        logger.debug("Projects %s search returned %d hits", project_ids, len(results))
+        return await _load_chunks(db, results, project_ids)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-        
@@ -1,48 +1,111 @@
 # app/crud.py
-from sqlalchemy.orm import Session
-from app.models.session_model import SessionInstance 
+from typing import Optional
+from sqlalchemy import delete, func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from starlette.concurrency import run_in_threadpool
+from app.core.pagination import decode_cursor, encode_cursor
+from app.models.message_model import Message
+from app.models.session_model import Project, SessionInstance
 from app.schemas.session_schema import SessionInstanceCreate, SessionInstanceUpdate
 from app.services.llm_factory import LLMFactory
 
-def create_session(db: Session, sessioninstance: SessionInstanceCreate):
+# relationships can't be lazy loaded on an AsyncSession, so load what the
+# schemas serialize up front; messages only when a single session is opened
+_SESSION_LOAD = (selectinload(SessionInstance.project),)
+_SESSION_DETAIL_LOAD = (selectinload(SessionInstance.project), selectinload(SessionInstance.messages))
+
+def _summary_query():
+    # correlated subqueries are answered from ix_messages_session_id_created_at_id
+    # and only run for the rows of the requested page
+    message_count = (
+        select(func.count(Message.id)).where(Message.session_id == SessionInstance.id).correlate(SessionInstance).scalar_subquery()
+    )
+    last_message_at = (
+        select(func.max(Message.created_at)).where(Message.session_id == SessionInstance.id).correlate(SessionInstance).scalar_subquery()
+    )
+    return select(
+        SessionInstance.id,
+        SessionInstance.user_id,
+        SessionInstance.title,
+        SessionInstance.project_id,
+        Project.name.label("project_name"),
+        SessionInstance.created_at,
+        func.coalesce(last_message_at, SessionInstance.created_at).label("last_activity"),
+        message_count.label("message_count"),
+    ).outerjoin(Project, Project.id == SessionInstance.project_id)
+
+def summary_page_query(filters, limit: int, cursor: Optional[str] = None):
+    # walks ix_sessions_*_created_at_id backwards; fetches one extra row to
+    # know whether there is a next page
+    query = _summary_query().filter(*filters)
+    if cursor:
+        created_at, session_id = decode_cursor(cursor)
+        query = query.filter(tuple_(SessionInstance.created_at, SessionInstance.id) < tuple_(created_at, session_id))
+    return query.order_by(SessionInstance.created_at.desc(), SessionInstance.id.desc()).limit(limit + 1)
+
+async def _list_session_summaries(db: AsyncSession, filters, limit: int, cursor: Optional[str]):
+    rows = (await db.execute(summary_page_query(filters, limit, cursor))).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+    return rows, next_cursor
+
+async def create_session(db: AsyncSession, sessioninstance: SessionInstanceCreate):
     db_session = SessionInstance(user_id=sessioninstance.user_id, project_id=sessioninstance.project_id, title=sessioninstance.title)
     db.add(db_session)
-    db.commit()
-    db.refresh(db_session)
-    return db_session
+    await db.commit()
+    return await get_session_detail(db, session_id=db_session.id)
 
-def get_sessions(db: Session, user_id: int):
-    return db.query(SessionInstance).filter(SessionInstance.user_id == user_id).order_by(SessionInstance.created_at.desc()).all()
+async def get_sessions(db: AsyncSession, user_id: int, limit: int = 50, cursor: Optional[str] = None):
+    return await _list_session_summaries(db, [SessionInstance.user_id == user_id], limit, cursor)
 
-def get_session(db: Session, session_id: int):
-    return db.query(SessionInstance).filter(SessionInstance.id == session_id).first()
+async def get_session(db: AsyncSession, session_id: int):
+    result = await db.execute(
+        select(SessionInstance).options(*_SESSION_LOAD).filter(SessionInstance.id == session_id).execution_options(populate_existing=True)
+    )
+    return result.scalars().first()
 
-def generate_session_title(db: Session, session: SessionInstance, model: str = "ollama"):
+async def get_session_detail(db: AsyncSession, session_id: int):
+    result = await db.execute(
+        select(SessionInstance).options(*_SESSION_DETAIL_LOAD).filter(SessionInstance.id == session_id).execution_options(populate_existing=True)
+    )
+    return result.scalars().first()
+
+async def get_session_summary(db: AsyncSession, session_id: int):
+    result = await db.execute(_summary_query().filter(SessionInstance.id == session_id))
+    return result.first()
+
+async def generate_session_title(db: AsyncSession, session: SessionInstance, model: str = "ollama"):
+    first = await db.execute(
+        select(Message.content).filter(Message.session_id == session.id).order_by(Message.created_at.asc()).limit(1)
+    )
     messages = [
         {"role": "system", "content": "You are a helpful assistant that summarizes user prompts into short titles."},
-        {"role": "user", "content": f"Summarize this chat in 4 words: {session.messages[0].content}"}
+        {"role": "user", "content": f"Summarize this chat in 4 words: {first.scalar()}"}
     ]
-    title = LLMFactory.generate_response(messages, model=model)[:50].strip()
+    title = (await run_in_threadpool(LLMFactory.generate_response, messages, model))[:50].strip()
     session.title = title.strip('"') or "New Chat"
-    db.commit()
-    db.refresh(session)
-    return session
+    await db.commit()
+    return await get_session(db, session_id=session.id)
 
-def rename_session_crud(db: Session, session_id: int, session_data: SessionInstanceUpdate):
-    session = get_session(db, session_id=session_id)
+async def rename_session_crud(db: AsyncSession, session_id: int, session_data: SessionInstanceUpdate):
+    session = await get_session(db, session_id=session_id)
     if session_data.title is not None:
         session.title = session_data.title
     if session_data.project_id is not None:
         session.project_id = session_data.project_id
-    db.commit()
-    db.refresh(session)
-    return session
-
-def delete_session_crud(db: Session, session_id: int):
-    session = get_session(db, session_id=session_id)
-    db.delete(session)
-    db.commit()
+    await db.commit()
+    return await get_session_summary(db, session_id=session_id)
+
+async def delete_session_crud(db: AsyncSession, session_id: int):
+    # messages are removed by ON DELETE CASCADE
+    await db.execute(delete(SessionInstance).where(SessionInstance.id == session_id))
+    await db.commit()
     return {"message": "Session deleted successfully"}
 
-def list_sessions_by_project(db: Session, user_id: int, project_id: int):
-    return db.query(SessionInstance).filter(SessionInstance.user_id == user_id, SessionInstance.project_id == project_id).order_by(SessionInstance.created_at.desc()).all()
\ No newline at end of file
+async def list_sessions_by_project(db: AsyncSession, user_id: int, project_id: int, limit: int = 50, cursor: Optional[str] = None):
+    return await _list_session_summaries(
+        db, [SessionInstance.user_id == user_id, SessionInstance.project_id == project_id], limit, cursor
+    )
@@ -0,0 +1,51 @@
+# app/services/storage_cleanup.py
+import logging
+from app.services.supabase_client import get_supabase
+
+logger = logging.getLogger(__name__)
+
+PROJECT_BUCKETS = ("project-files", "faiss-indexes")
+LIST_PAGE_SIZE = 100
+REMOVE_BATCH_SIZE = 100
+
+def list_objects(bucket: str, prefix: str):
+    """
+    Every object path under `prefix`. Storage list() only returns one folder
+    level per call, so folders are walked explicitly, page by page.
+    """
+    storage = get_supabase().storage.from_(bucket)
+    paths = []
+    pending = [prefix.rstrip("/")]
+    while pending:
+        folder = pending.pop()
+        offset = 0
+        while True:
+            entries = storage.list(folder, {"limit": LIST_PAGE_SIZE, "offset": offset})
+            for entry in entries:
+                path = f"{folder}/{entry['name']}"
+                # folders are returned as entries without an id
+                if entry.get("id") is None:
+                    pending.append(path)
+                else:
+                    paths.append(path)
+            if len(entries) < LIST_PAGE_SIZE:
+                break
+            offset += LIST_PAGE_SIZE
+    return paths
+
+def remove_prefix(bucket: str, prefix: str) -> int:
+    paths = list_objects(bucket, prefix)
+    storage = get_supabase().storage.from_(bucket)
+    for i in range(0, len(paths), REMOVE_BATCH_SIZE):
+        storage.remove(paths[i:i + REMOVE_BATCH_SIZE])
+    return len(paths)
+
+def delete_project_storage(project_id: int):
+    """Background job: remove a deleted project's uploaded files and FAISS index."""
+    prefix = f"project_{project_id}/"
+    for bucket in PROJECT_BUCKETS:
+        try:
+            removed = remove_prefix(bucket, prefix)
+            logger.info("Removed %d objects from %s/%s", removed, bucket, prefix)
+        except Exception:
+            logger.exception("Storage cleanup of %s/%s failed", bucket, prefix)
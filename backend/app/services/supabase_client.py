@@ -1,7 +1,11 @@
-from supabase import create_client
+from functools import lru_cache
 import os
 
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+@lru_cache(maxsize=None)
+def get_supabase():
+    # created on first storage access; the SDK is slow to import
+    from supabase import create_client
+    return create_client(SUPABASE_URL, SUPABASE_KEY)
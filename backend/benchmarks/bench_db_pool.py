@@ -0,0 +1,140 @@
+"""
+Load test for the data layer: sync threadpool handlers vs async handlers.
+
+Serves the message history query through two in-process FastAPI routes, one
+written the old way (sync ``def`` + ``get_db``) and one on the async engine
+(``async def`` + ``get_async_db``), and drives both at the same concurrency.
+Reports requests/s, latency percentiles and the peak number of pooled
+connections checked out, as JSON.
+
+Run from ``backend/`` against the database configured in ``DATABASE_URL``:
+
+    python -m benchmarks.bench_db_pool --requests 2000 --concurrency 64
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.migrations import run_migrations
+from app.database import SessionLocal, async_engine, engine, get_async_db, get_db
+from app.models.user_model import User
+from app.models.session_model import SessionInstance
+from app.models.message_model import Message, SenderType
+
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/sync/{session_id}")
+    def sync_history(session_id: int, db: Session = Depends(get_db)):
+        rows = db.query(Message).filter(Message.session_id == session_id).order_by(Message.created_at.asc()).all()
+        return {"count": len(rows)}
+
+    @app.get("/async/{session_id}")
+    async def async_history(session_id: int, db: AsyncSession = Depends(get_async_db)):
+        result = await db.execute(select(Message).filter(Message.session_id == session_id).order_by(Message.created_at.asc()))
+        return {"count": len(result.scalars().all())}
+
+    return app
+
+
+def seed(messages: int) -> int:
+    # same schema path as the app, so the database stays usable by it afterwards
+    run_migrations()
+    db = SessionLocal()
+    try:
+        user = User(username=f"bench_{time.time_ns()}", email=f"bench_{time.time_ns()}@example.com", hashed_password="x")
+        db.add(user)
+        db.flush()
+        session = SessionInstance(user_id=user.id, title="bench")
+        db.add(session)
+        db.flush()
+        db.add_all(
+            Message(session_id=session.id, sender_type=SenderType.user, content=f"message {i}")
+            for i in range(messages)
+        )
+        db.commit()
+        return session.id
+    finally:
+        db.close()
+
+
+async def _sample_pool(pool, peak: dict, stop: asyncio.Event):
+    while not stop.is_set():
+        peak["value"] = max(peak["value"], pool.checkedout())
+        await asyncio.sleep(0.001)
+
+
+async def run_path(app: FastAPI, path: str, pool, requests: int, concurrency: int) -> dict:
+    latencies = []
+    errors = 0
+    gate = asyncio.Semaphore(concurrency)
+    peak = {"value": 0}
+    stop = asyncio.Event()
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        async def one():
+            nonlocal errors
+            async with gate:
+                start = time.perf_counter()
+                response = await client.get(path)
+                latencies.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    errors += 1
+
+        sampler = asyncio.create_task(_sample_pool(pool, peak, stop))
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(requests)))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await sampler
+
+    latencies.sort()
+    quantiles = statistics.quantiles(latencies, n=100)
+    return {
+        "requests": requests,
+        "errors": errors,
+        "seconds": round(elapsed, 4),
+        "requests_per_second": round(requests / elapsed, 2),
+        "p50_ms": round(quantiles[49] * 1000, 3),
+        "p95_ms": round(quantiles[94] * 1000, 3),
+        "p99_ms": round(quantiles[98] * 1000, 3),
+        "peak_connections": peak["value"],
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--messages", type=int, default=200, help="messages in the seeded session")
+    args = parser.parse_args()
+
+    session_id = seed(args.messages)
+    app = build_app()
+    report = {
+        "database": engine.url.render_as_string(hide_password=True),
+        "pool": {
+            "size": settings.DB_POOL_SIZE,
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+            "recycle": settings.DB_POOL_RECYCLE,
+        },
+        "concurrency": args.concurrency,
+        "sync": await run_path(app, f"/sync/{session_id}", engine.pool, args.requests, args.concurrency),
+        "async": await run_path(app, f"/async/{session_id}", async_engine.sync_engine.pool, args.requests, args.concurrency),
+    }
+    print(json.dumps(report, indent=2))
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,96 @@
+"""
+Cold-start benchmark: time and memory to import the API.
+
+Each run starts a fresh interpreter that imports ``main`` (the FastAPI app)
+and reports the wall-clock import time, the peak RSS afterwards and which
+heavy third-party modules ended up loaded. With ``--warm-up`` the child
+also runs the embedding warm-up hook, timed separately.
+
+Prints one JSON document in the ``benchmarks.run`` format, so two runs can be
+diffed with ``python -m benchmarks.compare`` (latency and RSS are gated).
+
+    python -m benchmarks.bench_import --runs 10 --output import.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.common import Recorder, environment
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# modules that should only load when their feature is first used
+HEAVY_MODULES = (
+    "torch", "sentence_transformers", "faiss", "numpy", "git", "supabase",
+    "google.genai", "openai", "anthropic", "ollama", "alembic",
+)
+
+CHILD = """
+import json, resource, sys, time
+start = time.perf_counter()
+import main
+import_s = time.perf_counter() - start
+rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+warm_up_s = None
+if {warm_up}:
+    from app.embeddings.indexer import warm_up
+    start = time.perf_counter()
+    warm_up()
+    warm_up_s = time.perf_counter() - start
+print(json.dumps({{
+    "import_s": import_s,
+    "warm_up_s": warm_up_s,
+    "rss_mb": rss_mb,
+    "loaded": [name for name in {heavy!r} if name in sys.modules],
+}}))
+"""
+
+
+def run_child(warm_up: bool, workdir: str) -> dict:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [BACKEND_DIR, env.get("PYTHONPATH")]))
+    env.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(workdir, 'import.db')}")
+    code = CHILD.format(warm_up=warm_up, heavy=HEAVY_MODULES)
+    out = subprocess.run([sys.executable, "-c", code], cwd=workdir, env=env, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters to start")
+    parser.add_argument("--warm-up", action="store_true", help="also time the embedding warm-up hook")
+    parser.add_argument("--output", help="write the JSON report here as well as to stdout")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="sca_import_")
+    runs = [run_child(args.warm_up, workdir) for _ in range(args.runs)]
+
+    results = {}
+    rec = Recorder("imports")
+    for run in runs:
+        rec.record(run["import_s"])
+    results["import_main"] = {**rec.summary(), "rss_mb": round(statistics.median(r["rss_mb"] for r in runs), 1)}
+    if args.warm_up:
+        rec = Recorder("warm-ups")
+        for run in runs:
+            rec.record(run["warm_up_s"])
+        results["warm_up"] = rec.summary()
+
+    report = {
+        "environment": environment(),
+        "parameters": {**vars(args), "heavy_modules_loaded": runs[-1]["loaded"]},
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Serialization and compression benchmark for large session payloads.
+
+Builds ``SessionInstanceOut`` payloads (a session with its full message list,
+AI answers quoting code) and times whole requests through FastAPI routing and
+response serialization, called in-process over ASGI, for each way a route can
+produce its body:
+
+* ``model_default`` - response_model route with the default response class:
+  FastAPI validates and serializes in one TypeAdapter.dump_json call
+* ``model_orjson``  - the same route with response_class=ORJSONResponse, which
+  drops off that path (validate, jsonable_encoder, orjson)
+* ``dict_default``  - plain dict route, no response_model (jsonable_encoder + json.dumps)
+* ``dict_orjson``   - plain dict route with response_class=ORJSONResponse, as
+  the project routes use
+
+then the compression middleware's gzip and, when installed, brotli settings
+on the encoded body. Times are process CPU time per request; every entry
+reports the bytes that would go on the wire.
+
+Prints one JSON document in the ``benchmarks.run`` format, so two runs can be
+diffed with ``python -m benchmarks.compare``.
+
+    python -m benchmarks.bench_serialization --messages 2000 --output ser.json
+"""
+import argparse
+import asyncio
+import gzip
+import json
+import random
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+from fastapi import FastAPI
+
+from app.core.compression import brotli
+from app.core.config import settings
+from app.core.responses import ORJSONResponse
+from app.schemas.session_schema import SessionInstanceOut
+from benchmarks.common import Recorder, environment
+from benchmarks.synthetic_repo import _source_lines
+
+
+def build_sessions(sessions: int, messages: int, seed: int) -> List[SessionInstanceOut]:
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1)
+    result = []
+    for s in range(sessions):
+        items = []
+        for m in range(messages):
+            if m % 2:
+                code = "\n".join(_source_lines(rng, rng.randint(5, 40), m))
+                content = f"Here is how handler_{m} works:\n\n```python\n{code}\n```\n"
+            else:
+                content = f"how does handler_{m} filter {rng.choice(['users', 'orders', 'sessions'])}?"
+            items.append({
+                "id": s * messages + m, "content": content, "model_used": "ollama",
+                "sender_type": "ai" if m % 2 else "user", "created_at": start + timedelta(seconds=m),
+            })
+        result.append(SessionInstanceOut.model_validate({
+            "id": s, "user_id": 1, "title": f"session {s}", "project_id": 1,
+            "project": {"id": 1, "name": "bench", "user_id": 1}, "messages": items, "created_at": start,
+        }))
+    return result
+
+
+def build_app(sessions: List[SessionInstanceOut]) -> FastAPI:
+    """One route per variant; the handlers only look up a prebuilt payload."""
+    app = FastAPI()
+    dicts = [session.model_dump(mode="json") for session in sessions]
+
+    @app.get("/model_default/{i}", response_model=SessionInstanceOut)
+    async def model_default(i: int):
+        return sessions[i]
+
+    @app.get("/model_orjson/{i}", response_model=SessionInstanceOut, response_class=ORJSONResponse)
+    async def model_orjson(i: int):
+        return sessions[i]
+
+    @app.get("/dict_default/{i}")
+    async def dict_default(i: int):
+        return dicts[i]
+
+    @app.get("/dict_orjson/{i}", response_class=ORJSONResponse)
+    async def dict_orjson(i: int):
+        return dicts[i]
+
+    return app
+
+
+async def call(app: FastAPI, path: str) -> bytes:
+    """GET `path` through the ASGI app, without a server; returns the body."""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": path, "raw_path": path.encode(), "root_path": "", "query_string": b"", "headers": [],
+        "client": ("127.0.0.1", 0), "server": ("127.0.0.1", 80),
+    }
+    body = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            body.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return b"".join(body)
+
+
+def _cpu(fn, payloads, rec: Recorder):
+    out = None
+    for payload in payloads:
+        start = time.process_time()
+        out = fn(payload)
+        rec.record(time.process_time() - start)
+    return out
+
+
+async def time_routes(app: FastAPI, count: int) -> tuple:
+    results = {}
+    bodies = {}
+    for variant in ("model_default", "model_orjson", "dict_default", "dict_orjson"):
+        paths = [f"/{variant}/{i}" for i in range(count)]
+        # first pass warms up the route (dependency analysis, adapters)
+        bodies[variant] = [await call(app, path) for path in paths]
+        rec = Recorder("requests")
+        for path in paths:
+            start = time.process_time()
+            await call(app, path)
+            rec.record(time.process_time() - start)
+        results[f"route_{variant}"] = {**rec.summary(), "bytes": round(sum(map(len, bodies[variant])) / count)}
+    return results, bodies
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sessions", type=int, default=20, help="payloads to encode")
+    parser.add_argument("--messages", type=int, default=500, help="messages per session")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report here as well as to stdout")
+    args = parser.parse_args(argv)
+
+    payloads = build_sessions(args.sessions, args.messages, args.seed)
+    results, bodies = asyncio.run(time_routes(build_app(payloads), len(payloads)))
+
+    raw = bodies["model_default"]
+    compressors = {"gzip": lambda b: gzip.compress(b, compresslevel=settings.COMPRESSION_GZIP_LEVEL, mtime=0)}
+    if brotli is not None:
+        compressors["br"] = lambda b: brotli.compress(b, quality=settings.COMPRESSION_BROTLI_QUALITY)
+    for name, compress in compressors.items():
+        rec = Recorder("payloads")
+        _cpu(compress, raw, rec)
+        size = sum(len(compress(b)) for b in raw) / len(raw)
+        results[f"compress_{name}"] = {
+            **rec.summary(), "bytes": round(size), "ratio": round(size / (sum(map(len, raw)) / len(raw)), 4),
+        }
+
+    report = {
+        "environment": environment(),
+        "parameters": {**vars(args), "brotli": brotli is not None},
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
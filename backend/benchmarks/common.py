@@ -0,0 +1,71 @@
+"""Timing helpers and the JSON result format shared by the benchmarks."""
+import os
+import platform
+import statistics
+import subprocess
+import time
+from contextlib import contextmanager
+
+
+class Recorder:
+    """Collects per-call latencies and processed item counts for one benchmark."""
+
+    def __init__(self, unit: str):
+        self.unit = unit
+        self.latencies = []
+        self.items = 0
+
+    @contextmanager
+    def measure(self, items: int = 1):
+        start = time.perf_counter()
+        yield
+        self.latencies.append(time.perf_counter() - start)
+        self.items += items
+
+    def record(self, seconds: float, items: int = 1):
+        self.latencies.append(seconds)
+        self.items += items
+
+    def summary(self) -> dict:
+        total = sum(self.latencies)
+        result = {
+            "calls": len(self.latencies),
+            "items": self.items,
+            "unit": self.unit,
+            "total_s": round(total, 6),
+            "throughput_per_s": round(self.items / total, 3) if total else None,
+            "mean_ms": round(statistics.fmean(self.latencies) * 1000, 3) if self.latencies else None,
+        }
+        result.update(percentiles(self.latencies))
+        return result
+
+
+def percentiles(latencies) -> dict:
+    if not latencies:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None}
+    if len(latencies) == 1:
+        value = round(latencies[0] * 1000, 3)
+        return {"p50_ms": value, "p95_ms": value, "p99_ms": value}
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "p50_ms": round(cuts[49] * 1000, 3),
+        "p95_ms": round(cuts[94] * 1000, 3),
+        "p99_ms": round(cuts[98] * 1000, 3),
+    }
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except Exception:
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
@@ -0,0 +1,61 @@
+"""
+Compare two benchmark reports from ``benchmarks.run``.
+
+Prints the p50/p95/p99 and throughput change per benchmark and exits non-zero
+when any latency percentile regressed by more than ``--threshold``.
+
+    python -m benchmarks.compare before.json after.json --threshold 0.10
+"""
+import argparse
+import json
+import sys
+
+METRICS = ("p50_ms", "p95_ms", "p99_ms", "rss_mb", "bytes", "throughput_per_s")
+
+
+def _change(before, after):
+    if not before or after is None:
+        return None
+    return (after - before) / before
+
+
+def compare(before: dict, after: dict, threshold: float):
+    rows, regressions = [], []
+    for name, old in before["results"].items():
+        new = after["results"].get(name)
+        if new is None:
+            continue
+        for metric in METRICS:
+            change = _change(old.get(metric), new.get(metric))
+            if change is None:
+                continue
+            rows.append((name, metric, old[metric], new[metric], change))
+            # throughput is reported for context; the gate is on latency (and memory, payload size)
+            if metric != "throughput_per_s" and change > threshold:
+                regressions.append((name, metric, change))
+    return rows, regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed relative latency increase")
+    args = parser.parse_args(argv)
+
+    with open(args.before, encoding="utf-8") as f:
+        before = json.load(f)
+    with open(args.after, encoding="utf-8") as f:
+        after = json.load(f)
+
+    rows, regressions = compare(before, after, args.threshold)
+    print(f"{'benchmark':<26} {'metric':<17} {'before':>12} {'after':>12} {'change':>8}")
+    for name, metric, old, new, change in rows:
+        print(f"{name:<26} {metric:<17} {old:>12.3f} {new:>12.3f} {change:>+8.1%}")
+    for name, metric, change in regressions:
+        print(f"REGRESSION {name} {metric} {change:+.1%}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,165 @@
+"""
+Stand-in Ollama server for benchmarks and local runs without a GPU.
+
+Speaks the parts of the Ollama HTTP API the backend uses: ``POST /api/chat``
+(streamed NDJSON or a single JSON object, an empty ``messages`` list only
+"loads" the model), ``GET /api/tags`` and ``GET /api/version``. Latency is
+simulated with a model load delay (paid again after ``keep_alive`` expires or
+when ``num_ctx`` changes, like the real server), a time-to-first-token and a
+per-token delay. Every request body is kept in ``server.requests``, accepted
+connections are counted in ``server.connections``.
+
+    python -m benchmarks.fake_ollama --port 11434 --ttft 0.2 --token-delay 0.01
+"""
+import argparse
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def _keep_alive_seconds(value) -> float:
+    if value is None:
+        return 300.0
+    if isinstance(value, (int, float)):
+        return float(value) if value >= 0 else float("inf")
+    match = re.fullmatch(r"(-?\d+(?:\.\d+)?)(ms|s|m|h)?", str(value).strip())
+    if not match:
+        return 300.0
+    number = float(match.group(1))
+    if number < 0:
+        return float("inf")
+    return number * {"ms": 0.001, "s": 1, "m": 60, "h": 3600, None: 1}[match.group(2)]
+
+
+class FakeOllamaServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, load_delay=1.0, ttft=0.1, token_delay=0.005, tokens=40):
+        super().__init__(address, _Handler)
+        self.load_delay = load_delay
+        self.ttft = ttft
+        self.token_delay = token_delay
+        self.tokens = tokens
+        self.requests = []
+        self.connections = 0
+        self.loads = 0
+        self._loaded = {}  # model -> (num_ctx, expires_at)
+        self._lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def process_request(self, request, client_address):
+        with self._lock:
+            self.connections += 1
+        super().process_request(request, client_address)
+
+    def ensure_loaded(self, model: str, options: dict, keep_alive) -> float:
+        """Seconds of load delay this request pays."""
+        num_ctx = options.get("num_ctx")
+        now = time.monotonic()
+        with self._lock:
+            loaded = self._loaded.get(model)
+            delay = 0.0
+            if loaded is None or loaded[0] != num_ctx or loaded[1] < now:
+                delay = self.load_delay
+                self.loads += 1
+            self._loaded[model] = (num_ctx, now + delay + _keep_alive_seconds(keep_alive))
+        return delay
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/api/version":
+            self._send_json({"version": "0.0.0-fake"})
+        elif self.path == "/api/tags":
+            self._send_json({"models": [{"name": model} for model in self.server._loaded]})
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def do_POST(self):
+        if self.path != "/api/chat":
+            self._send_json({"error": "not found"}, status=404)
+            return
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        server = self.server
+        server.requests.append(body)
+        model = body.get("model", "llama3")
+        options = body.get("options") or {}
+        time.sleep(server.ensure_loaded(model, options, body.get("keep_alive")))
+
+        messages = body.get("messages") or []
+        if not messages:
+            self._send_json({"model": model, "done": True, "done_reason": "load", "message": {"role": "assistant", "content": ""}})
+            return
+
+        limit = options.get("num_predict") or server.tokens
+        count = server.tokens if limit < 0 else min(server.tokens, limit)
+        prompt = str(messages[-1].get("content", ""))[:40]
+        words = [f"word{i} " for i in range(count)]
+        words[:1] = [f"Answer to: {prompt} "]
+
+        if body.get("stream", True) is False:
+            time.sleep(server.ttft + server.token_delay * count)
+            self._send_json({"model": model, "done": True, "message": {"role": "assistant", "content": "".join(words)}})
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        time.sleep(server.ttft)
+        for word in words:
+            self._chunk({"model": model, "done": False, "message": {"role": "assistant", "content": word}})
+            time.sleep(server.token_delay)
+        self._chunk({"model": model, "done": True, "eval_count": count})
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _chunk(self, payload):
+        data = json.dumps(payload).encode("utf-8") + b"\n"
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+
+def serve(host="127.0.0.1", port=0, **latency) -> FakeOllamaServer:
+    """Start a server in a daemon thread; port 0 picks a free port (see server.url)."""
+    server = FakeOllamaServer((host, port), **latency)
+    threading.Thread(target=server.serve_forever, name="fake-ollama", daemon=True).start()
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--load-delay", type=float, default=1.0, help="seconds to 'load' a cold model")
+    parser.add_argument("--ttft", type=float, default=0.1, help="seconds before the first token")
+    parser.add_argument("--token-delay", type=float, default=0.005, help="seconds between tokens")
+    parser.add_argument("--tokens", type=int, default=40, help="tokens per answer")
+    args = parser.parse_args(argv)
+    server = FakeOllamaServer(
+        (args.host, args.port), load_delay=args.load_delay, ttft=args.ttft, token_delay=args.token_delay, tokens=args.tokens,
+    )
+    print(f"fake Ollama on {server.url}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
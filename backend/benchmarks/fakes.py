@@ -0,0 +1,113 @@
+"""
+In-process stand-ins for the external services used by the hot paths.
+
+``install()`` must run before any ``app`` module is imported: the storage
+client is bound at import time by the modules that use it.
+"""
+import hashlib
+import sys
+import threading
+import time
+import types
+
+import numpy as np
+
+
+class FakeBucket:
+    def __init__(self, objects: dict, lock: threading.Lock):
+        self._objects = objects
+        self._lock = lock
+
+    def upload(self, path, file, file_options=None):
+        data = file.read() if hasattr(file, "read") else file
+        with self._lock:
+            # same behaviour as the storage client: no overwrite unless upserting
+            if path in self._objects and not (file_options or {}).get("upsert"):
+                raise FileExistsError(path)
+            self._objects[path] = bytes(data)
+
+    def download(self, path):
+        with self._lock:
+            if path not in self._objects:
+                # same behaviour as the storage client: missing objects raise
+                raise FileNotFoundError(path)
+            return self._objects[path]
+
+    def remove(self, paths):
+        with self._lock:
+            for path in paths:
+                self._objects.pop(path, None)
+
+    def list(self, path=None, options=None):
+        options = options or {}
+        prefix = path.rstrip("/") + "/" if path else ""
+        entries = {}
+        with self._lock:
+            for key in self._objects:
+                if key.startswith(prefix):
+                    rest = key[len(prefix):]
+                    name = rest.split("/", 1)[0]
+                    entries[name] = None if "/" in rest else name
+        items = [{"name": name, "id": object_id} for name, object_id in sorted(entries.items())]
+        offset = options.get("offset", 0)
+        return items[offset:offset + options.get("limit", 100)]
+
+
+class FakeStorage:
+    def __init__(self):
+        self.buckets = {}
+        self._lock = threading.Lock()
+
+    def from_(self, bucket):
+        with self._lock:
+            objects = self.buckets.setdefault(bucket, {})
+        return FakeBucket(objects, self._lock)
+
+
+class FakeSupabase:
+    def __init__(self):
+        self.storage = FakeStorage()
+
+
+class FakeEncoder:
+    """
+    Deterministic hashing encoder with the same output shape as all-MiniLM-L6-v2,
+    for runs that should not load torch.
+    """
+    def __init__(self, model_name=None, dim=384):
+        self.dim = dim
+
+    def encode(self, texts, show_progress_bar=False, convert_to_numpy=True, **kwargs):
+        out = np.empty((len(texts), self.dim), dtype="float32")
+        for row, text in enumerate(texts):
+            seed = int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+            out[row] = np.random.default_rng(seed).random(self.dim, dtype="float32")
+        return out
+
+
+def fake_llm(latency: float = 0.0):
+    def generate(messages, model="ollama"):
+        if latency:
+            time.sleep(latency)
+        return f"Suggested change for: {messages[-1]['content'][:40]}"
+    return generate
+
+
+def install(fake_embeddings: bool = False, llm_latency: float = 0.0, llm: bool = True) -> FakeSupabase:
+    """
+    Swap in the fake storage (and, unless `llm` is False, the fake LLM; with
+    llm=False the real providers run, e.g. against benchmarks/fake_ollama).
+    """
+    client = FakeSupabase()
+    module = types.ModuleType("app.services.supabase_client")
+    module.get_supabase = lambda: client
+    sys.modules["app.services.supabase_client"] = module
+
+    if llm:
+        from app.services.llm_factory import LLMFactory
+        LLMFactory.generate = staticmethod(fake_llm(llm_latency))
+
+    if fake_embeddings:
+        from app.embeddings import indexer
+        indexer.load_embedding_model = FakeEncoder
+    return client
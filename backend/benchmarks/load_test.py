@@ -0,0 +1,265 @@
+"""
+End-to-end load test of the API with every external service faked.
+
+Serves ``main.app`` with uvicorn in a background thread against a throwaway
+SQLite database (or ``DATABASE_URL``), the in-process storage fake from
+``benchmarks/fakes.py`` and a local fake Ollama (``benchmarks/fake_ollama.py``)
+that streams tokens with the configured latency. The real LLM client, admission
+control, indexing and retrieval code run unchanged.
+
+``--users`` virtual users run concurrently. Each signs up, logs in, uploads a
+synthetic repository (with probability ``--upload-ratio``) and waits for it to
+be indexed, opens a session, then until ``--duration`` runs out picks actions
+from ``--mix`` with exponential think time between them. Prints one JSON
+document in the ``benchmarks.run`` format with request counts, errors, 429s
+(``shed``), requests/s and latency percentiles per endpoint.
+
+Admission limits come from the usual GENERATION_* environment variables.
+
+    python -m benchmarks.load_test --users 20 --duration 60 --fake-embeddings
+    python -m benchmarks.load_test --mix message=1 --ollama-ttft 0.5 --ollama-token-delay 0.02
+"""
+import argparse
+import asyncio
+import io
+import json
+import logging
+import os
+import random
+import socket
+import sys
+import tempfile
+import threading
+import time
+import uuid
+import zipfile
+from collections import Counter
+
+# the run chdirs into a scratch directory, so pin the backend on sys.path first
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks import fake_ollama, fakes, synthetic_repo  # noqa: E402
+from benchmarks.common import Recorder, environment  # noqa: E402
+
+DEFAULT_MIX = "message=4,history=3,sessions=2,session=2,projects=1,search=1,suggest=1"
+
+QUESTIONS = [
+    "how does handler_3_10 filter enabled items?",
+    "where is fetch_items called with an offset?",
+    "explain the limit argument of the order handlers",
+    "which handlers deal with sessions?",
+]
+
+
+def parse_mix(value: str) -> dict:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=10, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30, help="seconds of traffic after a user's setup")
+    parser.add_argument("--think-time", type=float, default=0.5, help="mean seconds between a user's actions (0: none)")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="action weights, e.g. message=4,history=3")
+    parser.add_argument("--upload-ratio", type=float, default=0.5, help="share of users that upload a project")
+    parser.add_argument("--files", type=int, default=30, help="files in each uploaded repository")
+    parser.add_argument("--lines", type=int, default=80, help="mean lines per uploaded file")
+    parser.add_argument("--index-timeout", type=float, default=60, help="seconds to wait for an upload to be indexed")
+    parser.add_argument("--ollama-load-delay", type=float, default=1.0, help="fake Ollama cold model load")
+    parser.add_argument("--ollama-ttft", type=float, default=0.1, help="fake Ollama time to first token")
+    parser.add_argument("--ollama-token-delay", type=float, default=0.005, help="fake Ollama seconds per token")
+    parser.add_argument("--ollama-tokens", type=int, default=40, help="fake Ollama tokens per answer")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--fake-embeddings", action="store_true", help="hashing encoder instead of sentence-transformers")
+    parser.add_argument("--output", help="write the JSON report here as well as to stdout")
+    return parser.parse_args(argv)
+
+
+class Stats:
+    """Latency and status codes per endpoint label (method + route template)."""
+
+    def __init__(self):
+        self.recorders = {}
+        self.statuses = {}
+
+    async def call(self, client, method: str, label: str, url: str, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+            status = response.status_code
+        except Exception as e:
+            response, status = None, type(e).__name__
+        self.recorders.setdefault(label, Recorder("requests")).record(time.perf_counter() - start)
+        self.statuses.setdefault(label, Counter())[str(status)] += 1
+        return response
+
+    def summary(self, wall: float) -> dict:
+        results = {}
+        totals = Counter()
+        for label, rec in sorted(self.recorders.items()):
+            statuses = self.statuses[label]
+            requests = sum(statuses.values())
+            shed = statuses.get("429", 0)
+            errors = sum(n for status, n in statuses.items() if not status.isdigit() or int(status) >= 400) - shed
+            totals.update(requests=requests, errors=errors, shed=shed)
+            results[label] = {
+                **rec.summary(),
+                "requests_per_s": round(requests / wall, 3),
+                "errors": errors,
+                "shed": shed,
+                "error_rate": round(errors / requests, 4),
+                "status": dict(statuses),
+            }
+        results["all"] = {
+            **totals,
+            "requests_per_s": round(totals["requests"] / wall, 3),
+            "error_rate": round(totals["errors"] / totals["requests"], 4) if totals["requests"] else None,
+        }
+        return results
+
+
+def build_upload(workdir: str, files: int, lines: int, seed: int) -> bytes:
+    repo_dir = os.path.join(workdir, "repo")
+    synthetic_repo.build(repo_dir, files=files, lines=lines, seed=seed)
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as archive:
+        for root, _, names in os.walk(repo_dir):
+            for name in names:
+                path = os.path.join(root, name)
+                archive.write(path, os.path.relpath(path, repo_dir))
+    return buf.getvalue()
+
+
+def start_server(app, host: str = "127.0.0.1"):
+    """uvicorn on a free port in a daemon thread; returns (server, base url)."""
+    import uvicorn
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, 0))
+    server = uvicorn.Server(uvicorn.Config(app, log_level="warning", lifespan="on"))
+    threading.Thread(target=server.run, kwargs={"sockets": [sock]}, name="uvicorn", daemon=True).start()
+    deadline = time.monotonic() + 60
+    while not server.started:
+        if time.monotonic() > deadline:
+            raise RuntimeError("uvicorn did not start")
+        time.sleep(0.05)
+    return server, f"http://{host}:{sock.getsockname()[1]}"
+
+
+async def virtual_user(number: int, client, stats: Stats, args, mix: dict, upload: bytes, run_id: str):
+    rng = random.Random(args.seed * 100_003 + number)
+    name = f"load_{run_id}_{number}"
+    await stats.call(client, "POST", "POST /api/signup", "/api/signup",
+                     json={"username": name, "email": f"{name}@example.com", "password": "pw"})
+    response = await stats.call(client, "POST", "POST /api/login", "/api/login", json={"username": name, "password": "pw"})
+    if response is None or response.status_code != 200:
+        return
+    user_id = response.json()["user"]["id"]
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    project_id = None
+    if rng.random() < args.upload_ratio:
+        response = await stats.call(client, "POST", "POST /api/projects/upload", "/api/projects/upload", headers=headers,
+                                    files={"upload": ("repo.zip", upload, "application/zip")}, data={"project_name": name})
+        if response is not None and response.status_code == 200:
+            project_id = response.json()["project"]["id"]
+            # indexing runs as a background task after the upload returns
+            index_deadline = time.monotonic() + args.index_timeout
+            while time.monotonic() < index_deadline:
+                response = await stats.call(client, "GET", "GET /api/projects/{project_id}/status",
+                                            f"/api/projects/{project_id}/status", headers=headers)
+                if response is not None and response.status_code == 200 and response.json().get("chunk_count"):
+                    break
+                await asyncio.sleep(0.5)
+
+    response = await stats.call(client, "POST", "POST /api/sessions", "/api/sessions",
+                                json={"user_id": user_id, "project_id": project_id})
+    if response is None or response.status_code != 200:
+        return
+    session_id = response.json()["id"]
+
+    actions, weights = list(mix), list(mix.values())
+    deadline = time.monotonic() + args.duration
+    while time.monotonic() < deadline:
+        action = rng.choices(actions, weights)[0]
+        if action == "message":
+            await stats.call(client, "POST", "POST /api/messages", "/api/messages", headers=headers, json={
+                "session_id": session_id, "sender_type": "user", "content": rng.choice(QUESTIONS), "model_used": "ollama",
+            })
+        elif action == "history":
+            await stats.call(client, "GET", "GET /api/messages/{session_id}", f"/api/messages/{session_id}?limit=50")
+        elif action == "sessions":
+            await stats.call(client, "GET", "GET /api/sessions", "/api/sessions", headers=headers)
+        elif action == "session":
+            await stats.call(client, "GET", "GET /api/sessions/{session_id}", f"/api/sessions/{session_id}")
+        elif action == "projects":
+            await stats.call(client, "GET", "GET /api/projects/list", "/api/projects/list", headers=headers)
+        elif action == "search":
+            await stats.call(client, "POST", "POST /api/projects/search", "/api/projects/search", headers=headers,
+                             json={"query": rng.choice(QUESTIONS), "top_k": 5})
+        elif action == "suggest":
+            await stats.call(client, "POST", "POST /api/ai/suggest-code/", "/api/ai/suggest-code/", headers=headers,
+                             json={"prompt": "def add(a, b):\n    # complete this", "model": "ollama"})
+        if args.think_time:
+            await asyncio.sleep(rng.expovariate(1 / args.think_time))
+
+
+async def drive(base_url: str, args, upload: bytes) -> tuple:
+    import httpx
+    mix = parse_mix(args.mix)
+    stats = Stats()
+    run_id = uuid.uuid4().hex[:8]
+    limits = httpx.Limits(max_connections=args.users * 2, max_keepalive_connections=args.users * 2)
+    async with httpx.AsyncClient(base_url=base_url, timeout=600, limits=limits) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(virtual_user(i, client, stats, args, mix, upload, run_id) for i in range(args.users)))
+        wall = time.perf_counter() - start
+    return stats, wall
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    # app modules resolve data/ and DATABASE_URL at import time
+    workdir = tempfile.mkdtemp(prefix="sca_load_")
+    os.chdir(workdir)
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(workdir, 'load.db')}")
+
+    ollama = fake_ollama.serve(
+        load_delay=args.ollama_load_delay, ttft=args.ollama_ttft, token_delay=args.ollama_token_delay, tokens=args.ollama_tokens,
+    )
+    os.environ["OLLAMA_URL"] = ollama.url
+    fakes.install(fake_embeddings=args.fake_embeddings, llm=False)
+
+    import main as app_main
+    # one INFO line per client request would drown the server's own logs
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    upload = build_upload(workdir, args.files, args.lines, args.seed)
+    server, base_url = start_server(app_main.app)
+    try:
+        stats, wall = asyncio.run(drive(base_url, args, upload))
+    finally:
+        server.should_exit = True
+
+    report = {
+        "environment": environment(),
+        "parameters": {
+            **vars(args),
+            "wall_s": round(wall, 3),
+            "fake_ollama": {"requests": len(ollama.requests), "connections": ollama.connections, "model_loads": ollama.loads},
+        },
+        "results": stats.summary(wall),
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
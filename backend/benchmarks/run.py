@@ -0,0 +1,186 @@
+"""
+Benchmark suite for the ingest, indexing, retrieval and chat hot paths.
+
+Builds a synthetic repository and times the real code paths against it:
+walk_and_collect, create_project_from_dir, chunk_file_content /
+chunk_file_spans, index_project, FaissIndex.add_vectors / query,
+retrieve_top_k and create_message. Supabase storage and the LLMs are
+in-process fakes (benchmarks/fakes.py); the database is a throwaway SQLite
+file unless DATABASE_URL points somewhere else (e.g. a local Postgres).
+
+Prints one JSON document (throughput and p50/p95/p99 per benchmark);
+compare two runs with ``python -m benchmarks.compare``.
+
+    python -m benchmarks.run --files 500 --output before.json
+    python -m benchmarks.run --fake-embeddings --files 2000   # without torch
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+# the run chdirs into a scratch directory, so pin the backend on sys.path first
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks import fakes, synthetic_repo  # noqa: E402
+from benchmarks.common import Recorder, environment  # noqa: E402
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--files", type=int, default=200, help="indexable files in the synthetic repo")
+    parser.add_argument("--lines", type=int, default=120, help="mean lines per file")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--iterations", type=int, default=5, help="repetitions of the cheap file-walk benchmarks")
+    parser.add_argument("--ingest-runs", type=int, default=3, help="projects created by create_project_from_dir")
+    parser.add_argument("--batch-size", type=int, default=256, help="vectors per add_vectors call")
+    parser.add_argument("--add-batches", type=int, default=8, help="add_vectors calls on one index")
+    parser.add_argument("--queries", type=int, default=200, help="queries for FaissIndex.query / retrieve_top_k")
+    parser.add_argument("--messages", type=int, default=50, help="create_message calls")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="seconds the fake LLM sleeps per call")
+    parser.add_argument("--fake-embeddings", action="store_true", help="hashing encoder instead of sentence-transformers")
+    parser.add_argument("--output", help="write the JSON report here as well as to stdout")
+    return parser.parse_args(argv)
+
+
+def run(args) -> dict:
+    # app modules resolve data/ and DATABASE_URL at import time
+    workdir = tempfile.mkdtemp(prefix="sca_bench_")
+    os.chdir(workdir)
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(workdir, 'bench.db')}")
+    fakes.install(fake_embeddings=args.fake_embeddings, llm_latency=args.llm_latency)
+
+    from app.core.migrations import run_migrations
+    from app.database import AsyncSessionLocal, SessionLocal, async_engine
+    from app.embeddings.indexer import FaissIndex
+    from app.models.user_model import User
+    from app.models.session_model import SessionInstance
+    from app.schemas.message_schema import MessageCreate
+    from app.services import ingest
+    from app.services.message_services import create_message
+    from app.services.search import retrieve_top_k
+
+    run_migrations()
+    repo_dir = os.path.join(workdir, "repo")
+    repo = synthetic_repo.build(repo_dir, files=args.files, lines=args.lines, seed=args.seed)
+    results = {}
+
+    db = SessionLocal()
+    user = User(username="bench", email="bench@example.com", hashed_password="x")
+    db.add(user)
+    db.commit()
+
+    # file discovery
+    rec = Recorder("files")
+    for _ in range(args.iterations):
+        with rec.measure(repo["files"]):
+            paths = ingest.walk_and_collect(repo_dir)
+    results["walk_and_collect"] = rec.summary()
+
+    # chunking, per file
+    contents = [p.read_text(encoding="utf-8", errors="ignore") for p in paths]
+    rec, spans_rec = Recorder("files"), Recorder("files")
+    for _ in range(args.iterations):
+        for content in contents:
+            with rec.measure():
+                ingest.chunk_file_content(content)
+            data = content.encode("utf-8")
+            with spans_rec.measure():
+                ingest.chunk_file_spans(data)
+    results["chunk_file_content"] = rec.summary()
+    results["chunk_file_spans"] = spans_rec.summary()
+
+    # project creation; runs after the first reuse the deduplicated blobs
+    rec = Recorder("files")
+    project_ids = []
+    for i in range(args.ingest_runs):
+        with rec.measure(repo["files"]):
+            project_id, _ = ingest.create_project_from_dir(user.id, f"bench_{i}", repo_dir, db=db)
+        project_ids.append(project_id)
+    results["create_project_from_dir"] = rec.summary()
+
+    # full indexing of one project (chunk rows + embeddings + index upload)
+    rec = Recorder("chunks")
+    start = time.perf_counter()
+    indexed = ingest.index_project(project_ids[0], db=db)
+    rec.record(time.perf_counter() - start, indexed["indexed_chunks"])
+    results["index_project"] = rec.summary()
+
+    # raw index operations on a project that has no rows
+    texts = [
+        content[:2000] for content in contents
+    ] * (1 + args.batch_size * args.add_batches // max(1, len(contents)))
+    index = FaissIndex(10_000_000 + args.seed)
+    rec = Recorder("vectors")
+    for batch in range(args.add_batches):
+        chunk_texts = texts[batch * args.batch_size:(batch + 1) * args.batch_size]
+        chunk_ids = list(range(batch * args.batch_size, batch * args.batch_size + len(chunk_texts)))
+        with rec.measure(len(chunk_texts)):
+            index.add_vectors(chunk_texts, chunk_ids)
+    results["faiss_add_vectors"] = rec.summary()
+
+    queries = [f"how does handler_{i % args.files}_{i % 7} filter enabled items" for i in range(args.queries)]
+    rec = Recorder("queries")
+    for query in queries:
+        with rec.measure():
+            index.query(query, top_k=6)
+    results["faiss_query"] = rec.summary()
+
+    session = SessionInstance(user_id=user.id, project_id=project_ids[0], title="bench")
+    db.add(session)
+    db.commit()
+    session_id = session.id
+    db.close()
+
+    async def async_paths():
+        rec = Recorder("queries")
+        async with AsyncSessionLocal() as adb:
+            for query in queries:
+                with rec.measure():
+                    await retrieve_top_k(project_ids[0], query, db=adb, top_k=6)
+        results["retrieve_top_k"] = rec.summary()
+
+        rec = Recorder("messages")
+        async with AsyncSessionLocal() as adb:
+            for i in range(args.messages):
+                message = MessageCreate(
+                    session_id=session_id, sender_type="user", model_used="ollama",
+                    content=queries[i % len(queries)],
+                )
+                with rec.measure():
+                    await create_message(adb, message=message)
+        results["create_message"] = rec.summary()
+        await async_engine.dispose()
+
+    asyncio.run(async_paths())
+
+    return {
+        "environment": environment(),
+        "parameters": {**vars(args), "database": os.environ["DATABASE_URL"].split("@")[-1], "repo_bytes": repo["bytes"]},
+        "results": results,
+    }
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    output = os.path.abspath(args.output) if args.output else None
+    # keep the report on stdout clean of anything the app writes there
+    real_stdout = sys.stdout
+    sys.stdout = sys.stderr
+    try:
+        report = run(args)
+    finally:
+        sys.stdout = real_stdout
+    text = json.dumps(report, indent=2)
+    print(text)
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
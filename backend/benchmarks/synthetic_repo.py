@@ -0,0 +1,54 @@
+"""Deterministic synthetic source trees for the ingest/indexing benchmarks."""
+import os
+import random
+
+EXTENSIONS = [".py", ".js", ".ts", ".tsx", ".go", ".java", ".md", ".json", ".yml", ".sql"]
+# present in real repos and skipped by walk_and_collect
+NOISE = [("node_modules/lib", ".js"), (".git/objects", ".py"), ("assets", ".png")]
+
+
+def _source_lines(rng: random.Random, count: int, file_no: int):
+    lines = []
+    while len(lines) < count:
+        fn = f"handler_{file_no}_{len(lines)}"
+        lines.extend([
+            f"def {fn}(request, limit={rng.randint(1, 500)}):",
+            f"    \"\"\"Handle {rng.choice(['users', 'orders', 'sessions', 'chunks'])} for {fn}.\"\"\"",
+            f"    items = fetch_items(request, offset={rng.randint(0, 1000)})",
+            "    return [item for item in items if item.enabled][:limit]",
+            "",
+        ])
+    return lines[:count]
+
+
+def build(root: str, files: int = 200, lines: int = 120, seed: int = 0, duplicate_ratio: float = 0.1) -> dict:
+    """
+    Writes `files` indexable files of roughly `lines` lines each under `root`,
+    spread over nested packages, plus ignored noise files. A `duplicate_ratio`
+    share of files repeats earlier content (vendored copies, generated code).
+    """
+    rng = random.Random(seed)
+    written = []
+    total_bytes = 0
+    for i in range(files):
+        ext = EXTENSIONS[i % len(EXTENSIONS)]
+        folder = os.path.join(root, f"pkg_{i % 17}", f"mod_{i % 5}")
+        os.makedirs(folder, exist_ok=True)
+        if written and rng.random() < duplicate_ratio:
+            with open(rng.choice(written), "r", encoding="utf-8") as f:
+                content = f.read()
+        else:
+            content = "\n".join(_source_lines(rng, max(1, int(rng.gauss(lines, lines / 4))), i)) + "\n"
+        path = os.path.join(folder, f"file_{i}{ext}")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+        written.append(path)
+        total_bytes += len(content.encode("utf-8"))
+
+    for folder, ext in NOISE:
+        os.makedirs(os.path.join(root, folder), exist_ok=True)
+        for i in range(max(1, files // 10)):
+            with open(os.path.join(root, folder, f"noise_{i}{ext}"), "w", encoding="utf-8") as f:
+                f.write("x = 1\n" * 50)
+
+    return {"files": files, "bytes": total_bytes}
@@ -1,20 +1,45 @@
-from fastapi import Depends, FastAPI
+import threading
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
+from app.core.compression import CompressionMiddleware
+from app.core.config import settings
 from app.core.dependencies import get_current_user
-from app.database import engine, Base
+from app.core.logging import configure_logging
+from app.core.metrics import render_metrics
+from app.core.pagination import HAS_MORE_HEADER, NEXT_CURSOR_HEADER
+from app.core.profiling import PROFILE_ID_HEADER, PROFILES_PATH, profiling_middleware
 from app.api.routes_ai import router as ai_router
 from app.api.routes_auth import router as auth_router
 from app.api.routes_session import router as session_router
 from app.api.routes_message import router as message_router
 from app.api.routes_project import router as project_router
+from app.api.routes_profiling import router as profiling_router
 from app.schemas.user_schema import UserResponse
 
 
 
-app = FastAPI(title="Smart Coding Assistant API")
+configure_logging()
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # schema migrations and model loading run once the worker starts, not at import
+    if settings.RUN_MIGRATIONS:
+        from app.core.migrations import run_migrations
+        await run_in_threadpool(run_migrations)
+    if settings.WARM_UP_EMBEDDINGS:
+        from app.embeddings.indexer import warm_up
+        await run_in_threadpool(warm_up)
+    if settings.OLLAMA_WARM_UP:
+        # loading the model can take a while; serve meanwhile, requests just queue in Ollama
+        from app.services.llm_factory import LLMFactory
+        threading.Thread(target=LLMFactory.warm_up_ollama, name="ollama-warm-up", daemon=True).start()
+    yield
+
+
+app = FastAPI(title="Smart Coding Assistant API", lifespan=lifespan)
 
 # Add CORS
 origins = [
@@ -30,16 +55,36 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],          # Allow GET, POST, PUT, DELETE etc.
     allow_headers=["*"],          # Allow all headers
+    expose_headers=[NEXT_CURSOR_HEADER, HAS_MORE_HEADER, "ETag", "Server-Timing", PROFILE_ID_HEADER, "Retry-After"],  # keyset pagination, conditional GETs, timings, 429s
 )
 
+# compress large JSON bodies; added before the profiling middleware so it
+# sees whole bodies rather than that middleware's re-chunked stream
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+    gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+    brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+)
+
+# Server-Timing stage breakdown; sampling profiles for requests carrying the admin token
+app.middleware("http")(profiling_middleware)
+
 
 app.include_router(ai_router, prefix="/api/ai", tags=["AI"])
 app.include_router(auth_router, prefix="/api", tags=["Auth"])
 app.include_router(message_router, prefix="/api", tags=["Messages"])
 app.include_router(session_router, prefix="/api", tags=["Sessions"])
 app.include_router(project_router, prefix="/api/projects", tags=["Projects"])
+app.include_router(profiling_router, prefix=PROFILES_PATH, tags=["Profiling"])
 
 
 @app.get("/")
 def home():
     return {"message": "Smart Coding Assistant API is running"}
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
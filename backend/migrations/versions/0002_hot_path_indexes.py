@@ -0,0 +1,51 @@
+"""indexes for the hot request queries
+
+One index per query shape:
+
+* message history: ``messages WHERE session_id = ? ORDER BY created_at``
+* session sidebar: ``sessions WHERE user_id = ? ORDER BY created_at DESC``
+* project sessions: ``sessions WHERE user_id = ? AND project_id = ? ORDER BY created_at DESC``
+* project list: ``projects WHERE user_id = ?``
+* indexing / status join: ``files WHERE project_id = ?`` and ``chunks JOIN files``
+
+On Postgres the indexes are built CONCURRENTLY so existing tables stay writable.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, Sequence[str], None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    ("ix_messages_session_id_created_at", "messages", ["session_id", "created_at"]),
+    ("ix_sessions_user_id_created_at", "sessions", ["user_id", "created_at"]),
+    ("ix_sessions_project_id_user_id_created_at", "sessions", ["project_id", "user_id", "created_at"]),
+    ("ix_projects_user_id", "projects", ["user_id"]),
+    ("ix_files_project_id", "files", ["project_id"]),
+    ("ix_chunks_file_id", "chunks", ["file_id"]),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, _ in INDEXES:
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,41 @@
+"""extend the message history index with id for keyset pagination
+
+History pages are ordered and bounded by (created_at, id), so the id tie-breaker
+joins the index and replaces ix_messages_session_id_created_at.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, Sequence[str], None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_messages_session_id_created_at_id", "messages", ["session_id", "created_at", "id"],
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+        op.drop_index("ix_messages_session_id_created_at", table_name="messages", postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_messages_session_id_created_at", "messages", ["session_id", "created_at"],
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+        op.drop_index("ix_messages_session_id_created_at_id", table_name="messages", postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,50 @@
+"""content-addressed blob store for file and chunk text
+
+Adds the ``blobs`` table and the chunk byte range. New files keep their text
+only in ``blobs`` and chunks reference a slice of it; existing rows keep
+``files.content`` / ``chunks.text`` and are read as before.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, Sequence[str], None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "blobs",
+        sa.Column("hash", sa.String(length=64), nullable=False),
+        sa.Column("size", sa.Integer(), nullable=False),
+        sa.Column("compressed_size", sa.Integer(), nullable=False),
+        sa.Column("data", sa.LargeBinary(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("hash"),
+    )
+    with op.batch_alter_table("chunks") as batch_op:
+        batch_op.add_column(sa.Column("start_byte", sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column("end_byte", sa.Integer(), nullable=True))
+        batch_op.alter_column("text", existing_type=sa.Text(), nullable=True)
+    op.create_index("ix_files_content_hash", "files", ["content_hash"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_files_content_hash", table_name="files")
+    with op.batch_alter_table("chunks") as batch_op:
+        batch_op.alter_column("text", existing_type=sa.Text(), nullable=False)
+        batch_op.drop_column("end_byte")
+        batch_op.drop_column("start_byte")
+    op.drop_table("blobs")
@@ -0,0 +1,53 @@
+"""ON DELETE CASCADE on the ownership foreign keys
+
+Deleting a project or session becomes a single statement; the database removes
+files, chunks, embeddings, sessions and messages instead of the ORM loading and
+deleting them row by row.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, Sequence[str], None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (table, column, referred table)
+FOREIGN_KEYS = [
+    ("sessions", "user_id", "users"),
+    ("sessions", "project_id", "projects"),
+    ("files", "project_id", "projects"),
+    ("chunks", "file_id", "files"),
+    ("embeddings", "chunk_id", "chunks"),
+    ("messages", "session_id", "sessions"),
+]
+# the constraints were created unnamed; this matches Postgres' default names and
+# lets sqlite's batch mode find the reflected (unnamed) ones
+NAMING_CONVENTION = {"fk": "%(table_name)s_%(column_0_name)s_fkey"}
+
+
+def _recreate(ondelete) -> None:
+    for table, column, referred in FOREIGN_KEYS:
+        name = f"{table}_{column}_fkey"
+        with op.batch_alter_table(table, naming_convention=NAMING_CONVENTION) as batch_op:
+            batch_op.drop_constraint(name, type_="foreignkey")
+            batch_op.create_foreign_key(name, referred, [column], ["id"], ondelete=ondelete)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _recreate("CASCADE")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _recreate(None)
@@ -0,0 +1,47 @@
+"""extend the session list indexes with id for keyset pagination
+
+Session lists are ordered and bounded by (created_at, id), so the id
+tie-breaker joins both session indexes and replaces the indexes ending in created_at.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0007"
+down_revision: Union[str, Sequence[str], None] = "0006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (old name, new name, old columns)
+_INDEXES = [
+    ("ix_sessions_user_id_created_at", "ix_sessions_user_id_created_at_id", ["user_id", "created_at"]),
+    (
+        "ix_sessions_project_id_user_id_created_at",
+        "ix_sessions_project_id_user_id_created_at_id",
+        ["project_id", "user_id", "created_at"],
+    ),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        for old, new, columns in _INDEXES:
+            op.create_index(new, "sessions", [*columns, "id"], postgresql_concurrently=True, if_not_exists=True)
+            op.drop_index(old, table_name="sessions", postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for old, new, columns in _INDEXES:
+            op.create_index(old, "sessions", columns, postgresql_concurrently=True, if_not_exists=True)
+            op.drop_index(new, table_name="sessions", postgresql_concurrently=True, if_exists=True)
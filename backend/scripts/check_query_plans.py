@@ -0,0 +1,130 @@
+"""
+Query-plan check for the hot request queries.
+
+Runs EXPLAIN for each query shape used by message_services, session_services
+and routes_project against the configured database and verifies that the
+planner uses the index added for it. Exits non-zero if any query falls back to
+a sequential scan.
+
+On Postgres ``enable_seqscan`` is switched off for the check, so small or empty
+tables still report whether an index is *usable* rather than whether the
+planner prefers it at the current table size.
+
+Run from ``backend/`` after ``alembic upgrade head``:
+
+    python -m scripts.check_query_plans
+"""
+import json
+import sys
+from datetime import datetime
+
+from sqlalchemy import func, select, text, tuple_
+
+from app.core.pagination import encode_cursor
+from app.database import engine
+from app.models.user_model import User  # noqa: F401  (registers the mapper)
+from app.models.message_model import Message
+from app.models.session_model import Chunk, FileStore, Project, SessionInstance
+from app.services.session_services import summary_page_query
+
+# (name, statement, indexes of which at least one must appear in the plan)
+HOT_QUERIES = [
+    (
+        "message history",
+        select(Message).filter(Message.session_id == 1).order_by(Message.created_at.asc()),
+        {"ix_messages_session_id_created_at_id"},
+    ),
+    (
+        "message history page",
+        select(Message)
+        .filter(Message.session_id == 1, tuple_(Message.created_at, Message.id) < tuple_(datetime(2030, 1, 1), 1000))
+        .order_by(Message.created_at.desc(), Message.id.desc())
+        .limit(101),
+        {"ix_messages_session_id_created_at_id"},
+    ),
+    (
+        "message etag",
+        select(func.count(Message.id), func.max(Message.id)).filter(Message.session_id == 1),
+        {"ix_messages_session_id_created_at_id"},
+    ),
+    (
+        "sessions by user",
+        summary_page_query([SessionInstance.user_id == 1], 50),
+        {"ix_sessions_user_id_created_at_id"},
+    ),
+    (
+        "sessions by user page",
+        summary_page_query([SessionInstance.user_id == 1], 50, encode_cursor(datetime(2030, 1, 1), 1000)),
+        {"ix_sessions_user_id_created_at_id"},
+    ),
+    (
+        "sessions by project",
+        summary_page_query([SessionInstance.user_id == 1, SessionInstance.project_id == 1], 50),
+        {"ix_sessions_project_id_user_id_created_at_id"},
+    ),
+    (
+        "projects by user",
+        select(Project).filter(Project.user_id == 1),
+        {"ix_projects_user_id"},
+    ),
+    (
+        "files by project",
+        select(FileStore).filter(FileStore.project_id == 1),
+        {"ix_files_project_id"},
+    ),
+    (
+        "project chunk count",
+        select(func.count(Chunk.id)).join(FileStore).filter(FileStore.project_id == 1),
+        {"ix_files_project_id", "ix_chunks_file_id"},
+    ),
+]
+
+
+def _plan_nodes(node):
+    yield node
+    for child in node.get("Plans", []):
+        yield from _plan_nodes(child)
+
+
+def _postgres_plan(conn, sql):
+    conn.execute(text("SET LOCAL enable_seqscan = off"))
+    plan = conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    nodes = list(_plan_nodes(plan[0]["Plan"]))
+    used = {n["Index Name"] for n in nodes if "Index Name" in n}
+    seq_scans = {n["Relation Name"] for n in nodes if n["Node Type"] == "Seq Scan"}
+    return used, seq_scans, json.dumps(plan, indent=2)
+
+
+def _sqlite_plan(conn, sql):
+    rows = conn.execute(text(f"EXPLAIN QUERY PLAN {sql}")).all()
+    details = [row[-1] for row in rows]
+    used, seq_scans = set(), set()
+    for detail in details:
+        words = detail.split()
+        if "INDEX" in words:
+            used.add(words[words.index("INDEX") + 1])
+        elif words[:1] == ["SCAN"]:
+            seq_scans.add(words[1])
+    return used, seq_scans, "\n".join(details)
+
+
+def check() -> bool:
+    explain = _postgres_plan if engine.dialect.name == "postgresql" else _sqlite_plan
+    ok = True
+    with engine.connect() as conn:
+        for name, stmt, expected in HOT_QUERIES:
+            sql = str(stmt.compile(engine, compile_kwargs={"literal_binds": True}))
+            with conn.begin():
+                used, seq_scans, plan = explain(conn, sql)
+            passed = bool(used & expected) and not seq_scans
+            ok = ok and passed
+            print(f"[{'PASS' if passed else 'FAIL'}] {name}: indexes={sorted(used)} seq_scans={sorted(seq_scans)}")
+            if not passed:
+                print(plan)
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if check() else 1)
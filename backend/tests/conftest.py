@@ -0,0 +1,33 @@
+"""
+Test setup: storage and the embedding model are the in-process fakes from
+benchmarks/fakes.py, the database a throwaway SQLite file. LLM calls go to the
+real providers, so tests that need one start benchmarks/fake_ollama.
+
+    cd backend && python -m pytest tests
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# app modules resolve data/ and DATABASE_URL at import time
+WORK_DIR = tempfile.mkdtemp(prefix="sca_tests_")
+os.chdir(WORK_DIR)
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(WORK_DIR, 'tests.db')}")
+os.environ.setdefault("OLLAMA_WARM_UP", "false")
+
+from benchmarks import fakes  # noqa: E402
+
+SUPABASE = fakes.install(fake_embeddings=True, llm=False)
+
+
+@pytest.fixture
+def storage():
+    """The fake storage, emptied before the test."""
+    for objects in SUPABASE.storage.buckets.values():
+        objects.clear()
+    return SUPABASE.storage
@@ -0,0 +1,29 @@
+import os
+
+from app.services.blob_store import LocalBlobCache, blob_hash
+
+
+def put(cache, data: bytes) -> str:
+    digest = blob_hash(data)
+    cache.store(digest, data)
+    return digest
+
+
+def test_least_recently_used_blobs_are_evicted(tmp_path):
+    cache = LocalBlobCache(root=str(tmp_path), max_bytes=250)
+    first, second = put(cache, b"a" * 100), put(cache, b"b" * 100)
+    cache.view(first)
+    third = put(cache, b"c" * 100)
+    assert not os.path.exists(cache.path(second))
+    assert bytes(cache.view(first)) == b"a" * 100 and cache.has(third)
+
+
+def test_pinned_blobs_outlive_the_budget(tmp_path):
+    cache = LocalBlobCache(root=str(tmp_path), max_bytes=250)
+    blobs = [bytes([65 + i]) * 100 for i in range(4)]
+    with cache.pinned(blob_hash(data) for data in blobs):
+        digests = [put(cache, data) for data in blobs]
+        # a set fetched for one reader stays readable while it is pinned
+        assert [bytes(cache.view(digest)) for digest in digests] == blobs
+    # back within budget once released
+    assert sum(os.path.exists(cache.path(digest)) for digest in digests) == 2
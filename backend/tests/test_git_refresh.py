@@ -0,0 +1,125 @@
+import os
+import shutil
+import subprocess
+
+import pytest
+
+pytest.importorskip("git")
+if shutil.which("git") is None:
+    pytest.skip("git executable not found", allow_module_level=True)
+
+from app.core.migrations import run_migrations  # noqa: E402
+from app.database import SessionLocal  # noqa: E402
+from app.embeddings.indexer import get_index  # noqa: E402
+from app.models.session_model import Chunk, FileStore, Project  # noqa: E402
+from app.models.user_model import User  # noqa: E402
+from app.services import ingest  # noqa: E402
+
+
+def git(*args, cwd=None):
+    subprocess.run(["git", "-c", "user.email=tests@example.com", "-c", "user.name=tests", *args],
+                   cwd=cwd, check=True, capture_output=True)
+
+
+def write(root, rel, content):
+    path = os.path.join(root, rel)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    mode = "wb" if isinstance(content, bytes) else "w"
+    with open(path, mode) as f:
+        f.write(content)
+
+
+@pytest.fixture
+def remote(tmp_path):
+    """A work tree and the bare repository it pushes to, served over file://."""
+    work = str(tmp_path / "work")
+    bare = str(tmp_path / "remote.git")
+    git("init", "-q", "-b", "main", work)
+    write(work, "app/main.py", "\n".join(f"def f{i}():\n    return {i}" for i in range(40)))
+    write(work, "README.md", "# readme\n")
+    write(work, "node_modules/dep/index.js", "module.exports = 1\n")
+    write(work, "assets/logo.png", b"\x89PNG" * 64)
+    git("add", "-A", cwd=work)
+    git("commit", "-qm", "initial", cwd=work)
+    git("clone", "-q", "--bare", work, bare)
+    git("config", "uploadpack.allowFilter", "true", cwd=bare)
+
+    def push(message):
+        git("add", "-A", cwd=work)
+        git("commit", "-qm", message, cwd=work)
+        git("push", "-q", bare, "main", cwd=work)
+
+    return work, f"file://{bare}", push
+
+
+@pytest.fixture
+def db(storage):
+    run_migrations()
+    session = SessionLocal()
+    user = session.query(User).filter(User.username == "git_tests").first()
+    if user is None:
+        user = User(username="git_tests", email="git_tests@example.com", hashed_password="x")
+        session.add(user)
+        session.commit()
+    yield session
+    session.close()
+
+
+def file_paths(db, project_id):
+    return sorted(path for path, in db.query(FileStore.path).filter(FileStore.project_id == project_id))
+
+
+def chunk_ids(db, project_id, path):
+    return [chunk_id for chunk_id, in db.query(Chunk.id).join(FileStore).filter(
+        FileStore.project_id == project_id, FileStore.path == path)]
+
+
+def checkout_files(project_id):
+    root = ingest.repo_checkout_dir(project_id)
+    return sorted(
+        os.path.relpath(os.path.join(d, name), root)
+        for d, _, names in os.walk(root) if ".git" not in d.split(os.sep) for name in names
+    )
+
+
+def clone(db, url):
+    user_id = db.query(User.id).filter(User.username == "git_tests").scalar()
+    project_id, _ = ingest.clone_git_and_create_project(user_id, url, "git project", db)
+    ingest.index_project_job(project_id)
+    return project_id
+
+
+def test_clone_checks_out_only_indexable_files(db, remote):
+    _, url, _ = remote
+    project_id = clone(db, url)
+    # sparse checkout: no ignored directories, no files with other extensions
+    assert checkout_files(project_id) == ["README.md", "app/main.py"]
+    assert file_paths(db, project_id) == ["README.md", "app/main.py"]
+
+
+def test_refresh_applies_added_modified_and_deleted_files(db, remote):
+    work, url, push = remote
+    project_id = clone(db, url)
+    assert ingest.refresh_git_project(project_id, db)["file_ids"] == []
+
+    readme_chunks = chunk_ids(db, project_id, "README.md")
+    assert readme_chunks and get_index(project_id)._live_ids(readme_chunks) == set(readme_chunks)
+
+    write(work, "app/main.py", "def main():\n    return 'changed'\n")
+    write(work, "app/util.py", "def util():\n    return 1\n")
+    write(work, "node_modules/dep/index.js", "module.exports = 2\n")
+    write(work, "assets/logo.png", b"changed")
+    os.remove(os.path.join(work, "README.md"))
+    push("change files")
+
+    summary = ingest.refresh_git_project(project_id, db)
+    assert (summary["added"], summary["modified"], summary["deleted"]) == (1, 1, 1)
+    assert len(summary["file_ids"]) == 2
+    assert file_paths(db, project_id) == ["app/main.py", "app/util.py"]
+    assert checkout_files(project_id) == ["app/main.py", "app/util.py"]
+    assert db.query(Project.source_commit).filter(Project.id == project_id).scalar() == summary["commit"]
+    # chunks of the deleted file leave the index
+    assert get_index(project_id)._live_ids(readme_chunks) == set()
+    ingest.index_project_job(project_id, file_ids=summary["file_ids"])
+    util_chunks = chunk_ids(db, project_id, "app/util.py")
+    assert util_chunks and get_index(project_id)._live_ids(util_chunks) == set(util_chunks)
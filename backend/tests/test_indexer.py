@@ -0,0 +1,164 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.embeddings import indexer
+from app.embeddings.indexer import BUCKET, MANIFEST_NAME, FaissIndex
+
+PROJECT_ID = 1
+
+
+def live_ids(index, candidates=range(1, 20)):
+    return sorted(index._live_ids(list(candidates)))
+
+
+def stored_names(storage, prefix="delta_"):
+    return sorted(path.split("/", 1)[1] for path in storage.buckets.get(BUCKET, {}) if path.split("/", 1)[1].startswith(prefix))
+
+
+@pytest.fixture
+def cached(monkeypatch):
+    """
+    Put an index in the worker cache, which compaction requires. Automatic
+    compaction is off, so tests run it where they want it.
+    """
+    monkeypatch.setattr(indexer.settings, "INDEX_MAX_DELTA_SEGMENTS", 1000)
+    monkeypatch.setattr(indexer.settings, "INDEX_COMPACT_RATIO", float("inf"))
+
+    def put(index):
+        monkeypatch.setitem(indexer._INDEX_CACHE, index.project_id, index)
+        return index
+    return put
+
+
+def test_writes_from_two_instances_are_merged(storage):
+    a = FaissIndex(PROJECT_ID)
+    a.add_vectors(["one"], [1])
+    b = FaissIndex(PROJECT_ID)
+    a.add_vectors(["two"], [2])
+    # b still has the snapshot from before a's second write
+    b.add_vectors(["three"], [3])
+
+    assert live_ids(b) == [1, 2, 3]
+    assert live_ids(FaissIndex(PROJECT_ID)) == [1, 2, 3]
+    assert len(stored_names(storage)) == 3
+
+
+def test_removal_on_one_instance_survives_a_write_on_another(storage):
+    a = FaissIndex(PROJECT_ID)
+    a.add_vectors(["one", "two"], [1, 2])
+    b = FaissIndex(PROJECT_ID)
+    assert a.remove_ids([1]) == 1
+    b.add_vectors(["three"], [3])
+
+    assert live_ids(FaissIndex(PROJECT_ID)) == [2, 3]
+
+
+def test_add_only_removes_ids_that_had_a_vector(storage):
+    index = FaissIndex(PROJECT_ID)
+    index.add_vectors(["one", "two"], [1, 2])
+    assert index.segments[-1].removed == frozenset()
+
+    index.add_vectors(["two again", "three"], [2, 3])
+    assert index.segments[-1].removed == frozenset({2})
+    assert live_ids(index) == [1, 2, 3]
+    assert [hit["chunk_id"] for hit in index.query("two again", top_k=1)] == [2]
+
+
+def test_compaction_keeps_later_writes_of_other_instances(storage, cached):
+    a = cached(FaissIndex(PROJECT_ID))
+    a.add_vectors(["one"], [1])
+    a.add_vectors(["two"], [2])
+    b = FaissIndex(PROJECT_ID)
+    b.add_vectors(["three"], [3])
+
+    a.compact()
+    assert live_ids(FaissIndex(PROJECT_ID)) == [1, 2, 3]
+    # only the delta written after the merged snapshot is left
+    assert len(stored_names(storage)) == 1
+
+
+def test_losing_compaction_drops_its_base(storage, cached):
+    a = cached(FaissIndex(PROJECT_ID))
+    a.add_vectors(["one"], [1])
+    b = FaissIndex(PROJECT_ID)
+    a.compact()
+    # b merges its stale snapshot after a already replaced those segments
+    cached(b).compact()
+
+    assert len(stored_names(storage, "base_")) == 1
+    assert live_ids(FaissIndex(PROJECT_ID)) == [1]
+
+
+def test_load_from_a_stale_manifest_retries_with_the_newest(storage, cached):
+    a = cached(FaissIndex(PROJECT_ID))
+    a.add_vectors(["one"], [1])
+    a.add_vectors(["two"], [2])
+    bucket = storage.from_(BUCKET)
+    stale = bucket.download(f"project_{PROJECT_ID}/{MANIFEST_NAME}")
+    a.compact()
+
+    # a load that read manifest.json just before the compaction removed its deltas
+    bucket.upload(f"project_{PROJECT_ID}/{MANIFEST_NAME}", stale, file_options={"upsert": True})
+    assert json.loads(stale)["deltas"][0] not in stored_names(storage)
+    fresh = FaissIndex(PROJECT_ID)
+    assert live_ids(fresh) == [1, 2]
+    assert fresh.manifest["version"] == a.manifest["version"]
+
+
+@pytest.fixture
+def index_cache(monkeypatch):
+    monkeypatch.setattr(indexer, "_INDEX_CACHE", indexer.OrderedDict())
+    monkeypatch.setattr(indexer, "_LOAD_LOCKS", {})
+    return indexer._INDEX_CACHE
+
+
+def test_cached_index_picks_up_writes_of_other_workers(storage, index_cache, monkeypatch):
+    cached = indexer.get_index(PROJECT_ID)
+    FaissIndex(PROJECT_ID).add_vectors(["one"], [1])
+    assert live_ids(indexer.get_index(PROJECT_ID)) == []
+
+    monkeypatch.setattr(indexer.settings, "INDEX_REFRESH_SECONDS", 0)
+    assert indexer.get_index(PROJECT_ID) is cached
+    assert live_ids(cached) == [1]
+
+
+def test_index_cache_drops_least_recently_used(storage, index_cache, monkeypatch):
+    monkeypatch.setattr(indexer.settings, "INDEX_CACHE_SIZE", 2)
+    first = indexer.get_index(1)
+    indexer.get_index(2)
+    assert indexer.get_index(1) is first
+    indexer.get_index(3)
+
+    assert list(index_cache) == [1, 3]
+    assert indexer.CACHED_INDEXES._value.get() == 2
+
+
+def test_evict_during_load_keeps_the_project_out_of_the_cache(storage, index_cache, monkeypatch):
+    loading, release = threading.Event(), threading.Event()
+    sync = FaissIndex._sync
+
+    def slow_sync(self):
+        loading.set()
+        release.wait(5)
+        return sync(self)
+
+    monkeypatch.setattr(FaissIndex, "_sync", slow_sync)
+    monkeypatch.setattr(indexer, "_DELETED", set())
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        load = pool.submit(indexer.get_index, PROJECT_ID)
+        assert loading.wait(5)
+        assert indexer.index_state(PROJECT_ID) == "loading"
+        evict = pool.submit(indexer.evict_index, PROJECT_ID)
+        with pytest.raises(TimeoutError):
+            evict.result(timeout=0.1)
+        release.set()
+        evict.result(timeout=5)
+        with pytest.raises(RuntimeError):
+            load.result(timeout=5)
+
+    assert indexer.index_state(PROJECT_ID) == "cold"
+    with pytest.raises(RuntimeError):
+        indexer.get_index(PROJECT_ID)
@@ -0,0 +1,52 @@
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from app.services.llm_factory import LLMFactory
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(LLMFactory, "generate", staticmethod(lambda messages, model="ollama": "answer"))
+    with TestClient(main.app) as client:
+        yield client
+
+
+@pytest.fixture
+def session_id(client):
+    name = f"messages_{uuid.uuid4().hex[:8]}"
+    client.post("/api/signup", json={"username": name, "email": f"{name}@example.com", "password": "pw"})
+    user_id = client.post("/api/login", json={"username": name, "password": "pw"}).json()["user"]["id"]
+    return client.post("/api/sessions", json={"user_id": user_id, "project_id": None}).json()["id"]
+
+
+def send(client, session_id, content="hello there", **extra):
+    return client.post("/api/messages", json={
+        "session_id": session_id, "sender_type": "user", "content": content, "model_used": "ollama", **extra,
+    })
+
+
+def test_unknown_project_is_rejected_before_the_prompt_is_saved(client, session_id):
+    response = send(client, session_id, project_ids=[999_999])
+    assert response.status_code == 404
+    assert client.get(f"/api/messages/{session_id}").json() == []
+
+
+def test_history_pages_report_more_messages(client, session_id):
+    for i in range(3):
+        send(client, session_id, content=f"question {i}")
+    newest = client.get(f"/api/messages/{session_id}", params={"limit": 4})
+    assert [m["content"] for m in newest.json()] == ["question 1", "answer", "question 2", "answer"]
+    assert newest.headers["x-has-more"] == "true"
+    older = client.get(f"/api/messages/{session_id}", params={"limit": 4, "before": newest.headers["x-next-cursor"]})
+    assert [m["content"] for m in older.json()] == ["question 0", "answer"]
+    assert "x-next-cursor" not in older.headers and "x-has-more" not in older.headers
+
+    first_id = older.json()[0]["id"]
+    delta = client.get(f"/api/messages/{session_id}", params={"limit": 2, "after_id": first_id})
+    assert [m["content"] for m in delta.json()] == ["answer", "question 1"]
+    assert delta.headers["x-has-more"] == "true"
+    rest = client.get(f"/api/messages/{session_id}", params={"limit": 10, "after_id": delta.json()[-1]["id"]})
+    assert len(rest.json()) == 3 and "x-has-more" not in rest.headers
@@ -0,0 +1,22 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from app.core.metrics import DB_QUERY_SECONDS, instrument_engine
+
+
+def observed(name, verb):
+    return sum(bucket.get() for bucket in DB_QUERY_SECONDS.labels(name, verb)._buckets)
+
+
+def test_failed_statements_leave_no_timing_state():
+    engine = create_engine("sqlite://")
+    instrument_engine(engine, "metrics_test")
+    with engine.connect() as conn:
+        for _ in range(3):
+            with pytest.raises(OperationalError):
+                conn.execute(text("SELECT * FROM missing_table"))
+        conn.execute(text("SELECT 1"))
+        assert "query_start" not in conn.info
+    # only the statement that ran is timed
+    assert observed("metrics_test", "SELECT") == 1
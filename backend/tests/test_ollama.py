@@ -0,0 +1,85 @@
+import socket
+
+import pytest
+import requests
+
+from app.services import llm_factory
+from app.services.llm_factory import LLMError, LLMFactory
+from benchmarks import fake_ollama
+
+MESSAGES = [{"role": "user", "content": "explain handler_3"}]
+
+
+@pytest.fixture
+def profile(monkeypatch):
+    monkeypatch.setattr(llm_factory.settings, "OLLAMA_MODEL", "llama3")
+    monkeypatch.setattr(llm_factory.settings, "OLLAMA_KEEP_ALIVE", "30m")
+    monkeypatch.setattr(llm_factory.settings, "OLLAMA_NUM_CTX", 4096)
+    monkeypatch.setattr(llm_factory.settings, "OLLAMA_NUM_PREDICT", 64)
+    monkeypatch.setattr(llm_factory.settings, "OLLAMA_NUM_THREAD", 0)
+    monkeypatch.setattr(llm_factory, "_ollama_http", requests.Session())
+    return llm_factory.settings
+
+
+@pytest.fixture
+def ollama(profile, monkeypatch):
+    server = fake_ollama.serve(load_delay=0, ttft=0, token_delay=0, tokens=5)
+    monkeypatch.setattr(profile, "OLLAMA_URL", server.url)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_chat_sends_the_profile(ollama):
+    assert LLMFactory.generate(MESSAGES, "ollama").startswith("Answer to: explain handler_3")
+    body, = ollama.requests
+    assert body["model"] == "llama3"
+    assert body["keep_alive"] == "30m"
+    assert body["stream"] is True
+    # unset (0) options are left to Ollama's defaults
+    assert body["options"] == {"num_ctx": 4096, "num_predict": 64}
+
+
+def test_no_model_means_the_default_provider(ollama, profile, monkeypatch):
+    monkeypatch.setattr(profile, "DEFAULT_MODEL", "ollama")
+    assert LLMFactory.generate(MESSAGES, None).startswith("Answer to: ")
+    assert len(ollama.requests) == 1
+
+
+def test_warm_up_loads_the_model_chats_reuse(ollama, profile, monkeypatch):
+    LLMFactory.warm_up_ollama()
+    warm_up, = ollama.requests
+    assert warm_up["messages"] == [] and warm_up["stream"] is False
+    assert warm_up["options"] == {"num_ctx": 4096, "num_predict": 64}
+    assert ollama.loads == 1
+
+    LLMFactory.generate(MESSAGES, "ollama")
+    LLMFactory.generate(MESSAGES, "ollama")
+    assert ollama.loads == 1
+
+    # a different context size is a reload, which is why chats and warm-up share options
+    monkeypatch.setattr(profile, "OLLAMA_NUM_CTX", 8192)
+    LLMFactory.generate(MESSAGES, "ollama")
+    assert ollama.loads == 2
+
+
+def test_requests_share_a_pooled_connection(ollama):
+    LLMFactory.warm_up_ollama()
+    for _ in range(3):
+        LLMFactory.generate(MESSAGES, "ollama")
+    assert len(ollama.requests) == 4
+    assert ollama.connections == 1
+
+
+def test_unreachable_server(profile, monkeypatch):
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    monkeypatch.setattr(profile, "OLLAMA_URL", f"http://127.0.0.1:{port}")
+
+    with pytest.raises(LLMError, match="^Ollama Error: "):
+        LLMFactory.generate(MESSAGES, "ollama")
+    # chat and session titles get the error text as before
+    assert LLMFactory.generate_response(MESSAGES, "ollama").startswith("Ollama Error: ")
+    # a failed warm-up only logs; the first chat loads the model instead
+    LLMFactory.warm_up_ollama()
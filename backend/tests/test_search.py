@@ -0,0 +1,122 @@
+import threading
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from app.embeddings import indexer
+from app.embeddings.indexer import FaissIndex
+from app.services import prefetch, search
+
+
+@pytest.fixture
+def projects(storage, monkeypatch):
+    monkeypatch.setattr(indexer, "_INDEX_CACHE", indexer.OrderedDict())
+    monkeypatch.setattr(indexer, "_LOAD_LOCKS", {})
+    FaissIndex(1).add_vectors(["warm project chunk"], [1])
+    FaissIndex(2).add_vectors(["cold project chunk"], [2])
+    indexer.get_index(1)
+    return 1, 2
+
+
+def test_cold_project_loads_outside_the_search_pool(projects, monkeypatch):
+    release = threading.Event()
+    sync = FaissIndex._sync
+
+    def slow_sync(self):
+        if self.project_id == 2:
+            release.wait(5)
+        return sync(self)
+
+    monkeypatch.setattr(FaissIndex, "_sync", slow_sync)
+    monkeypatch.setattr(search, "_SEARCH_POOL", search.ThreadPoolExecutor(max_workers=1))
+
+    results = search._query_indexes([1, 2], "project chunk", top_k=5, timeout=0.2)
+    assert [r["project_id"] for r in results] == [1]
+    assert indexer.index_state(2) == "loading"
+
+    release.set()
+    search.load_index(2).result(timeout=5)
+    results = search._query_indexes([1, 2], "project chunk", top_k=5, timeout=5)
+    assert sorted(r["project_id"] for r in results) == [1, 2]
+
+
+def test_single_project_search_is_bounded_by_the_timeout(projects, monkeypatch):
+    release = threading.Event()
+    sync = FaissIndex._sync
+
+    def slow_sync(self):
+        release.wait(5)
+        return sync(self)
+
+    monkeypatch.setattr(FaissIndex, "_sync", slow_sync)
+
+    assert search._query_indexes([2], "project chunk", top_k=5, timeout=0.1) == []
+    release.set()
+    search.load_index(2).result(timeout=5)
+    assert [r["chunk_id"] for r in search._query_indexes([2], "cold project chunk", top_k=1, timeout=5)] == [2]
+
+
+def test_timeout_starts_after_the_query_is_embedded(projects, monkeypatch):
+    embed_query = search.embed_query
+
+    def slow_embed(query):
+        time.sleep(0.3)
+        return embed_query(query)
+
+    monkeypatch.setattr(search, "embed_query", slow_embed)
+    results = search._query_indexes([1], "project chunk", top_k=5, timeout=0.2)
+    assert [r["project_id"] for r in results] == [1]
+
+
+def test_required_project_is_waited_for(projects, monkeypatch):
+    sync = FaissIndex._sync
+
+    def slow_sync(self):
+        if self.project_id == 2:
+            time.sleep(0.3)
+        return sync(self)
+
+    monkeypatch.setattr(FaissIndex, "_sync", slow_sync)
+    results = search._query_indexes([1, 2], "project chunk", top_k=5, timeout=0.05, required={2})
+    assert sorted(r["project_id"] for r in results) == [1, 2]
+
+
+def test_required_project_that_cannot_load_fails_the_search(projects, monkeypatch):
+    def broken_sync(self):
+        raise RuntimeError("storage unavailable")
+
+    monkeypatch.setattr(FaissIndex, "_sync", broken_sync)
+    with pytest.raises(HTTPException) as e:
+        search._query_indexes([1, 3], "project chunk", top_k=5, timeout=1, required={3})
+    assert e.value.status_code == 503
+
+
+def prefetch_count(result):
+    return prefetch.INDEX_PREFETCHES.labels(result)._value.get()
+
+
+def test_load_resolves_before_the_blob_fetch(projects, monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(prefetch, "_fetch_blobs", lambda project_id: release.wait(5))
+    loaded = prefetch_count("loaded")
+
+    prefetch.prefetch_project(2)
+    search.load_index(2).result(timeout=2)
+    assert indexer.index_state(2) == "warm"
+    assert prefetch_count("loaded") == loaded + 1
+    release.set()
+
+
+def test_search_load_skips_queued_prefetches(projects, monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(prefetch, "_PREFETCH_POOL", search.ThreadPoolExecutor(max_workers=1))
+    prefetch._PREFETCH_POOL.submit(release.wait, 5)
+    loaded = prefetch_count("loaded")
+
+    prefetch.prefetch_project(2)
+    search.load_index(2).result(timeout=2)
+    assert indexer.index_state(2) == "warm"
+    # loaded for a search, not by the prefetch
+    assert prefetch_count("loaded") == loaded
+    release.set()
@@ -0,0 +1,80 @@
+import json
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from app.api import routes_ai
+from app.services.admission import AdmissionController
+from app.services.llm_factory import LLMError, LLMFactory
+
+
+@pytest.fixture
+def admission(monkeypatch):
+    controller = AdmissionController(
+        concurrency=2, queue_limit=32, user_queue_limit=4, queue_timeout=10, rate_per_minute=0, burst=100,
+    )
+    monkeypatch.setattr(routes_ai, "generation_admission", controller)
+    return controller
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    """Fake provider: "fail" prompts raise, others answer after a short delay; tracks peak concurrency."""
+    lock = threading.Lock()
+    state = {"running": 0, "peak": 0}
+
+    def generate(messages, model="ollama"):
+        prompt = messages[-1]["content"]
+        if prompt == "fail":
+            raise LLMError("Ollama Error: connection refused")
+        with lock:
+            state["running"] += 1
+            state["peak"] = max(state["peak"], state["running"])
+        time.sleep(0.05)
+        with lock:
+            state["running"] -= 1
+        return f"Error handling for {prompt}"
+
+    monkeypatch.setattr(LLMFactory, "generate", staticmethod(generate))
+    return state
+
+
+def batch(prompts):
+    with TestClient(main.app) as client:
+        response = client.post("/api/ai/suggest-code/batch", json={"prompts": prompts})
+    return response, [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_suggest_reports_provider_errors(admission, llm):
+    with TestClient(main.app) as client:
+        ok = client.post("/api/ai/suggest-code/", json={"prompt": "prompt"})
+        failed = client.post("/api/ai/suggest-code/", json={"prompt": "fail"})
+    # an answer that happens to start with "Error" is still an answer
+    assert ok.status_code == 200 and ok.json()["suggestion"] == "Error handling for prompt"
+    assert failed.status_code == 500 and failed.json()["detail"] == "Ollama Error: connection refused"
+    assert admission.active == 0
+
+
+def test_batch_admits_every_prompt(admission, llm):
+    response, lines = batch([f"prompt {i}" for i in range(4)] + ["fail", "prompt 0"])
+    assert response.status_code == 200
+    by_index = {line["index"]: line for line in lines}
+    assert sorted(by_index) == list(range(6))
+    assert by_index[0]["suggestion"] == by_index[5]["suggestion"] == "Error handling for prompt 0"
+    assert by_index[4] == {"index": 4, "model": "ollama", "error": "Ollama Error: connection refused"}
+    # the batch never runs more generations than the global cap
+    assert llm["peak"] <= admission.concurrency
+    assert admission.active == 0 and admission.queued == 0
+
+
+def test_batch_prompts_take_rate_limit_tokens(admission, llm):
+    admission.burst = 3
+    response, lines = batch([f"prompt {i}" for i in range(5)])
+    assert response.status_code == 200
+    errors = [line for line in lines if "error" in line]
+    assert len(errors) == 2
+    assert all("rate_limited" in line["error"] for line in errors)
+    assert admission.active == 0
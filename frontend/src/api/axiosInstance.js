@@ -31,8 +31,10 @@ API.interceptors.response.use(
 );
 
 
-export const fetchSessions = () =>
-  API.get('/sessions');
+// Session lists are paginated: pass the X-Next-Cursor header of the previous
+// page to fetch the next one (axios exposes it as headers["x-next-cursor"])
+export const fetchSessions = (cursor) =>
+  API.get('/sessions', { params: cursor ? { cursor } : {} });
 
 export const fetchSessionsByProject = (projectId) =>
   API.get(`/sessions/projects/${projectId}`);
@@ -40,8 +42,10 @@ export const fetchSessionsByProject = (projectId) =>
 export const createSessionObj = (data) =>
   API.post("/sessions", data);
 
-export const fetchMessages = (sessionId) =>
-  API.get(`/messages/${sessionId}`);
+// Message history comes newest page first; pass the X-Next-Cursor header of
+// a page to fetch the messages before it
+export const fetchMessages = (sessionId, before) =>
+  API.get(`/messages/${sessionId}`, { params: before ? { before } : {} });
 
 export const sendMessage = (sessionId, messageData) =>
   API.post(`/messages`, messageData);
@@ -14,11 +14,16 @@ function PromptForm({ selectedChat, onSessionUpdated, onNewSessionCreated }) {
   const [model, setModel] = useState("ollama");
 
   const [sessionMessages, setSessionMessages] = useState({});
+  // session id -> cursor of the next older page of its history (none: all loaded)
+  const [messageCursors, setMessageCursors] = useState({});
+  const [loadingOlder, setLoadingOlder] = useState(false);
   const [loadingSessions, setLoadingSessions] = useState({});
   const [projectSessions, setProjectSessions] = useState([]);
 
   const user = JSON.parse(localStorage.getItem("user"));
   const chatWindowRef = useRef(null);
+  // scroll height before older messages were prepended, to keep the view in place
+  const prependedFromRef = useRef(null);
 
   useEffect(() => {
     if (selectedChat) {
@@ -31,13 +36,20 @@ function PromptForm({ selectedChat, onSessionUpdated, onNewSessionCreated }) {
       // no selection -> clear messages
       setPrompt("");
       setSessionMessages({});
+      setMessageCursors({});
       setProjectSessions([]);
     }
   }, [selectedChat]);
 
   useEffect(() => {
-    if (chatWindowRef.current && selectedChat && !selectedChat.isProjectHome) {
-      chatWindowRef.current.scrollTop = chatWindowRef.current.scrollHeight;
+    const chatWindow = chatWindowRef.current;
+    if (chatWindow && selectedChat && !selectedChat.isProjectHome) {
+      if (prependedFromRef.current !== null) {
+        chatWindow.scrollTop += chatWindow.scrollHeight - prependedFromRef.current;
+        prependedFromRef.current = null;
+      } else {
+        chatWindow.scrollTop = chatWindow.scrollHeight;
+      }
     }
   }, [sessionMessages, selectedChat]);
 
@@ -45,11 +57,33 @@ function PromptForm({ selectedChat, onSessionUpdated, onNewSessionCreated }) {
     try {
       const res = await fetchMessages(sessionId);
       setSessionMessages((prev) => ({ ...prev, [sessionId]: res.data }));
+      setMessageCursors((prev) => ({ ...prev, [sessionId]: res.headers["x-next-cursor"] || null }));
     } catch (err) {
       console.error("Failed to load messages", err);
     }
   };
 
+  // Previous page of the history, prepended above the messages already shown
+  const loadOlderMessages = async (sessionId) => {
+    const cursor = messageCursors[sessionId];
+    if (!cursor || loadingOlder) return;
+    setLoadingOlder(true);
+    try {
+      const res = await fetchMessages(sessionId, cursor);
+      prependedFromRef.current = chatWindowRef.current ? chatWindowRef.current.scrollHeight : null;
+      setSessionMessages((prev) => {
+        const msgs = prev[sessionId] || [];
+        const older = (res.data || []).filter((msg) => !msgs.some((m) => m.id === msg.id));
+        return { ...prev, [sessionId]: [...older, ...msgs] };
+      });
+      setMessageCursors((prev) => ({ ...prev, [sessionId]: res.headers["x-next-cursor"] || null }));
+    } catch (err) {
+      console.error("Failed to load older messages", err);
+    } finally {
+      setLoadingOlder(false);
+    }
+  };
+
   const loadProjectSessions = async (projectId) => {
     try {
       const res = await fetchSessionsByProject(projectId);
@@ -217,6 +251,18 @@ function PromptForm({ selectedChat, onSessionUpdated, onNewSessionCreated }) {
       {!isProjectHome && (
         <>
           <div className="chat-window flex-grow-1" ref={chatWindowRef}>
+            {messageCursors[selectedChat?.id] && (
+              <div className="text-center my-2">
+                <button
+                  className="btn btn-outline-secondary btn-sm"
+                  type="button"
+                  onClick={() => loadOlderMessages(selectedChat.id)}
+                  disabled={loadingOlder}
+                >
+                  {loadingOlder ? "Loading..." : "Load older messages"}
+                </button>
+              </div>
+            )}
             {messages.map((msg) => (
               <ChatMessage key={msg.id} msg={msg} username={user.username} />
             ))}
@@ -1,5 +1,5 @@
 import React, { useCallback, useEffect, useState } from "react";
-import API, { renameSession, deleteSession } from "../api/axiosInstance";
+import API, { fetchSessions, renameSession, deleteSession } from "../api/axiosInstance";
 import "./Sidebar.css";
 import {
 
@@ -14,6 +14,8 @@ import {
 function Sidebar({ onSelectChat, updatedChat, newChat }) {
     // === Chat states ===
     const [chats, setChats] = useState([]);
+    const [chatsCursor, setChatsCursor] = useState(null);
+    const [loadingMoreChats, setLoadingMoreChats] = useState(false);
     const [username, setUsername] = useState("");
     const [editingChatId, setEditingChatId] = useState(null);
     const [newTitle, setNewTitle] = useState("");
@@ -36,10 +38,11 @@ function Sidebar({ onSelectChat, updatedChat, newChat }) {
             try {
                 const [projectsRes, chatsRes] = await Promise.all([
                     API.get('/projects/list'),
-                    API.get('/sessions'),
+                    fetchSessions(),
                 ]);
                 setProjects(projectsRes.data.projects || []);
                 setChats(chatsRes.data || []);
+                setChatsCursor(chatsRes.headers["x-next-cursor"] || null);
             } catch (err) {
                 // eslint-disable-next-line no-console
                 console.error("Failed to load projects or chats", err);
@@ -48,6 +51,25 @@ function Sidebar({ onSelectChat, updatedChat, newChat }) {
         []
     );
 
+    // Next page of chats, newest first after the ones already shown
+    const loadMoreChats = async () => {
+        if (!chatsCursor || loadingMoreChats) return;
+        setLoadingMoreChats(true);
+        try {
+            const res = await fetchSessions(chatsCursor);
+            setChats((prev) => [
+                ...prev,
+                ...(res.data || []).filter((chat) => !prev.some((c) => c.id === chat.id)),
+            ]);
+            setChatsCursor(res.headers["x-next-cursor"] || null);
+        } catch (err) {
+            // eslint-disable-next-line no-console
+            console.error("Failed to load more chats", err);
+        } finally {
+            setLoadingMoreChats(false);
+        }
+    };
+
     useEffect(() => {
         const userData = localStorage.getItem("user");
         if (userData) {
@@ -415,6 +437,19 @@ function Sidebar({ onSelectChat, updatedChat, newChat }) {
                             <li className="list-group-item text-muted">No orphaned chats</li>
                         )}
                     </ul>
+
+                    {chatsCursor && (
+                        <div className="p-3">
+                            <button
+                                className="btn btn-outline-secondary btn-sm w-100"
+                                type="button"
+                                onClick={loadMoreChats}
+                                disabled={loadingMoreChats}
+                            >
+                                {loadingMoreChats ? "Loading..." : "Load more chats"}
+                            </button>
+                        </div>
+                    )}
                 </div>
 
                 <div className="p-3 border-top user-info d-flex justify-content-between align-items-center">